@@ -5,8 +5,12 @@
 Kullanım:
     python main.py sync      # Yeni makaleleri indir + indexle (tek adım)
     python main.py scrape    # Yeni makaleleri indir (incremental)
-    python main.py index     # Dokümanları indexle
-    python main.py chat      # Agentic RAG sohbet
+    python main.py index     # Dokümanları indexle (--full: tam rebuild, --stream: düşük bellekli build,
+                             #   --migrate: eski pickle index'ini kolon formatına taşı,
+                             #   --compact: silinmiş chunk vektörlerini index'ten temizle,
+                             #   --workers N: parse/chunking için process sayısı,
+                             #   --embed-workers N: CPU embedding process sayısı; sync de destekler)
+    python main.py chat      # Agentic RAG sohbet (chat/debate/ask: --mode dense|hybrid)
     python main.py debate    # Agentic debater (seni çürütür)
     python main.py arena     # İki AI birbirine tartışır
     python main.py ask "..." # Tek soru sor
@@ -14,6 +18,7 @@ Kullanım:
     python main.py doctor    # Veri/index sağlık raporu
     python main.py eval      # Retrieval değerlendirme
     python main.py stats     # Korpus istatistik JSON raporu
+    python main.py bench ... # Performans benchmark'ları (python main.py bench --help)
 """
 import sys
 import logging
@@ -25,12 +30,16 @@ logging.getLogger("transformers").setLevel(logging.ERROR)
 
 def _parse_shared_flags(args: list[str]) -> tuple[dict, list[str]]:
     """chat/debate/ask için ortak flag parser."""
+    from rag.config import RETRIEVAL_MODE
+    from rag.retriever import RETRIEVAL_MODES
+
     opts = {
         "date_from": None,
         "date_to": None,
         "category": None,
         "category_picker": False,
         "auto_category": False,
+        "retrieval_mode": RETRIEVAL_MODE,
     }
     rest = []
     i = 0
@@ -52,12 +61,32 @@ def _parse_shared_flags(args: list[str]) -> tuple[dict, list[str]]:
         elif tok == "--otokategori":
             opts["auto_category"] = True
             i += 1
+        elif tok == "--mode":
+            value = args[i + 1] if i + 1 < len(args) else ""
+            if value not in RETRIEVAL_MODES:
+                print(f"[!] --mode için {' veya '.join(RETRIEVAL_MODES)} bekleniyordu: {value or '(değer yok)'}")
+                sys.exit(1)
+            opts["retrieval_mode"] = value
+            i += 2
         else:
             rest.append(tok)
             i += 1
     return opts, rest
 
 
+def _parse_int_flag(args: list[str], name: str, default: int) -> int:
+    """`--name N` biçimindeki tamsayı flag'ini oku."""
+    if name in args:
+        i = args.index(name)
+        value = args[i + 1] if i + 1 < len(args) else ""
+        try:
+            return int(value)
+        except ValueError:
+            print(f"[!] {name} için tamsayı bekleniyordu: {value or '(değer yok)'}")
+            sys.exit(1)
+    return default
+
+
 def main():
     if len(sys.argv) < 2:
         print(__doc__)
@@ -77,7 +106,7 @@ def main():
         print("📊 Adım 2/2: Yeni makaleleri indexleme...")
         print("=" * 40)
         from rag.indexer import update_index
-        update_index()
+        update_index(embed_workers=_parse_int_flag(sys.argv, "--embed-workers", 1))
         print("\n[✓] Sync tamamlandı!")
     
     elif command == "scrape":
@@ -87,12 +116,20 @@ def main():
         asyncio.run(scrape_main(update_only=not full))
     
     elif command == "index":
-        if "--full" in sys.argv:
+        workers = _parse_int_flag(sys.argv, "--workers", 1)
+        embed_workers = _parse_int_flag(sys.argv, "--embed-workers", 1)
+        if "--migrate" in sys.argv:
+            from rag.indexer import migrate_index
+            migrate_index()
+        elif "--compact" in sys.argv:
+            from rag.indexer import compact_index
+            compact_index(force=True)
+        elif "--full" in sys.argv:
             from rag.indexer import index_documents
-            index_documents()
+            index_documents(streaming="--stream" in sys.argv, workers=workers, embed_workers=embed_workers)
         else:
             from rag.indexer import update_index
-            update_index()
+            update_index(workers=workers, embed_workers=embed_workers)
     
     elif command == "chat":
         from rag.chat import chat_loop, select_category
@@ -106,6 +143,7 @@ def main():
             auto_category=opts["auto_category"],
             date_from=opts["date_from"],
             date_to=opts["date_to"],
+            retrieval_mode=opts["retrieval_mode"],
         )
     
     elif command == "debate":
@@ -120,6 +158,7 @@ def main():
             auto_category=opts["auto_category"],
             date_from=opts["date_from"],
             date_to=opts["date_to"],
+            retrieval_mode=opts["retrieval_mode"],
         )
     
     elif command == "arena":
@@ -207,7 +246,12 @@ def main():
         with open(html_file, "w", encoding="utf-8") as f:
             f.write(export_interactive_html(root))
             
+        from rag.retriever import query_cache_stats
+
+        qc = query_cache_stats()
         print(f"\n✅ Harita tamamlandı ({duration:.1f}s)!")
+        if qc:
+            print(f"🧠 Sorgu cache: {qc['hits'] + qc['disk_hits']} hit / {qc['misses']} miss (hit-rate {qc['hit_rate'] * 100:.1f}%)")
         print(f"📄 Markdown Rapor: {md_file}")
         print(f"📊 JSON Veri:    {json_file}")
         print(f"🌐 İnteraktif:   {html_file} (Tarayıcıda açın!)")
@@ -229,6 +273,7 @@ def main():
             auto_category=opts["auto_category"],
             date_from=opts["date_from"],
             date_to=opts["date_to"],
+            retrieval_mode=opts["retrieval_mode"],
         )
 
     elif command == "categories":
@@ -256,6 +301,11 @@ def main():
 
         eval_cli(sys.argv[2:])
 
+    elif command == "bench":
+        from rag.bench import cli as bench_cli
+
+        bench_cli(sys.argv[2:])
+
     elif command == "stats":
         from rag.stats import run_stats
 
@@ -1,8 +1,7 @@
 # Agents - LLM-as-planner for agentic RAG
 import json
 import re
-from openai import OpenAI
-from .config import CHAT_MODEL
+from .config import CHAT_MODEL, load_env
 
 _planner_client = None
 
@@ -10,6 +9,9 @@ _planner_client = None
 def get_planner_client():
     global _planner_client
     if _planner_client is None:
+        from openai import OpenAI
+
+        load_env()
         _planner_client = OpenAI()
     return _planner_client
 
@@ -0,0 +1,930 @@
+# Bench - performans ölçümleri (python main.py bench <ölçüm>)
+import argparse
+import asyncio
+import hashlib
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+
+from .config import BASE_DIR, EMBEDDING_MAX_BATCH, EMBEDDING_TOKEN_BUDGET
+
+
+def _print_header(title: str) -> None:
+    print()
+    print("=" * 64)
+    print(title)
+    print("=" * 64)
+
+
+def _parse_int_list(raw: str) -> list[int]:
+    return [int(x) for x in raw.split(",") if x.strip()]
+
+
+def _sample_chunks(sample: int) -> list[str]:
+    """Korpustan (sıralı dosya düzeninde) ilk `sample` chunk."""
+    from .indexer import chunk_text, iter_documents
+
+    chunks: list[str] = []
+    for doc in iter_documents():
+        chunks.extend(chunk_text(doc["content"]))
+        if len(chunks) >= sample:
+            break
+    return chunks[:sample]
+
+
+# =============== EMBEDDING POOL ===============
+
+def bench_embed_pool(worker_counts: list[int], sample: int = 512, threads_per_worker: int | None = None) -> list[dict]:
+    """Aynı chunk örneğini farklı worker sayılarıyla embed edip throughput karşılaştır."""
+    from .embed_pool import EmbeddingPool
+    from .indexer import _prepare_local_texts, _token_lengths, token_budget_batches
+
+    chunks = _sample_chunks(sample)
+    if not chunks:
+        print("[!] Benchmark için chunk bulunamadı (önce scrape çalıştırın).")
+        return []
+    texts = _prepare_local_texts(chunks)
+    print(f"[i] Sample: {len(texts)} chunks")
+
+    results = []
+    for workers in worker_counts:
+        with EmbeddingPool(workers, threads_per_worker) as pool:
+            lengths = _token_lengths(pool.tokenizer, pool.max_seq_length, texts)
+            batches = token_budget_batches(lengths, EMBEDDING_TOKEN_BUDGET, EMBEDDING_MAX_BATCH)
+            prepared = [[texts[j] for j in batch] for batch in batches]
+
+            # Isınma: her worker en az bir batch görsün
+            list(pool.map(prepared[:workers]))
+
+            t0 = time.perf_counter()
+            list(pool.map(prepared))
+            elapsed = time.perf_counter() - t0
+
+        results.append(
+            {
+                "workers": workers,
+                "threads_per_worker": pool.threads_per_worker,
+                "seconds": elapsed,
+                "chunks_per_s": len(texts) / elapsed,
+                "tokens_per_s": sum(lengths) / elapsed,
+            }
+        )
+        print(f"  workers={workers}: {elapsed:.2f}s")
+
+    base = results[0]["chunks_per_s"] if results else 0.0
+    _print_header("Embedding Pool Scaling")
+    print(f"{'workers':>8} {'threads':>8} {'seconds':>9} {'chunks/s':>10} {'tokens/s':>10} {'speedup':>8}")
+    for r in results:
+        speedup = r["chunks_per_s"] / base if base else 0.0
+        print(
+            f"{r['workers']:>8} {r['threads_per_worker']:>8} {r['seconds']:>9.2f} "
+            f"{r['chunks_per_s']:>10.1f} {r['tokens_per_s']:>10.0f} {speedup:>7.2f}x"
+        )
+    print("=" * 64)
+    return results
+
+
+# =============== ONNX BACKEND ===============
+
+def _encode_timed(model, texts: list[str], batch_size: int) -> float:
+    t0 = time.perf_counter()
+    model.encode(texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True, normalize_embeddings=True)
+    return time.perf_counter() - t0
+
+
+def bench_onnx(sample: int = 256, queries: int = 50, reexport: bool = False) -> list[dict]:
+    """PyTorch (fp32, CPU) ile ONNX Runtime (int8) embedding: parity, throughput ve sorgu gecikmesi."""
+    from .config import LOCAL_EMBEDDING_MODEL, ONNX_PARITY_MIN
+    from .indexer import _prepare_local_texts
+    from .onnx_backend import _parity_texts, export_onnx_model, onnx_available, open_onnx_model, parity
+
+    if not onnx_available():
+        print("[!] onnxruntime/optimum yüklü değil: uv sync --extra onnx")
+        return []
+    from sentence_transformers import SentenceTransformer
+
+    meta = export_onnx_model(force=reexport)
+    chunks = _sample_chunks(sample)
+    passages = _prepare_local_texts(chunks) if chunks else _parity_texts()
+    query_texts = _prepare_local_texts([c[:120] for c in (chunks or passages)[:queries]], is_query=True)
+    print(f"[i] Sample: {len(passages)} passages, {len(query_texts)} queries")
+
+    models = {
+        "torch-fp32": SentenceTransformer(LOCAL_EMBEDDING_MODEL, device="cpu"),
+        f"onnx-int8 ({meta['quantization']})": open_onnx_model(meta["file_name"]),
+    }
+    cosines = parity(*models.values(), passages + query_texts)
+
+    results = []
+    for name, model in models.items():
+        _encode_timed(model, query_texts[:2], 1)  # ısınma
+        passage_s = _encode_timed(model, passages, 32)
+        latencies = np.array([_encode_timed(model, [q], 1) * 1000 for q in query_texts])
+        results.append(
+            {
+                "backend": name,
+                "passages_per_s": len(passages) / passage_s,
+                "query_p50_ms": float(np.percentile(latencies, 50)),
+                "query_p95_ms": float(np.percentile(latencies, 95)),
+            }
+        )
+        print(f"  {name}: {passage_s:.2f}s")
+
+    base = results[0]
+    _print_header("Embedding Backend (CPU)")
+    print(f"{'backend':<26} {'passages/s':>10} {'q p50 ms':>9} {'q p95 ms':>9} {'speedup':>8}")
+    for r in results:
+        print(
+            f"{r['backend']:<26} {r['passages_per_s']:>10.1f} {r['query_p50_ms']:>9.1f} "
+            f"{r['query_p95_ms']:>9.1f} {base['query_p50_ms'] / r['query_p50_ms']:>7.2f}x"
+        )
+    print(f"Parity cosine       : min {cosines.min():.4f}, mean {cosines.mean():.4f} (eşik {ONNX_PARITY_MIN})")
+    print("=" * 64)
+    if cosines.min() < ONNX_PARITY_MIN:
+        raise SystemExit("[!] ONNX parity kontrolü başarısız.")
+    return results
+
+
+# =============== OPENAI EMBEDDINGS (LOCAL STAND-IN) ===============
+
+def _standin_embedding(text: str, dim: int) -> np.ndarray:
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    return np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+
+
+class StandInEmbeddingServer:
+    """/v1/embeddings endpoint'ini taklit eden yerel HTTP sunucusu (ayrı thread + event loop).
+
+    Saniyede `rps` istekten fazlası 429 + Retry-After alır, `fail_rate` oranında
+    500 döner; her istek `latency` saniye bekletilir.
+    """
+
+    def __init__(self, dim: int = 64, rps: float = 20.0, fail_rate: float = 0.0, latency: float = 0.05, seed: int = 42):
+        self.dim = dim
+        self.rps = rps
+        self.fail_rate = fail_rate
+        self.latency = latency
+        self.stats = {"requests": 0, "rate_limited": 0, "failed": 0, "inputs": 0}
+        self._rng = random.Random(seed)
+        self._recent: list[float] = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._runner = None
+        self.url = ""
+
+    async def _handle(self, request):
+        from aiohttp import web
+
+        self.stats["requests"] += 1
+        now = time.monotonic()
+        self._recent = [t for t in self._recent if now - t < 1.0]
+        if len(self._recent) >= self.rps:
+            self.stats["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                status=429,
+                headers={"Retry-After": "0.2"},
+            )
+        self._recent.append(now)
+
+        body = await request.json()
+        inputs = body.get("input")
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        if not inputs:
+            return web.json_response({"error": {"message": "input boş"}}, status=400)
+
+        await asyncio.sleep(self.latency)
+        if self._rng.random() < self.fail_rate:
+            self.stats["failed"] += 1
+            return web.json_response({"error": {"message": "server error"}}, status=500)
+
+        self.stats["inputs"] += len(inputs)
+        data = [
+            {"object": "embedding", "index": i, "embedding": _standin_embedding(t, self.dim).tolist()}
+            for i, t in enumerate(inputs)
+        ]
+        # Gerçek API gibi sırayı garanti etme; istemci index alanına göre sıralamalı.
+        self._rng.shuffle(data)
+        return web.json_response({"object": "list", "data": data, "model": body.get("model")})
+
+    async def _start(self):
+        from aiohttp import web
+
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/v1/embeddings", self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1"
+
+    def __enter__(self):
+        self._thread.start()
+        self.url = asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+def _synthetic_texts(n: int, seed: int = 42) -> list[str]:
+    rng = random.Random(seed)
+    words = ["bilgi", "gerekçe", "inanç", "doğruluk", "zihin", "bilinç", "ahlak", "erdem", "özgür", "irade"]
+    return [" ".join(rng.choice(words) for _ in range(rng.randint(40, 600))) for _ in range(n)]
+
+
+def bench_openai_embed(
+    sample: int = 400,
+    concurrency_levels: list[int] | None = None,
+    request_tokens: int = 8000,
+    rps: float = 20.0,
+    fail_rate: float = 0.05,
+    latency: float = 0.05,
+) -> list[dict]:
+    """Async OpenAI istemcisini yerel stand-in sunucuya karşı doğrula ve ölç."""
+    from .openai_embed import AsyncEmbeddingClient, iter_openai_batches, pack_requests, prepare_inputs
+
+    concurrency_levels = concurrency_levels or [1, 4, 8]
+    texts = _synthetic_texts(sample)
+    prepared, token_counts = prepare_inputs(texts)
+    batches = pack_requests(token_counts, max_request_tokens=request_tokens)
+    print(f"[i] {len(texts)} input, {sum(token_counts)} token (tahmini), {len(batches)} istek")
+
+    results = []
+    for concurrency in concurrency_levels:
+        with StandInEmbeddingServer(rps=rps, fail_rate=fail_rate, latency=latency) as server:
+            client = AsyncEmbeddingClient(
+                model="stand-in", base_url=server.url, api_key="test", concurrency=concurrency
+            )
+            out = np.zeros((len(prepared), server.dim), dtype=np.float32)
+            t0 = time.perf_counter()
+            for batch, vectors in iter_openai_batches(prepared, batches, client=client):
+                out[batch] = vectors
+            elapsed = time.perf_counter() - t0
+
+            expected = np.vstack([_standin_embedding(t, server.dim) for t in prepared])
+            parity = bool(np.array_equal(out, expected))
+            results.append(
+                {
+                    "concurrency": concurrency,
+                    "seconds": elapsed,
+                    "inputs_per_s": len(prepared) / elapsed,
+                    "parity": parity,
+                    **{f"client_{k}": v for k, v in client.stats.items()},
+                    "server_429": server.stats["rate_limited"],
+                    "server_500": server.stats["failed"],
+                }
+            )
+
+    _print_header("Async OpenAI Embedding Client (stand-in server)")
+    print(f"{'conc':>5} {'seconds':>8} {'inputs/s':>9} {'requests':>9} {'429':>5} {'500':>5} {'retries':>8} {'parity':>7}")
+    for r in results:
+        print(
+            f"{r['concurrency']:>5} {r['seconds']:>8.2f} {r['inputs_per_s']:>9.1f} {r['client_requests']:>9} "
+            f"{r['server_429']:>5} {r['server_500']:>5} {r['client_retries']:>8} {'OK' if r['parity'] else 'FAIL':>7}"
+        )
+    print("=" * 64)
+    if not all(r["parity"] for r in results):
+        raise SystemExit("[!] Stand-in parity kontrolü başarısız.")
+    return results
+
+
+# =============== ANN INDEX TYPES ===============
+
+def _bench_vectors(n: int, dim: int, seed: int = 42) -> np.ndarray:
+    """Mevcut (flat) index'in vektörleri; yoksa kümelenmiş sentetik vektörler."""
+    import faiss
+
+    from .config import get_index_path
+    from .snapshots import resolve_index_dir
+
+    path = resolve_index_dir(get_index_path()) / "index.faiss"
+    if path.exists():
+        index = faiss.read_index(str(path))
+        inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+        if isinstance(inner, faiss.IndexFlat) and inner.ntotal:
+            total = min(n, inner.ntotal) if n else inner.ntotal
+            print(f"[i] Mevcut index'ten {total} vektör kullanılıyor")
+            return inner.reconstruct_n(0, total)
+
+    print(f"[i] Index bulunamadı, {n} sentetik vektör (dim={dim}) kullanılıyor")
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 200), dim)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def bench_ann(
+    index_types: list[str],
+    n: int = 50000,
+    dim: int = 256,
+    queries: int = 200,
+    k: int = 10,
+    nprobes: list[int] | None = None,
+    ef_searches: list[int] | None = None,
+) -> list[dict]:
+    """Index tiplerini flat'e göre recall@k ve sorgu gecikmesiyle karşılaştır."""
+    import faiss
+
+    from .vector_index import build_vector_index, search_params
+
+    vectors = _bench_vectors(n, dim)
+    rng = np.random.default_rng(7)
+    q = vectors[rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)]
+    q = q + 0.05 * rng.standard_normal(q.shape).astype(np.float32)
+    faiss.normalize_L2(q)
+    ids = np.arange(len(vectors), dtype=np.int64)
+
+    exact = faiss.IndexFlatIP(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(q, k)
+
+    results = []
+    for index_type in index_types:
+        t0 = time.perf_counter()
+        index, used, _ = build_vector_index(vectors, ids, index_type)
+        build_s = time.perf_counter() - t0
+        if used.startswith("ivf"):
+            settings = [("nprobe", v, search_params(index, nprobe=v)) for v in (nprobes or [16])]
+        elif used == "hnsw":
+            settings = [("efSearch", v, search_params(index, ef_search=v)) for v in (ef_searches or [128])]
+        else:
+            settings = [("-", "-", None)]
+        for name, value, params in settings:
+            t0 = time.perf_counter()
+            _, labels = index.search(q, k, params=params)
+            ms = (time.perf_counter() - t0) * 1000 / len(q)
+            recall = float(np.mean([len(set(labels[i]) & set(truth[i])) / k for i in range(len(q))]))
+            results.append(
+                {"type": used, "param": f"{name}={value}" if params is not None else "-", "build_s": build_s, "ms_per_query": ms, "recall": recall}
+            )
+
+    _print_header(f"ANN Index Types (n={len(vectors)}, dim={vectors.shape[1]}, recall@{k} vs flat)")
+    print(f"{'type':>9} {'param':>14} {'build_s':>8} {'ms/query':>9} {'recall':>7}")
+    for r in results:
+        print(f"{r['type']:>9} {r['param']:>14} {r['build_s']:>8.1f} {r['ms_per_query']:>9.3f} {r['recall']:>7.3f}")
+    print("=" * 64)
+    return results
+
+
+# =============== FILTERED SEARCH ===============
+
+def _legacy_filtered(index, chunk_ids, q: np.ndarray, k: int, allowed: np.ndarray) -> np.ndarray:
+    """Eski yol (karşılaştırma için): küçük filtrede tek tek reconstruct + yeni IndexFlatIP,
+    büyük filtrede global arama + süzme, yetmezse k * 1.8 ile tekrar."""
+    import faiss
+
+    if allowed.size <= 12000:
+        vectors = np.vstack([index.reconstruct(int(chunk_ids[r])) for r in allowed]).astype(np.float32)
+        sub_index = faiss.IndexFlatIP(vectors.shape[1])
+        sub_index.add(vectors)
+        _, local = sub_index.search(q, min(k, int(allowed.size)))
+        return allowed[local[0]]
+    allowed_set = set(allowed.tolist())
+    total = index.ntotal
+    kk = min(total, max(k * 4, 200))
+    while True:
+        _, labels = index.search(q, kk)
+        found = [int(x) for x in labels[0] if int(x) in allowed_set][:k]
+        if len(found) >= k or kk >= total:
+            return np.array(found, dtype=np.int64)
+        kk = min(total, int(kk * 1.8))
+
+
+def bench_filter(
+    index_type: str = "flat",
+    n: int = 50000,
+    dim: int = 256,
+    queries: int = 50,
+    k: int = 40,
+    selectivities: list[float] | None = None,
+) -> list[dict]:
+    """Kategori/tarih filtresi seçiciliğine göre filtreli arama gecikmesi: IDSelector yolu vs eski yol."""
+    import faiss
+
+    from . import retriever
+    from .vector_index import build_vector_index, is_exhaustive, resident_vectors, supports_id_selector
+
+    vectors = _bench_vectors(n, dim)
+    ids = np.arange(len(vectors), dtype=np.int64)
+    index, used, codec = build_vector_index(vectors, ids, index_type)
+    # Retriever'daki gibi: flat/HNSW'de index belleği, diğerlerinde float16 kopya
+    resident, vector_rows = resident_vectors(index, ids) or (vectors.astype(np.float16), None)
+    cache = {
+        "index": index,
+        "chunk_ids": ids,
+        "chunk_id_sorter": None,
+        "vectors": resident,
+        "vector_rows": vector_rows,
+        "rescore_vectors": resident if codec != "float32" else None,
+    }
+    rng = np.random.default_rng(7)
+    q = vectors[rng.choice(len(vectors), size=min(queries, len(vectors)), replace=False)]
+    q = q + 0.05 * rng.standard_normal(q.shape).astype(np.float32)
+    faiss.normalize_L2(q)
+
+    results = []
+    for frac in selectivities or [0.5, 0.1, 0.01, 0.001]:
+        size = max(1, int(len(vectors) * frac))
+        allowed = np.sort(rng.choice(len(vectors), size=size, replace=False)).astype(np.int64)
+        small = size <= retriever.MAX_SUBSET_VECTOR_SEARCH
+        path = "subset" if not supports_id_selector(index) or (small and not is_exhaustive(index)) else "selector"
+
+        t0 = time.perf_counter()
+        found = [retriever.vector_candidates(cache, q[i : i + 1], k, allowed)[0] for i in range(len(q))]
+        new_ms = (time.perf_counter() - t0) * 1000 / len(q)
+
+        t0 = time.perf_counter()
+        for i in range(len(q)):
+            _legacy_filtered(index, ids, q[i : i + 1], k, allowed)
+        old_ms = (time.perf_counter() - t0) * 1000 / len(q)
+
+        # Kesin sonuç: filtre satırlarının float32 vektörleri üzerinde brute-force
+        exact = q @ vectors[allowed].T
+        truth = [allowed[np.argsort(-row, kind="stable")[:k]] for row in exact]
+        recall = float(np.mean([len(set(a) & set(b.tolist())) / max(1, len(b)) for a, b in zip(found, truth)]))
+        results.append(
+            {"selectivity": frac, "allowed": size, "path": path, "ms_per_query": new_ms, "legacy_ms_per_query": old_ms, "recall": recall}
+        )
+
+    _print_header(f"Filtered Search ({used}/{codec}, n={len(vectors)}, k={k}, recall vs exact subset)")
+    print(f"{'selectivity':>11} {'allowed':>8} {'path':>9} {'ms/query':>9} {'legacy_ms':>10} {'speedup':>8} {'recall':>7}")
+    for r in results:
+        speedup = r["legacy_ms_per_query"] / r["ms_per_query"] if r["ms_per_query"] else 0.0
+        print(
+            f"{r['selectivity']:>11} {r['allowed']:>8} {r['path']:>9} {r['ms_per_query']:>9.3f} "
+            f"{r['legacy_ms_per_query']:>10.3f} {speedup:>7.1f}x {r['recall']:>7.3f}"
+        )
+    print("=" * 64)
+    return results
+
+
+def _legacy_mmr(vecs: np.ndarray, rel: np.ndarray, k: int, lambda_mult: float) -> list[int]:
+    """Eski MMR döngüsü (karşılaştırma için): her adımda her aday için seçilenlerle benzerlik."""
+    selected = [int(np.argmax(rel))]
+    selected_mask = np.zeros(len(rel), dtype=bool)
+    selected_mask[selected[0]] = True
+    while len(selected) < min(k, len(rel)):
+        best_idx, best_score = -1, -1e9
+        for i in range(len(rel)):
+            if selected_mask[i]:
+                continue
+            diversity_penalty = float(np.max(vecs[i : i + 1] @ vecs[selected].T))
+            mmr_score = float(lambda_mult * rel[i] - (1.0 - lambda_mult) * diversity_penalty)
+            if mmr_score > best_score:
+                best_score, best_idx = mmr_score, i
+        if best_idx < 0:
+            break
+        selected.append(best_idx)
+        selected_mask[best_idx] = True
+    return selected
+
+
+def _mmr_pools(rng, batch: int, pool: int, dim: int, clusters: int = 8) -> tuple[np.ndarray, np.ndarray]:
+    """Kümeli MMR havuzları: (batch, pool, dim) normalize vektörler ve azalan sıralı (batch, pool) alaka skorları.
+
+    Yakın kopyalar MMR'ın gerçekten çeşitlendirme yapmasını sağlar.
+    """
+    centers = rng.standard_normal((batch, clusters, dim)).astype(np.float32)
+    assign = rng.integers(0, clusters, size=(batch, pool))
+    vecs = centers[np.arange(batch)[:, None], assign] + 0.3 * rng.standard_normal((batch, pool, dim)).astype(np.float32)
+    vecs /= np.linalg.norm(vecs, axis=2, keepdims=True)
+    rel = np.sort(rng.uniform(0.3, 0.9, size=(batch, pool)).astype(np.float32), axis=1)[:, ::-1].copy()
+    return vecs, rel
+
+
+def bench_mmr(queries: int = 50, top_k: int = 10, dim: int = 1024, lambda_mult: float | None = None) -> dict:
+    """MMR seçimi: eski döngü vs artımlı (sorgu başına) vs batch; seçimlerin birebir aynı olduğu kontrol edilir."""
+    from .config import MMR_LAMBDA
+    from .retriever import mmr_select
+
+    lam = MMR_LAMBDA if lambda_mult is None else lambda_mult
+    pool = max(top_k * 8, 40)
+    vecs, rel = _mmr_pools(np.random.default_rng(11), queries, pool, dim)
+    sizes = np.full(queries, pool, dtype=np.int64)
+
+    t0 = time.perf_counter()
+    legacy = [_legacy_mmr(vecs[b], rel[b], top_k, lam) for b in range(queries)]
+    legacy_ms = (time.perf_counter() - t0) * 1000 / queries
+
+    t0 = time.perf_counter()
+    single = [mmr_select(vecs[b : b + 1], rel[b : b + 1], sizes[:1], top_k, lam)[0].tolist() for b in range(queries)]
+    single_ms = (time.perf_counter() - t0) * 1000 / queries
+
+    t0 = time.perf_counter()
+    batched = mmr_select(vecs, rel, sizes, top_k, lam).tolist()
+    batch_ms = (time.perf_counter() - t0) * 1000 / queries
+
+    result = {
+        "pool": pool,
+        "legacy_ms_per_query": legacy_ms,
+        "incremental_ms_per_query": single_ms,
+        "batched_ms_per_query": batch_ms,
+        "identical": legacy == single == batched,
+    }
+
+    _print_header(f"MMR Selection (queries={queries}, pool={pool}, top_k={top_k}, dim={dim}, lambda={lam})")
+    print(f"{'mode':>12} {'ms/query':>9} {'speedup':>8}")
+    for mode, ms in (("legacy", legacy_ms), ("incremental", single_ms), ("batched", batch_ms)):
+        print(f"{mode:>12} {ms:>9.3f} {legacy_ms / ms if ms else 0.0:>7.1f}x")
+    print(f"Selections identical: {result['identical']}")
+    print("=" * 64)
+    return result
+
+
+# =============== LEXICAL (BM25) ===============
+
+def bench_lexical(n: int = 20000, queries: int = 200, top_n: int = 40) -> dict:
+    """BM25 ters index'i: kurulum süresi, boyut ve sorgu gecikmesi (filtresiz / %10 filtreli)."""
+    from .lexical import LexicalIndex
+
+    chunks = _sample_chunks(n) if (BASE_DIR / "oncul_dump").exists() else []
+    source = "corpus"
+    if not chunks:
+        chunks, source = _synthetic_texts(n), "synthetic"
+
+    t0 = time.perf_counter()
+    lexical = LexicalIndex.build(chunks)
+    build_s = time.perf_counter() - t0
+    size_mb = sum(a.nbytes for a in (lexical.indptr, lexical.rows, lexical.tf, lexical.doc_len)) / (1024 * 1024)
+
+    rng = random.Random(7)
+    texts = []
+    for _ in range(queries):
+        words = rng.choice(chunks).split()
+        start = rng.randrange(max(1, len(words) - 4))
+        texts.append(" ".join(words[start:start + rng.randint(1, 4)]))
+    allowed = np.sort(np.random.default_rng(7).choice(len(chunks), size=max(1, len(chunks) // 10), replace=False))
+
+    result = {"source": source, "chunks": len(chunks), "terms": len(lexical.terms), "build_s": build_s, "index_mb": size_mb}
+    for label, rows in (("all", None), ("filter_10pct", allowed)):
+        times = []
+        for q in texts:
+            t0 = time.perf_counter()
+            lexical.search(q, top_n, rows)
+            times.append((time.perf_counter() - t0) * 1000)
+        result[f"{label}_p50_ms"] = float(np.percentile(times, 50))
+        result[f"{label}_p95_ms"] = float(np.percentile(times, 95))
+
+    _print_header(f"BM25 Lexical Index ({source}, {len(chunks)} chunks, top_n={top_n})")
+    print(f"Terms               : {result['terms']}")
+    print(f"Build               : {build_s:.2f}s ({len(chunks) / max(build_s, 1e-9):.0f} chunks/s)")
+    print(f"Postings size       : {size_mb:.1f} MB")
+    print(f"Query p50 / p95     : {result['all_p50_ms']:.2f} / {result['all_p95_ms']:.2f} ms")
+    print(f"Filtered (10%)      : {result['filter_10pct_p50_ms']:.2f} / {result['filter_10pct_p95_ms']:.2f} ms")
+    print("=" * 64)
+    return result
+
+
+# =============== RERANKER ===============
+
+def bench_rerank(queries: int = 30, top_k: int | None = None) -> list[dict]:
+    """search() gecikmesi reranker kapalı / açık: margin kapısı ve (sorgu, chunk_id) skor cache'i ile."""
+    from . import retriever
+    from .config import RERANK_SKIP_MARGIN, TOP_K
+    from .eval import DEFAULT_EVAL_PATH, _unique_records_from_index, load_eval_dataset
+    from .models import get_reranker_model
+
+    top_k = top_k or TOP_K
+    dataset = load_eval_dataset(DEFAULT_EVAL_PATH) or _unique_records_from_index()
+    texts = [item["query"] for item in dataset[:queries]]
+    if not texts:
+        print("[!] Sorgu bulunamadı (eval dataset / index boş)")
+        return []
+
+    # Index, embedding modeli, sorgu embedding'leri ve reranker ölçüm dışında yüklenir
+    for q in texts:
+        retriever.search(q, top_k=top_k, use_reranker=False)
+    get_reranker_model()
+
+    def run(label: str, use_reranker: bool, margin: float, clear: bool) -> dict:
+        rerank_cache = retriever.get_rerank_cache()
+        if clear and rerank_cache is not None:
+            rerank_cache.clear()
+        retriever.reset_rerank_stats()
+        times = []
+        for q in texts:
+            t0 = time.perf_counter()
+            retriever.search(q, top_k=top_k, use_reranker=use_reranker, rerank_skip_margin=margin)
+            times.append((time.perf_counter() - t0) * 1000)
+        stats = retriever.rerank_stats()
+        return {
+            "mode": label,
+            "p50_ms": float(np.percentile(times, 50)),
+            "p95_ms": float(np.percentile(times, 95)),
+            "skipped": stats["skipped"],
+            "scored_pairs": stats["scored_pairs"],
+        }
+
+    results = [
+        run("off", False, RERANK_SKIP_MARGIN, clear=True),
+        run("on", True, 0.0, clear=True),
+        run("on+gate", True, RERANK_SKIP_MARGIN, clear=True),
+        run("on+gate+cache", True, RERANK_SKIP_MARGIN, clear=False),
+    ]
+
+    _print_header(f"Reranker Latency ({len(texts)} queries, top_k={top_k}, skip margin={RERANK_SKIP_MARGIN})")
+    print(f"{'mode':>14} {'p50_ms':>8} {'p95_ms':>8} {'skipped':>8} {'pairs':>7}")
+    for r in results:
+        print(f"{r['mode']:>14} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['skipped']:>8} {r['scored_pairs']:>7}")
+    print("=" * 64)
+    return results
+
+
+# =============== CONCURRENCY ===============
+
+def bench_concurrency(
+    queries: int = 200,
+    callers: list[int] | None = None,
+    workers: int | None = None,
+    top_k: int | None = None,
+    encode: bool = False,
+) -> list[dict]:
+    """asearch() QPS'i paralel çağıran sayısına göre (workers thread'li havuzda).
+
+    encode=False iken sorgu vektörleri cache'ten gelir (FAISS + BM25 + MMR ölçülür);
+    encode=True iken aramalar sorgu cache'ine bakmaz, her arama modeli de çağırır.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    from . import retriever
+    from .config import RETRIEVAL_WORKERS, TOP_K
+    from .eval import DEFAULT_EVAL_PATH, _unique_records_from_index, load_eval_dataset
+
+    callers = callers or [1, 2, 4, 8]
+    workers = workers or RETRIEVAL_WORKERS
+    top_k = top_k or TOP_K
+    dataset = load_eval_dataset(DEFAULT_EVAL_PATH) or _unique_records_from_index()
+    texts = [item["query"] for item in dataset]
+    if not texts:
+        print("[!] Sorgu bulunamadı (eval dataset / index boş)")
+        return []
+    texts = (texts * (queries // len(texts) + 1))[:queries]
+
+    # Index, model ve (encode=False iken) sorgu vektörleri ölçüm dışında yüklenir
+    for q in dict.fromkeys(texts):
+        retriever.search(q, top_k=top_k)
+
+    async def drive(n_callers: int) -> tuple[float, list[float]]:
+        pending = iter(texts)
+        latencies: list[float] = []
+
+        async def caller():
+            # Aynı event loop'ta paylaşılan iterator: her çağıran sıradaki sorguyu alır
+            for q in pending:
+                t0 = time.perf_counter()
+                await retriever.asearch(q, executor=executor, top_k=top_k, use_query_cache=not encode)
+                latencies.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(caller() for _ in range(n_callers)))
+        return time.perf_counter() - t0, latencies
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bench-retrieval") as executor:
+        for n_callers in callers:
+            elapsed, latencies = asyncio.run(drive(n_callers))
+            results.append({
+                "callers": n_callers,
+                "qps": len(texts) / elapsed,
+                "p50_ms": float(np.percentile(latencies, 50)),
+                "p95_ms": float(np.percentile(latencies, 95)),
+            })
+
+    base = results[0]["qps"] if results else 0.0
+    source = "model" if encode else "cache"
+    _print_header(f"Concurrent asearch ({len(texts)} queries, {workers} workers, top_k={top_k}, query vectors: {source})")
+    print(f"{'callers':>8} {'qps':>9} {'speedup':>8} {'p50_ms':>8} {'p95_ms':>8}")
+    for r in results:
+        speedup = r["qps"] / base if base else 0.0
+        print(f"{r['callers']:>8} {r['qps']:>9.1f} {speedup:>7.2f}x {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f}")
+    print("=" * 64)
+    return results
+
+
+# =============== STARTUP ===============
+
+# Komut -> (main.py'nin komut iş yapmadan önce import ettiği modüller, import bütçesi ms)
+STARTUP_BUDGETS = {
+    "stats": (("rag.stats",), 100),
+    "doctor": (("rag.doctor",), 100),
+    "categories": (("rag.retriever",), 300),
+    "ask": (("rag.chat",), 350),
+    "chat": (("rag.chat",), 350),
+    "map": (("rag.mapper",), 350),
+    "eval": (("rag.eval",), 350),
+    "bench": (("rag.bench",), 250),
+    "index": (("rag.indexer",), 500),
+}
+# Hiçbir komutun import aşamasında yüklememesi gereken paketler (kullanıldıkları fonksiyonda import edilir)
+HEAVY_MODULES = ("torch", "sentence_transformers", "transformers", "onnxruntime", "openai", "sklearn", "faiss")
+# faiss'i modül seviyesinde import etmesine izin verilen komutlar (index build)
+FAISS_COMMANDS = ("index",)
+
+
+def _import_times(code: str) -> dict[str, int]:
+    """`python -X importtime -c code`: en üst seviye modül -> kümülatif süre (us)."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BASE_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    times: dict[str, int] = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue  # başlık satırı
+        name = parts[2].rstrip()
+        # İç içe importlar girintili; süre en üst seviyede kümülatif
+        times[name.strip()] = int(parts[1]) if not name[1:].startswith(" ") else -1
+    return times
+
+
+def bench_startup(commands: list[str] | None = None, repeat: int = 3) -> list[dict]:
+    """Her komutun import maliyetini `-X importtime` ile ölç; bütçe aşımı veya ağır paket hata sayılır."""
+    commands = commands or list(STARTUP_BUDGETS)
+    unknown = [c for c in commands if c not in STARTUP_BUDGETS]
+    if unknown:
+        raise ValueError(f"Bilinmeyen komut(lar): {', '.join(unknown)}")
+
+    # Yorumlayıcının kendi açılış importları (encodings, site, ...) ölçüme girmesin
+    baseline = set(_import_times("pass"))
+    results = []
+    for command in commands:
+        modules, budget_ms = STARTUP_BUDGETS[command]
+        code = "import main; " + "; ".join(f"import {m}" for m in modules)
+        try:
+            # En iyi tekrar: disk cache / .pyc derlemesi gibi tek seferlik maliyetler düşer
+            runs = [_import_times(code) for _ in range(max(1, repeat))]
+        except RuntimeError as e:
+            results.append({"command": command, "budget_ms": budget_ms, "ms": None, "heavy": [], "ok": False, "error": str(e)})
+            continue
+        totals = [sum(us for name, us in run.items() if us > 0 and name not in baseline) for run in runs]
+        ms = min(totals) / 1000
+        allowed = ("faiss",) if command in FAISS_COMMANDS else ()
+        heavy = sorted(
+            {
+                name.split(".")[0]
+                for name in runs[0]
+                if name.split(".")[0] in HEAVY_MODULES and name.split(".")[0] not in allowed
+            }
+        )
+        results.append(
+            {"command": command, "budget_ms": budget_ms, "ms": ms, "heavy": heavy, "ok": ms <= budget_ms and not heavy, "error": None}
+        )
+
+    _print_header(f"Startup Import Time (python -X importtime, best of {repeat})")
+    print(f"{'command':>11} {'import_ms':>10} {'budget_ms':>10} {'status':>7}  heavy")
+    for r in results:
+        ms = f"{r['ms']:.1f}" if r["ms"] is not None else "-"
+        status = "OK" if r["ok"] else "FAIL"
+        detail = r["error"] or ", ".join(r["heavy"])
+        print(f"{r['command']:>11} {ms:>10} {r['budget_ms']:>10} {status:>7}  {detail}")
+    print("=" * 64)
+    return results
+
+
+def cli(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(prog="main.py bench", description="Performans benchmark'ları")
+    sub = parser.add_subparsers(dest="name", required=True)
+
+    p = sub.add_parser("embed-pool", help="CPU embedding pool ölçekleme (1/2/4/8 worker)")
+    p.add_argument("--workers", default="1,2,4,8", help="Virgülle ayrılmış worker sayıları")
+    p.add_argument("--sample", type=int, default=512, help="Embed edilecek chunk sayısı")
+    p.add_argument("--threads", type=int, default=None, help="Worker başına thread (varsayılan: cpu/worker)")
+
+    p = sub.add_parser("onnx", help="PyTorch vs ONNX int8 embedding: parity ve gecikme (CPU)")
+    p.add_argument("--sample", type=int, default=256, help="Embed edilecek chunk sayısı")
+    p.add_argument("--queries", type=int, default=50, help="Tek tek encode edilecek sorgu sayısı")
+    p.add_argument("--reexport", action="store_true", help="ONNX export'unu yeniden oluştur")
+
+    p = sub.add_parser("openai-embed", help="Async OpenAI embedding istemcisi (yerel stand-in sunucu)")
+    p.add_argument("--sample", type=int, default=400, help="Input sayısı")
+    p.add_argument("--concurrency", default="1,4,8", help="Virgülle ayrılmış eşzamanlılık seviyeleri")
+    p.add_argument("--request-tokens", type=int, default=8000, help="İstek başına token limiti")
+    p.add_argument("--rps", type=float, default=20.0, help="Stand-in sunucu saniyelik istek limiti (aşan 429 alır)")
+    p.add_argument("--fail-rate", type=float, default=0.05, help="Stand-in sunucu 500 oranı")
+    p.add_argument("--latency", type=float, default=0.05, help="Stand-in sunucu istek gecikmesi (s)")
+
+    p = sub.add_parser("ann", help="FAISS index tipleri: recall@k ve sorgu gecikmesi")
+    p.add_argument("--types", default="flat,ivf_flat,hnsw,ivf_pq", help="Virgülle ayrılmış index tipleri")
+    p.add_argument("--n", type=int, default=50000, help="Vektör sayısı (mevcut index varsa en fazla)")
+    p.add_argument("--dim", type=int, default=256, help="Sentetik vektör boyutu")
+    p.add_argument("--queries", type=int, default=200, help="Sorgu sayısı")
+    p.add_argument("--k", type=int, default=10, help="recall@k")
+    p.add_argument("--nprobe", default="4,16,64", help="IVF için virgülle ayrılmış nprobe değerleri")
+    p.add_argument("--ef", default="32,128,256", help="HNSW için virgülle ayrılmış efSearch değerleri")
+
+    p = sub.add_parser("filter", help="Filtre seçiciliğine göre filtreli arama gecikmesi (IDSelector vs eski yol)")
+    p.add_argument("--type", default="flat", help="Index tipi (flat, ivf_flat, hnsw, ivf_pq)")
+    p.add_argument("--n", type=int, default=50000, help="Vektör sayısı (mevcut index varsa en fazla)")
+    p.add_argument("--dim", type=int, default=256, help="Sentetik vektör boyutu")
+    p.add_argument("--queries", type=int, default=50, help="Sorgu sayısı")
+    p.add_argument("--k", type=int, default=40, help="Sorgu başına aday sayısı")
+    p.add_argument("--selectivity", default="0.5,0.1,0.01,0.001", help="Virgülle ayrılmış filtre oranları")
+
+    p = sub.add_parser("mmr", help="MMR seçimi: eski döngü vs artımlı/batch (aynı seçim kontrolü)")
+    p.add_argument("--queries", type=int, default=50, help="Sorgu (havuz) sayısı")
+    p.add_argument("--top-k", type=int, default=10, help="Seçilecek sonuç sayısı")
+    p.add_argument("--dim", type=int, default=1024, help="Sentetik vektör boyutu")
+    p.add_argument("--lambda", dest="lambda_mult", type=float, default=None, help="MMR lambda (varsayılan: MMR_LAMBDA)")
+
+    p = sub.add_parser("lexical", help="BM25 ters index'i: kurulum süresi ve sorgu gecikmesi")
+    p.add_argument("--n", type=int, default=20000, help="Chunk sayısı (korpus yoksa sentetik)")
+    p.add_argument("--queries", type=int, default=200, help="Sorgu sayısı")
+    p.add_argument("--top-n", type=int, default=40, help="Sorgu başına aday sayısı")
+
+    p = sub.add_parser("rerank", help="search() gecikmesi: reranker kapalı / açık / margin kapısı / skor cache'i")
+    p.add_argument("--queries", type=int, default=30, help="Eval dataset'inden sorgu sayısı")
+    p.add_argument("--k", type=int, default=None, help="Top-K (varsayılan: TOP_K)")
+
+    p = sub.add_parser("concurrency", help="asearch() QPS'i paralel çağıran sayısına göre")
+    p.add_argument("--queries", type=int, default=200, help="Toplam sorgu sayısı (eval dataset'i tekrarlanır)")
+    p.add_argument("--callers", default="1,2,4,8", help="Virgülle ayrılmış paralel çağıran sayıları")
+    p.add_argument("--workers", type=int, default=None, help="Thread havuzu boyutu (varsayılan: RETRIEVAL_WORKERS)")
+    p.add_argument("--k", type=int, default=None, help="Top-K (varsayılan: TOP_K)")
+    p.add_argument("--encode", action="store_true", help="Sorgu cache'ini kapat (her arama modeli çağırır)")
+
+    p = sub.add_parser("startup", help="Komut başına import süresi; bütçe aşılırsa çıkış kodu 1")
+    p.add_argument("--commands", default=None, help="Virgülle ayrılmış komutlar (varsayılan: hepsi)")
+    p.add_argument("--repeat", type=int, default=3, help="Komut başına ölçüm sayısı (en iyisi alınır)")
+
+    args = parser.parse_args(argv)
+
+    if args.name == "embed-pool":
+        return bench_embed_pool(_parse_int_list(args.workers), sample=args.sample, threads_per_worker=args.threads)
+    if args.name == "onnx":
+        return bench_onnx(sample=args.sample, queries=args.queries, reexport=args.reexport)
+    if args.name == "ann":
+        return bench_ann(
+            [t.strip() for t in args.types.split(",") if t.strip()],
+            n=args.n,
+            dim=args.dim,
+            queries=args.queries,
+            k=args.k,
+            nprobes=_parse_int_list(args.nprobe),
+            ef_searches=_parse_int_list(args.ef),
+        )
+    if args.name == "filter":
+        return bench_filter(
+            index_type=args.type,
+            n=args.n,
+            dim=args.dim,
+            queries=args.queries,
+            k=args.k,
+            selectivities=[float(x) for x in args.selectivity.split(",") if x.strip()],
+        )
+    if args.name == "mmr":
+        result = bench_mmr(queries=args.queries, top_k=args.top_k, dim=args.dim, lambda_mult=args.lambda_mult)
+        if not result["identical"]:
+            print("[!] Artımlı MMR eski döngüden farklı seçim yaptı")
+            sys.exit(1)
+        return result
+    if args.name == "lexical":
+        return bench_lexical(n=args.n, queries=args.queries, top_n=args.top_n)
+    if args.name == "rerank":
+        return bench_rerank(queries=args.queries, top_k=args.k)
+    if args.name == "concurrency":
+        return bench_concurrency(
+            queries=args.queries,
+            callers=_parse_int_list(args.callers),
+            workers=args.workers,
+            top_k=args.k,
+            encode=args.encode,
+        )
+    if args.name == "startup":
+        commands = [c.strip() for c in args.commands.split(",") if c.strip()] if args.commands else None
+        results = bench_startup(commands, repeat=args.repeat)
+        failed = [r["command"] for r in results if not r["ok"]]
+        if failed:
+            print(f"[!] Bütçeyi aşan / ağır paket yükleyen komutlar: {', '.join(failed)}")
+            sys.exit(1)
+        print("[✓] Tüm komutlar import bütçesi içinde")
+        return results
+    if args.name == "openai-embed":
+        return bench_openai_embed(
+            sample=args.sample,
+            concurrency_levels=_parse_int_list(args.concurrency),
+            request_tokens=args.request_tokens,
+            rps=args.rps,
+            fail_rate=args.fail_rate,
+            latency=args.latency,
+        )
+
+
+if __name__ == "__main__":
+    cli()
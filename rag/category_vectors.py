@@ -0,0 +1,127 @@
+# Category vectors - kategori önerisi için açıklama vektörleri ve chunk merkezleri
+#
+# Index kaydedilirken chunk store'un yanına yazılır, ilk suggest_categories'de açılır:
+#   category_desc.npy       : float32 (C, dim), CATEGORY_DESCRIPTIONS açıklamalarının sorgu formatında vektörleri
+#   category_centroids.npy  : float32 (C, dim), kategori chunk vektörlerinin normalize ortalaması (chunk yoksa 0)
+#   category_counts.npy     : int64 (C,), kategori başına chunk sayısı
+#   category_vectors.json   : kategori sırası + açıklama vektörlerinin anahtarı (model, sorgu formatı, açıklama hash'i)
+#
+# Açıklama vektörleri model/format/açıklama metni değişince geçersizdir; yükleme anahtarı
+# karşılaştırır, uymazsa açıklamalar process'te bir kez encode edilir. Merkezler sadece
+# index vektörlerine bağlıdır ve kategori adıyla eşlenir.
+import hashlib
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .config import CATEGORY_DESCRIPTIONS, LOCAL_EMBEDDING_MODEL, OPENAI_EMBEDDING_MODEL
+from .models import query_format
+
+DESC_VECTORS = "category_desc.npy"
+CENTROIDS = "category_centroids.npy"
+COUNTS = "category_counts.npy"
+META = "category_vectors.json"
+# Merkezler bu kadar satırlık bloklarla toplanır (float16 mmap'te tüm matris belleğe alınmaz)
+_BLOCK = 65536
+
+
+def descriptions_key(provider: str) -> dict:
+    """Açıklama vektörlerinin geçerli olduğu (model, format, açıklama metni) anahtarı."""
+    payload = json.dumps(CATEGORY_DESCRIPTIONS, ensure_ascii=False, sort_keys=True)
+    return {
+        "provider": provider,
+        "model": OPENAI_EMBEDDING_MODEL if provider == "openai" else LOCAL_EMBEDDING_MODEL,
+        "query_format": query_format(provider),
+        "descriptions_hash": hashlib.sha256(payload.encode("utf-8")).hexdigest(),
+    }
+
+
+def _category_parts(raw: str) -> list[str]:
+    # get_categories ile aynı bölme: "Etik, Metafizik" / "Etik/Metafizik"
+    return [c.strip() for c in raw.replace("/", ",").split(",") if c.strip()]
+
+
+def category_rows(category_to_indices: dict[str, np.ndarray], categories: list[str]) -> list[np.ndarray]:
+    """Her kategorinin chunk satırları (birden fazla kategorili chunk'lar hepsine girer)."""
+    wanted = {cat.lower(): i for i, cat in enumerate(categories)}
+    grouped: list[list[np.ndarray]] = [[] for _ in categories]
+    for raw, rows in category_to_indices.items():
+        for part in _category_parts(raw):
+            i = wanted.get(part.lower())
+            if i is not None:
+                grouped[i].append(np.asarray(rows, dtype=np.int64))
+    return [np.unique(np.concatenate(parts)) if parts else np.zeros(0, dtype=np.int64) for parts in grouped]
+
+
+def build_centroids(
+    vectors: np.ndarray,
+    vector_rows: np.ndarray | None,
+    category_to_indices: dict[str, np.ndarray],
+    categories: list[str],
+) -> tuple[np.ndarray, np.ndarray]:
+    """(merkezler (C, dim) float32 normalize, chunk sayıları (C,)); chunk'sız kategoride satır 0."""
+    dim = vectors.shape[1]
+    centroids = np.zeros((len(categories), dim), dtype=np.float32)
+    counts = np.zeros(len(categories), dtype=np.int64)
+    for i, rows in enumerate(category_rows(category_to_indices, categories)):
+        counts[i] = len(rows)
+        if not len(rows):
+            continue
+        matrix_rows = rows if vector_rows is None else np.asarray(vector_rows)[rows]
+        total = np.zeros(dim, dtype=np.float64)
+        for start in range(0, len(matrix_rows), _BLOCK):
+            total += np.asarray(vectors[matrix_rows[start:start + _BLOCK]], dtype=np.float32).sum(axis=0)
+        norm = np.linalg.norm(total)
+        if norm > 0:
+            centroids[i] = total / norm
+    return centroids, counts
+
+
+def write_category_vectors(
+    index_dir: Path,
+    desc_vectors: np.ndarray | None,
+    centroids: np.ndarray,
+    counts: np.ndarray,
+    key: dict,
+) -> None:
+    np.save(index_dir / CENTROIDS, np.ascontiguousarray(centroids, dtype=np.float32))
+    np.save(index_dir / COUNTS, np.asarray(counts, dtype=np.int64))
+    if desc_vectors is not None:
+        np.save(index_dir / DESC_VECTORS, np.ascontiguousarray(desc_vectors, dtype=np.float32))
+    else:
+        (index_dir / DESC_VECTORS).unlink(missing_ok=True)
+    with open(index_dir / META, "w", encoding="utf-8") as f:
+        meta = {"categories": list(CATEGORY_DESCRIPTIONS), "descriptions": key if desc_vectors is not None else None}
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def load_category_vectors(index_dir: Path, key: dict) -> dict | None:
+    """{"categories", "descriptions", "centroids", "counts"}; dosyalar yoksa (eski snapshot) None.
+
+    Anahtar uymuyorsa (model/format/açıklama değişmiş) "descriptions" None olur.
+    Satırlar CATEGORY_DESCRIPTIONS sırasına çevrilir; snapshot'ta olmayan kategorinin merkezi 0.
+    """
+    meta_path = index_dir / META
+    if not meta_path.exists() or not (index_dir / CENTROIDS).exists():
+        return None
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    stored = meta.get("categories") or []
+    centroids = np.load(index_dir / CENTROIDS)
+    counts = np.load(index_dir / COUNTS) if (index_dir / COUNTS).exists() else np.zeros(len(stored), dtype=np.int64)
+
+    categories = list(CATEGORY_DESCRIPTIONS)
+    descriptions = None
+    if stored == categories and meta.get("descriptions") == key and (index_dir / DESC_VECTORS).exists():
+        descriptions = np.load(index_dir / DESC_VECTORS)
+    if stored != categories:
+        position = {cat: i for i, cat in enumerate(stored)}
+        found = [position.get(cat, -1) for cat in categories]
+        padded = np.zeros((len(categories), centroids.shape[1]), dtype=np.float32)
+        padded_counts = np.zeros(len(categories), dtype=np.int64)
+        for i, j in enumerate(found):
+            if j >= 0:
+                padded[i], padded_counts[i] = centroids[j], counts[j]
+        centroids, counts = padded, padded_counts
+    return {"categories": categories, "descriptions": descriptions, "centroids": centroids, "counts": counts}
@@ -1,8 +1,7 @@
 # Chat - Agentic RAG sohbet arayüzü
-from openai import OpenAI
 import re
 
-from .config import CHAT_MODEL, TOP_K
+from .config import CHAT_MODEL, RETRIEVAL_MODE, TOP_K, load_env
 from .retriever import (
     search,
     multi_search,
@@ -33,6 +32,9 @@ _chat_client = None
 def get_chat_client():
     global _chat_client
     if _chat_client is None:
+        from openai import OpenAI
+
+        load_env()
         _chat_client = OpenAI()
     return _chat_client
 
@@ -243,8 +245,12 @@ def chat(
     auto_category: bool = False,
     date_from: str = None,
     date_to: str = None,
+    retrieval_mode: str = RETRIEVAL_MODE,
 ) -> str:
-    """Agentic RAG chat - akıllı routing + multi-query + kategori filtresi + hafıza."""
+    """Agentic RAG chat - akıllı routing + multi-query + kategori filtresi + hafıza.
+
+    retrieval_mode: "dense" (sadece vektör) veya "hybrid" (vektör + BM25).
+    """
     client = get_chat_client()
     docs: list[dict] = []
 
@@ -278,6 +284,7 @@ def chat(
             category=category,
             date_from=final_date_from,
             date_to=final_date_to,
+            mode=retrieval_mode,
         )
         context = format_context(docs)
         if context:
@@ -313,6 +320,7 @@ def chat(
                 category=category,
                 date_from=final_date_from,
                 date_to=final_date_to,
+                mode=retrieval_mode,
             )
             context = format_context(docs)
             if context:
@@ -327,6 +335,7 @@ def chat(
             category=category,
             date_from=final_date_from,
             date_to=final_date_to,
+            mode=retrieval_mode,
         )
         context = format_context(docs)
         if context:
@@ -490,6 +499,7 @@ def chat_loop(
     auto_category: bool = False,
     date_from: str = None,
     date_to: str = None,
+    retrieval_mode: str = RETRIEVAL_MODE,
 ):
     """İnteraktif chat döngüsü (konuşma hafızalı)."""
     print("=" * 60)
@@ -507,6 +517,7 @@ def chat_loop(
 
     if date_from or date_to:
         print(f"📅 Sabit tarih filtresi: {date_from or '...'} -> {date_to or '...'}")
+    print(f"🔎 Retrieval: {retrieval_mode}")
     
     print("💾 Konuşma hafızası aktif")
     print("Çıkmak için 'q' veya 'exit' yazın")
@@ -534,6 +545,7 @@ def chat_loop(
                 auto_category=auto_category,
                 date_from=date_from,
                 date_to=date_to,
+                retrieval_mode=retrieval_mode,
             )
             
             # Geçmişe ekle
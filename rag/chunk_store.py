@@ -0,0 +1,325 @@
+# Chunk store - chunk metinleri ve metadata için memory-mapped kolon formatı
+#
+# Disk düzeni (index klasöründe):
+#   chunks.bin          : tüm chunk metinleri art arda (UTF-8)
+#   chunk_offsets.npy   : int64, n+1 byte offset (chunk i = blob[off[i]:off[i+1]])
+#   meta_schema.json    : kolon listesi, tipleri ve sözlük (vocab) değerleri
+#   meta_<kolon>.npy    : "int" kolonlar için değerler, "cat" kolonlar için int32 kodlar (-1 = yok)
+import json
+import mmap
+import os
+import pickle
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+
+CHUNKS_BLOB = "chunks.bin"
+CHUNK_OFFSETS = "chunk_offsets.npy"
+META_SCHEMA = "meta_schema.json"
+LEGACY_CHUNKS = "chunks.pkl"
+LEGACY_METADATAS = "metadatas.pkl"
+
+MISSING_CODE = -1
+
+
+def _meta_column_file(name: str) -> str:
+    return f"meta_{name}.npy"
+
+
+def _build_columns(metadatas: list[dict]) -> tuple[dict, dict[str, np.ndarray]]:
+    """Metadata dict listesini tipli kolonlara çevir."""
+    n = len(metadatas)
+    field_order: list[str] = []
+    seen_fields = set()
+    for m in metadatas:
+        for key in m:
+            if key not in seen_fields:
+                seen_fields.add(key)
+                field_order.append(key)
+
+    fields = []
+    arrays: dict[str, np.ndarray] = {}
+    for name in field_order:
+        is_int = all(
+            name in m and isinstance(m[name], int) and not isinstance(m[name], bool)
+            for m in metadatas
+        )
+        if is_int:
+            arrays[name] = np.fromiter((m[name] for m in metadatas), dtype=np.int64, count=n)
+            fields.append({"name": name, "kind": "int"})
+            continue
+
+        vocab: dict = {}
+        codes = np.full(n, MISSING_CODE, dtype=np.int32)
+        for i, m in enumerate(metadatas):
+            if name not in m:
+                continue
+            value = m[name]
+            vkey = json.dumps(value, ensure_ascii=False, sort_keys=True)
+            code = vocab.get(vkey)
+            if code is None:
+                code = len(vocab)
+                vocab[vkey] = code
+            codes[i] = code
+        arrays[name] = codes
+        fields.append({"name": name, "kind": "cat", "values": [json.loads(k) for k in vocab]})
+
+    schema = {"num_rows": n, "fields": fields}
+    return schema, arrays
+
+
+class ChunkTexts(Sequence):
+    """Chunk metinleri; sadece erişilen chunk decode edilir."""
+
+    def __init__(self, blob, offsets: np.ndarray, file_handle=None):
+        self._blob = blob
+        self._offsets = offsets
+        self._file = file_handle
+
+    @classmethod
+    def open(cls, index_dir: Path) -> "ChunkTexts":
+        offsets = np.load(index_dir / CHUNK_OFFSETS, mmap_mode="r")
+        f = open(index_dir / CHUNKS_BLOB, "rb")
+        if int(offsets[-1]) == 0:
+            f.close()
+            return cls(b"", offsets)
+        blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(blob, offsets, f)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        n = len(self)
+        i = int(i)
+        if i < 0:
+            i += n
+        if i < 0 or i >= n:
+            raise IndexError("chunk index out of range")
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return self._blob[start:end].decode("utf-8")
+
+    def text_lengths(self) -> np.ndarray:
+        """Chunk başına byte uzunluğu (metin decode etmeden)."""
+        return np.diff(np.asarray(self._offsets))
+
+
+class ChunkMetadatas(Sequence):
+    """Kolon bazlı metadata; satır erişiminde dict üretir."""
+
+    def __init__(self, schema: dict, arrays: dict[str, np.ndarray]):
+        self._n = int(schema["num_rows"])
+        self._fields = schema["fields"]
+        self._arrays = arrays
+        self._vocabs = {f["name"]: f.get("values") for f in self._fields}
+
+    @classmethod
+    def from_records(cls, metadatas: list[dict]) -> "ChunkMetadatas":
+        schema, arrays = _build_columns(list(metadatas))
+        return cls(schema, arrays)
+
+    @classmethod
+    def open(cls, index_dir: Path) -> "ChunkMetadatas":
+        with open(index_dir / META_SCHEMA, encoding="utf-8") as f:
+            schema = json.load(f)
+        arrays = {
+            field["name"]: np.load(index_dir / _meta_column_file(field["name"]), mmap_mode="r")
+            for field in schema["fields"]
+        }
+        return cls(schema, arrays)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self._n))]
+        i = int(i)
+        if i < 0:
+            i += self._n
+        if i < 0 or i >= self._n:
+            raise IndexError("metadata index out of range")
+        row = {}
+        for field in self._fields:
+            name = field["name"]
+            value = self._arrays[name][i]
+            if field["kind"] == "int":
+                row[name] = int(value)
+            elif value != MISSING_CODE:
+                row[name] = self._vocabs[name][int(value)]
+        return row
+
+    def field_names(self) -> list[str]:
+        return [f["name"] for f in self._fields]
+
+    def column(self, name: str) -> np.ndarray | None:
+        """Ham kolon: int kolonlarda değerler, cat kolonlarda kodlar (-1 = yok)."""
+        return self._arrays.get(name)
+
+    def vocab(self, name: str) -> list | None:
+        """cat kolonunun kod -> değer tablosu (int kolonlarda None)."""
+        return self._vocabs.get(name)
+
+
+def write_chunk_store(index_dir: Path, chunks, metadatas) -> None:
+    """Chunk metinlerini ve metadata kolonlarını diske yaz."""
+    index_dir.mkdir(parents=True, exist_ok=True)
+
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    pos = 0
+    with open(index_dir / CHUNKS_BLOB, "wb") as f:
+        for i, chunk in enumerate(chunks):
+            data = chunk.encode("utf-8")
+            f.write(data)
+            pos += len(data)
+            offsets[i + 1] = pos
+    np.save(index_dir / CHUNK_OFFSETS, offsets)
+
+    schema, arrays = _build_columns(list(metadatas))
+    for name, arr in arrays.items():
+        np.save(index_dir / _meta_column_file(name), arr)
+    with open(index_dir / META_SCHEMA, "w", encoding="utf-8") as f:
+        json.dump(schema, f, ensure_ascii=False)
+
+
+def _raw_to_npy(raw_path: Path, dtype, npy_path: Path, block: int = 1 << 20) -> None:
+    """Ham (başlıksız) dizi dosyasını bloklar halinde .npy'ye çevir ve sil."""
+    n = os.path.getsize(raw_path) // np.dtype(dtype).itemsize
+    out = np.lib.format.open_memmap(npy_path, mode="w+", dtype=dtype, shape=(n,))
+    if n:
+        src = np.memmap(raw_path, dtype=dtype, mode="r", shape=(n,))
+        for start in range(0, n, block):
+            out[start:start + block] = src[start:start + block]
+        del src
+    out.flush()
+    del out
+    raw_path.unlink()
+
+
+class ChunkStoreWriter:
+    """Chunk store'u parça parça yazan writer (streaming build).
+
+    Metinler doğrudan chunks.bin'e, offset'ler ve kolon değerleri ham geçici dosyalara
+    eklenir; close() bunları write_chunk_store ile aynı formata çevirir. Bellekte sadece
+    "cat" kolonların sözlükleri (farklı değerler) kalır.
+    """
+
+    def __init__(self, index_dir: Path):
+        index_dir.mkdir(parents=True, exist_ok=True)
+        self.index_dir = index_dir
+        self.num_rows = 0
+        self._pos = 0
+        self._blob = open(index_dir / CHUNKS_BLOB, "wb")
+        self._offsets = open(self._raw(CHUNK_OFFSETS), "wb")
+        self._offsets.write(np.zeros(1, dtype=np.int64).tobytes())
+        # kolon adı -> {"kind": "int" | "cat", "file": ham dosya, "vocab": {json: kod}}
+        self._fields: dict[str, dict] = {}
+
+    def _raw(self, name: str) -> Path:
+        return self.index_dir / (name + ".raw")
+
+    def _add_field(self, name: str) -> dict:
+        # İlk satırdan beri olmayan kolon int olamaz (eksik satırlar -1 kodu alır)
+        field = {
+            "kind": "int" if self.num_rows == 0 else "cat",
+            "file": open(self._raw(_meta_column_file(name)), "wb"),
+            "vocab": {},
+        }
+        if self.num_rows:
+            field["file"].write(np.full(self.num_rows, MISSING_CODE, dtype=np.int32).tobytes())
+        self._fields[name] = field
+        return field
+
+    def _to_cat(self, name: str) -> None:
+        """int sanılan kolonda int olmayan değer geldi: yazılanları koda çevir."""
+        field = self._fields[name]
+        field["file"].close()
+        path = self._raw(_meta_column_file(name))
+        values = np.fromfile(path, dtype=np.int64)
+        codes = np.empty(len(values), dtype=np.int32)
+        vocab = field["vocab"]
+        for i, value in enumerate(values.tolist()):
+            codes[i] = vocab.setdefault(json.dumps(value), len(vocab))
+        field["file"] = open(path, "wb")
+        field["file"].write(codes.tobytes())
+        field["kind"] = "cat"
+
+    def append(self, chunks: list[str], metadatas: list[dict]) -> None:
+        offsets = np.empty(len(chunks), dtype=np.int64)
+        for i, chunk in enumerate(chunks):
+            data = chunk.encode("utf-8")
+            self._blob.write(data)
+            self._pos += len(data)
+            offsets[i] = self._pos
+        self._offsets.write(offsets.tobytes())
+
+        for m in metadatas:
+            for name in m:
+                if name not in self._fields:
+                    self._add_field(name)
+        for name, field in self._fields.items():
+            if field["kind"] == "int":
+                if all(name in m and isinstance(m[name], int) and not isinstance(m[name], bool) for m in metadatas):
+                    values = np.fromiter((m[name] for m in metadatas), dtype=np.int64, count=len(metadatas))
+                    field["file"].write(values.tobytes())
+                    continue
+                self._to_cat(name)
+            vocab = field["vocab"]
+            codes = np.full(len(metadatas), MISSING_CODE, dtype=np.int32)
+            for i, m in enumerate(metadatas):
+                if name in m:
+                    codes[i] = vocab.setdefault(json.dumps(m[name], ensure_ascii=False, sort_keys=True), len(vocab))
+            field["file"].write(codes.tobytes())
+        self.num_rows += len(chunks)
+
+    def close(self) -> None:
+        """Geçici dosyaları .npy'ye çevir ve şemayı yaz."""
+        self._blob.close()
+        self._offsets.close()
+        _raw_to_npy(self._raw(CHUNK_OFFSETS), np.int64, self.index_dir / CHUNK_OFFSETS)
+        fields = []
+        for name, field in self._fields.items():
+            field["file"].close()
+            dtype = np.int64 if field["kind"] == "int" else np.int32
+            _raw_to_npy(self._raw(_meta_column_file(name)), dtype, self.index_dir / _meta_column_file(name))
+            if field["kind"] == "int":
+                fields.append({"name": name, "kind": "int"})
+            else:
+                fields.append({"name": name, "kind": "cat", "values": [json.loads(k) for k in field["vocab"]]})
+        with open(self.index_dir / META_SCHEMA, "w", encoding="utf-8") as f:
+            json.dump({"num_rows": self.num_rows, "fields": fields}, f, ensure_ascii=False)
+
+    def abort(self) -> None:
+        """Yarıda kalan yazımın dosya tanıtıcılarını kapat (dizin çağıran tarafından silinir)."""
+        for handle in [self._blob, self._offsets] + [f["file"] for f in self._fields.values()]:
+            handle.close()
+
+
+def has_chunk_store(index_dir: Path) -> bool:
+    return (index_dir / META_SCHEMA).exists() and (index_dir / CHUNK_OFFSETS).exists()
+
+
+def has_legacy_pickles(index_dir: Path) -> bool:
+    return (index_dir / LEGACY_CHUNKS).exists() and (index_dir / LEGACY_METADATAS).exists()
+
+
+def read_legacy_pickles(index_dir: Path) -> tuple[list[str], list[dict]]:
+    with open(index_dir / LEGACY_CHUNKS, "rb") as f:
+        chunks = pickle.load(f)
+    with open(index_dir / LEGACY_METADATAS, "rb") as f:
+        metadatas = pickle.load(f)
+    return chunks, metadatas
+
+
+def load_chunk_store(index_dir: Path) -> tuple[Sequence, ChunkMetadatas]:
+    """Kolon formatını mmap ile aç; yoksa eski pickle formatına düş."""
+    if has_chunk_store(index_dir):
+        return ChunkTexts.open(index_dir), ChunkMetadatas.open(index_dir)
+    if has_legacy_pickles(index_dir):
+        chunks, metadatas = read_legacy_pickles(index_dir)
+        return chunks, ChunkMetadatas.from_records(metadatas)
+    raise FileNotFoundError(f"Chunk verisi bulunamadı: {index_dir}")
+
@@ -2,10 +2,6 @@
 import os
 import re
 from pathlib import Path
-from dotenv import load_dotenv
-
-# .env dosyasını yükle
-load_dotenv()
 
 # Paths
 BASE_DIR = Path(__file__).parent.parent
@@ -20,6 +16,15 @@ EMBEDDING_PROVIDER = "local"
 OPENAI_EMBEDDING_MODEL = "text-embedding-3-small"
 OPENAI_EMBEDDING_DIM = 1536
 
+# OpenAI index build istemcisi: istekler token sayısına göre paketlenir, N istek aynı anda uçuşta.
+# 429'da eşzamanlılık otomatik düşer; başarısız batch'ler tek tek yeniden denenir.
+OPENAI_EMBED_ASYNC = True
+OPENAI_EMBED_CONCURRENCY = 4
+OPENAI_EMBED_MAX_RETRIES = 6
+OPENAI_EMBED_MAX_INPUT_TOKENS = 8191  # input başına model limiti
+OPENAI_EMBED_MAX_REQUEST_TOKENS = 250000  # istek başına toplam (API limiti 300k)
+OPENAI_EMBED_MAX_INPUTS = 2048  # istek başına input sayısı
+
 # Local embedding (EMBEDDING_PROVIDER="local" için)
 # Seçenekler:
 #   - "intfloat/multilingual-e5-large" (genel multilingual)
@@ -36,6 +41,90 @@ INSTRUCT_TASK = "Given a Turkish search query, retrieve relevant passages writte
 # GPU kullan (True) veya CPU (False)
 USE_GPU = True
 
+# Modeller (embedding, reranker) process başına bir kez yüklenir (rag/models.py).
+# True: yüklemeden hemen sonra tek bir örnekle çalıştır, ilk sorgu gecikmesi yüklemeye taşınır.
+MODEL_WARMUP = True
+
+# Yerel embedding backend'i: "torch" (fp32 PyTorch) veya "onnx" (ONNX Runtime, int8, sadece CPU).
+# "onnx" ilk kullanımda modeli ONNX_CACHE_DIR altına export edip kuantize eder; PyTorch ile
+# cosine parity'si ONNX_PARITY_MIN altındaysa PyTorch'a döner. Gerekli: `onnx` extra'sı (uv sync --extra onnx)
+EMBEDDING_BACKEND = "torch"
+ONNX_CACHE_DIR = FAISS_INDEX_DIR / "onnx"
+ONNX_QUANTIZATION = "auto"  # "auto" | "avx2" | "avx512" | "avx512_vnni" | "arm64"
+ONNX_PARITY_MIN = 0.99
+
+# Index build batching (local provider)
+# "tokens": chunk'lar token uzunluğuna göre sıralanıp token bütçesine göre batch'lenir (az padding)
+# "fixed": korpus sırasıyla sabit sayıda chunk (eski davranış, karşılaştırma için)
+EMBEDDING_BATCHING = "tokens"
+EMBEDDING_TOKEN_BUDGET = 16384  # batch başına padding dahil token (batch_len * en uzun chunk)
+EMBEDDING_MAX_BATCH = 128
+
+# =============== EMBEDDING CACHE ===============
+# Chunk embedding'leri (metin + model + format + provider hash'i ile) diskte saklanır.
+# Tam rebuild veya chunk stratejisi değişiminde sadece yeni chunk'lar modele gider.
+USE_EMBEDDING_CACHE = True
+EMBEDDING_CACHE_PATH = FAISS_INDEX_DIR / "embedding_cache.sqlite"
+EMBEDDING_CACHE_MAX_MB = 2048
+
+# Sorgu embedding'leri: process içi LRU (normalize sorgu metni + model + format anahtarlı).
+# QUERY_CACHE_PERSIST açıkken ayrıca diskte (sadece hash anahtarı + vektör) tutulur;
+# eval/map tekrarları modeli hiç çağırmaz.
+QUERY_CACHE_SIZE = 4096  # LRU'da tutulacak sorgu sayısı (0: kapalı)
+QUERY_CACHE_PERSIST = True
+QUERY_CACHE_PATH = FAISS_INDEX_DIR / "query_cache.sqlite"
+QUERY_CACHE_MAX_MB = 256
+
+# =============== INDEX UPDATES ===============
+# update_index değişen/silinen makalelerin chunk'larını chunk_id ile index'ten çıkarır.
+# remove_ids desteklemeyen index tiplerinde ID'ler tombstone olarak tutulur; tombstone
+# oranı bu eşiği geçince index canlı vektörlerden yeniden yazılır (compaction).
+INDEX_COMPACT_THRESHOLD = 0.2
+
+# Her build/update index klasöründe snapshots/<versiyon>/ altına yazılır ve CURRENT
+# dosyası atomik olarak yeni versiyona çevrilir; en yeni N snapshot saklanır.
+# Açık process'ler (chat, API) CURRENT değişince yeni snapshot'ı arka planda yükleyip geçer.
+INDEX_KEEP_SNAPSHOTS = 3
+INDEX_HOT_RELOAD = True
+INDEX_RELOAD_CHECK_SECONDS = 5.0  # CURRENT en fazla bu sıklıkla kontrol edilir
+
+# =============== VECTOR INDEX ===============
+# FAISS index tipi: "flat" (kesin, brute-force), "ivf_flat", "hnsw", "ivf_pq"
+# IVF/PQ tipleri build sırasında vektör örneğiyle eğitilir. Tip değişince `index --full` gerekir.
+FAISS_INDEX_TYPE = "flat"
+INDEX_TRAIN_SAMPLE = 100_000  # eğitimde kullanılacak en fazla vektör
+IVF_NLIST = 0  # 0: otomatik (~4*sqrt(n))
+IVF_NPROBE = 16  # sorgu başına taranan liste (search(nprobe=...) ile ezilebilir)
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 128  # search(ef_search=...) ile ezilebilir
+PQ_M = 64  # alt-vektör sayısı; boyutu bölmeli (1024 / 64 = 16)
+PQ_NBITS = 8
+
+# Kompakt mod: ilk geçiş aramada vektörler sıkıştırılmış kodlarla tutulur.
+# "float32" (sıkıştırma yok), "sq8" (vektör başına dim byte, 4x), "pq" (PQ_M byte, 1024-dim'de 64x)
+# Sıkıştırılmış index'lerde vektörlerin float16 kopyası (mmap) en iyi adayları kesin skorla yeniden sıralar.
+INDEX_CODEC = "float32"
+RESCORE_OVERSAMPLE = 4  # ilk geçişte top_n * bu kadar aday çekilir, float16 ile yeniden skorlanır
+
+
+_env_loaded = False
+
+
+def load_env() -> None:
+    """.env dosyasını (bir kez) yükle.
+
+    Import sırasında değil, API anahtarı / HF token gereken yerde (istemci veya model
+    yüklenirken) çağrılır; böylece stats/doctor gibi komutlar dotenv'e ödeme yapmaz.
+    """
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    _env_loaded = True
+
 
 def _safe_segment(value: str) -> str:
     value = (value or "").strip().lower()
@@ -75,14 +164,35 @@ TOP_K = 5
 USE_MMR = True
 MMR_LAMBDA = 0.72
 
+# multi_search: sorgu başına aday listeleri reciprocal rank fusion ile birleşir (1 / (RRF_K + sıra))
+RRF_K = 60
+
+# Hibrit arama: FAISS adayları BM25 (sözcük) adaylarıyla RRF ile birleşir; isim/terim
+# sorgularında ("Gettier", "qualia") kaçan chunk'ları yakalar. Ters index build'de yazılır.
+# "dense": sadece vektör, "hybrid": vektör + BM25 (search/multi_search mode=... ile ezilebilir)
+RETRIEVAL_MODE = "hybrid"
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# asearch / amulti_search: aramalar (sorgu encode + FAISS + BM25) bu boyuttaki thread havuzunda
+# çalışır, event loop bloklanmaz. FAISS ve torch hesap sırasında GIL'i bırakır.
+RETRIEVAL_WORKERS = 4
+
 # Reranker (opsiyonel, yavaş ama daha isabetli)
 USE_RERANKER = False
 RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
 RERANK_TOP_N = 30
 RERANK_WEIGHT = 0.25
+RERANK_BATCH_SIZE = 32  # cross-encoder predict batch'i (eksik çiftlerin hepsi tek predict çağrısında)
+RERANK_CACHE_SIZE = 20000  # (sorgu, chunk_id) -> skor LRU'su (0: kapalı)
+# Dense top-1 ile top-k skoru arasındaki fark bunu geçerse sıralama net sayılır, reranker atlanır (0: hep çalışır)
+RERANK_SKIP_MARGIN = 0.1
 
 # Semantic kategori öneri
 SEMANTIC_CATEGORY_MIN_CHUNKS = 10
+# Skor = (1 - w) * açıklama benzerliği + w * kategori chunk merkezi benzerliği (0: sadece açıklama).
+# Açıklama vektörleri ve merkezler build'de index klasörüne yazılır; chunk'ı olmayan kategoride sadece açıklama.
+CATEGORY_CENTROID_WEIGHT = 0.0
 
 # Otomatik kategori tespiti için açıklamalar (Zero-shot routing)
 CATEGORY_DESCRIPTIONS = {
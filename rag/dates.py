@@ -0,0 +1,74 @@
+# Dates - metadata ve kullanıcı filtrelerindeki tarihlerin parse edilmesi
+#
+# numpy/faiss gerektirmez; stats ve doctor gibi hafif komutlar index yüklemeden kullanır.
+import re
+from datetime import date
+
+
+TR_MONTHS = {
+    "ocak": 1,
+    "şubat": 2,
+    "subat": 2,
+    "mart": 3,
+    "nisan": 4,
+    "mayıs": 5,
+    "mayis": 5,
+    "haziran": 6,
+    "temmuz": 7,
+    "ağustos": 8,
+    "agustos": 8,
+    "eylül": 9,
+    "eylul": 9,
+    "ekim": 10,
+    "kasım": 11,
+    "kasim": 11,
+    "aralık": 12,
+    "aralik": 12,
+}
+
+
+def _safe_date(y: int, m: int, d: int) -> date | None:
+    try:
+        return date(y, m, d)
+    except ValueError:
+        return None
+
+
+def parse_date_string(raw: str) -> date | None:
+    """Metadata veya kullanıcı filtresinden tarih parse et."""
+    text = (raw or "").strip()
+    if not text:
+        return None
+
+    # ISO tarzı: 2024-03-18 veya 2024-03-18T...
+    m = re.search(r"(\d{4})-(\d{2})-(\d{2})", text)
+    if m:
+        parsed = _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+        if parsed:
+            return parsed
+
+    # DD.MM.YYYY veya DD/MM/YYYY
+    m = re.search(r"\b(\d{1,2})[./](\d{1,2})[./](\d{4})\b", text)
+    if m:
+        parsed = _safe_date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
+        if parsed:
+            return parsed
+
+    # "18 Mart 2021"
+    m = re.search(r"\b(\d{1,2})\s+([A-Za-zÇĞİÖŞÜçğıöşü]+)\s+(\d{4})\b", text)
+    if m:
+        day = int(m.group(1))
+        month_name = m.group(2).lower()
+        month = TR_MONTHS.get(month_name)
+        year = int(m.group(3))
+        if month:
+            parsed = _safe_date(year, month, day)
+            if parsed:
+                return parsed
+
+    # Sadece yıl
+    m = re.search(r"\b(19\d{2}|20\d{2})\b", text)
+    if m:
+        return date(int(m.group(1)), 1, 1)
+
+    return None
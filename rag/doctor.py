@@ -1,8 +1,9 @@
 from collections import Counter
 from pathlib import Path
 
-from .config import CONTENT_DIR
-from .retriever import load_index, parse_date_string
+from .config import CONTENT_DIR, get_index_path
+from .dates import parse_date_string
+from .snapshots import current_version
 
 
 def _read_url_from_file(path: Path) -> str:
@@ -49,7 +50,10 @@ def build_doctor_report() -> dict:
             if parse_date_string(raw_date):
                 raw_date_ok += 1
 
-    index, chunks, metadatas, _ = load_index()
+    # faiss/numpy sadece index raporu için gerekiyor
+    from .retriever import load_index
+
+    index, chunks, metadatas, config = load_index()
     idx_url_counter = Counter((m.get("url") or "").strip() for m in metadatas if (m.get("url") or "").strip())
     idx_cat_counter = Counter((m.get("category") or "").strip() for m in metadatas if (m.get("category") or "").strip())
 
@@ -89,6 +93,9 @@ def build_doctor_report() -> dict:
             "date_parse_rate": (idx_date_ok / idx_date_total) if idx_date_total else 0.0,
             "top_duplicate_urls": idx_url_counter.most_common(5),
             "index_dim": index.d,
+            "index_type": config.get("index_type", "flat"),
+            "snapshot": current_version(get_index_path()) or "-",
+            "tombstones": max(0, index.ntotal - idx_chunks_n),
         },
         "coverage": {
             "raw_urls_missing_in_index": len(set(raw_url_counter) - set(idx_url_counter)),
@@ -126,6 +133,9 @@ def run_doctor() -> dict:
     print(f"Index categories    : {idx['categories']}")
     print(f"Index date parse rate: {idx['date_parse_rate']:.3f}")
     print(f"Index dim           : {idx['index_dim']}")
+    print(f"Index type          : {idx['index_type']}")
+    print(f"Index snapshot      : {idx['snapshot']}")
+    print(f"Index tombstones    : {idx['tombstones']}")
 
     _print_section("Coverage")
     print(f"Raw URLs missing in index: {cov['raw_urls_missing_in_index']}")
@@ -146,6 +156,8 @@ def run_doctor() -> dict:
         print("- Indexte aynı URL'den çok chunk var: hybrid+MMR açık tutun, gerekirse max chunk per URL sınırı ekleyin.")
     if cov["raw_urls_missing_in_index"] > 0:
         print("- Bazı raw URL'ler indexte yok: `python main.py index --full` ile temiz rebuild önerilir.")
+    if idx["tombstones"] > 0:
+        print("- Indexte silinmiş chunk vektörleri var: `python main.py index --compact` ile temizleyin.")
     if raw["date_parse_rate"] < 0.8:
         print("- DATE metadata formatlarını normalize edin (ISO önerilir) ki tarih filtresi daha etkili olsun.")
     if (
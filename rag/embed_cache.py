@@ -0,0 +1,254 @@
+# Embedding cache - chunk embedding'lerini diskte sakla (content-hash anahtarlı)
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+# SQLite "IN (...)" sorgularında tek seferde gönderilecek anahtar sayısı
+_QUERY_CHUNK = 500
+# Limit aşılınca cache bu orana kadar budanır (her put'ta eviction yapmamak için)
+_EVICT_TARGET_RATIO = 0.9
+
+
+def embedding_cache_key(text: str, provider: str, model: str, mode: str) -> str:
+    """Chunk metni + provider + model + format modundan cache anahtarı üret."""
+    h = hashlib.sha256()
+    for part in (provider, model, mode, text):
+        h.update(part.encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite tabanlı, boyut sınırlı (LRU eviction) embedding cache'i."""
+
+    def __init__(self, path: Path, max_bytes: int):
+        self.path = Path(path)
+        self.max_bytes = int(max_bytes)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Sorgu cache'i farklı thread'lerden (kilit altında) kullanabilir
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " dim INTEGER NOT NULL,"
+            " vec BLOB NOT NULL,"
+            " nbytes INTEGER NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def get_many(self, keys: list[str], dim: int) -> dict[str, np.ndarray]:
+        """Cache'te bulunan anahtarların vektörlerini döndür (boyutu uymayanlar miss sayılır)."""
+        found: dict[str, np.ndarray] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), _QUERY_CHUNK):
+            part = unique_keys[start:start + _QUERY_CHUNK]
+            placeholders = ",".join("?" * len(part))
+            rows = self._conn.execute(
+                f"SELECT key, dim, vec FROM embeddings WHERE key IN ({placeholders})",
+                part,
+            ).fetchall()
+            for key, row_dim, blob in rows:
+                if int(row_dim) != dim:
+                    continue
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(now, k) for k in found],
+            )
+            self._conn.commit()
+
+        hit_n = sum(1 for k in keys if k in found)
+        self.hits += hit_n
+        self.misses += len(keys) - hit_n
+        return found
+
+    def put_many(self, items: list[tuple[str, np.ndarray]]) -> None:
+        """Yeni embedding'leri yaz, gerekirse eski kayıtları buda."""
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, vec in items:
+            arr = np.ascontiguousarray(vec, dtype=np.float32)
+            blob = arr.tobytes()
+            rows.append((key, int(arr.shape[-1]), blob, len(blob), now))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (key, dim, vec, nbytes, last_used) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+        self._conn.commit()
+        self._evict_if_needed()
+
+    def total_bytes(self) -> int:
+        row = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()
+        return int(row[0])
+
+    def _evict_if_needed(self) -> None:
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        target = int(self.max_bytes * _EVICT_TARGET_RATIO)
+        to_delete = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM embeddings ORDER BY last_used ASC"):
+            if total <= target:
+                break
+            to_delete.append((key,))
+            total -= int(nbytes)
+
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", to_delete)
+        self._conn.commit()
+        self.evicted += len(to_delete)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "evicted": self.evicted,
+            "size_bytes": self.total_bytes(),
+            "max_bytes": self.max_bytes,
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class QueryEmbeddingCache:
+    """Sorgu embedding'leri için process içi LRU; opsiyonel olarak diskte (EmbeddingCache) kalıcı."""
+
+    def __init__(self, max_items: int, disk: EmbeddingCache | None = None):
+        self.max_items = max(0, int(max_items))
+        self.disk = disk
+        self._items: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str, dim: int = 0) -> np.ndarray | None:
+        """(1, dim) vektörün kopyası; yoksa None. dim=0 iken disk'e bakılmaz."""
+        with self._lock:
+            vec = self._items.get(key)
+            if vec is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return vec.copy()
+            if self.disk is not None and dim > 0:
+                found = self.disk.get_many([key], dim).get(key)
+                if found is not None:
+                    vec = found.reshape(1, -1)
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+                    return vec.copy()
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vec: np.ndarray) -> None:
+        vec = np.array(vec, dtype=np.float32).reshape(1, -1)
+        with self._lock:
+            self._remember(key, vec)
+            if self.disk is not None:
+                self.disk.put_many([(key, vec[0])])
+
+    def _remember(self, key: str, vec: np.ndarray) -> None:
+        if self.max_items <= 0:
+            return
+        self._items[key] = vec
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": ((self.hits + self.disk_hits) / lookups) if lookups else 0.0,
+            "size": len(self._items),
+            "max_items": self.max_items,
+            "disk_bytes": self.disk.total_bytes() if self.disk is not None else 0,
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+
+class RerankScoreCache:
+    """(snapshot, sorgu, chunk_id) -> cross-encoder ham skoru için process içi LRU.
+
+    Tam rebuild chunk_id'leri baştan dağıttığı için anahtar snapshot adını da içerir;
+    hot reload sonrası eski snapshot'ın skorları kullanılmaz, LRU'dan zamanla düşer.
+    """
+
+    def __init__(self, max_items: int):
+        self.max_items = max(0, int(max_items))
+        self._items: OrderedDict[tuple, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, keys: list[tuple]) -> dict[tuple, float]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                score = self._items.get(key)
+                if score is None:
+                    self.misses += 1
+                    continue
+                self._items.move_to_end(key)
+                found[key] = score
+                self.hits += 1
+        return found
+
+    def put_many(self, scores: dict[tuple, float]) -> None:
+        if self.max_items <= 0:
+            return
+        with self._lock:
+            for key, score in scores.items():
+                self._items[key] = float(score)
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            "size": len(self._items),
+            "max_items": self.max_items,
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
@@ -0,0 +1,142 @@
+# Embedding pool - CPU'da çok process'li passage embedding
+#
+# Tek bir SentenceTransformer.encode çağrısı büyük (1024-dim) modelde tüm
+# çekirdekleri doyurmuyor. Pool, her biri kendi model kopyasına ve sabit thread
+# sayısına sahip worker process'ler başlatır; batch'ler worker'lara dağıtılır.
+import io
+import os
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .config import EMBEDDING_BACKEND, LOCAL_EMBEDDING_MODEL, load_env
+
+_worker_model = None
+_worker_backend = "torch"
+_THREAD_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+
+@contextlib.contextmanager
+def _worker_thread_env(threads: int):
+    """Spawn edilen worker'ların miras alacağı BLAS/OpenMP thread değişkenleri.
+
+    numpy BLAS havuzunu import sırasında kurar; worker bu modülü (ve numpy'ı)
+    initializer'dan önce import ettiği için değişkenler spawn anında ortamda olmalı.
+    """
+    saved = {var: os.environ.get(var) for var in _THREAD_VARS}
+    os.environ.update({var: str(threads) for var in _THREAD_VARS})
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _init_worker(threads: int) -> None:
+    """Worker başlangıcı: torch thread sayısını sabitle, modeli CPU'ya yükle."""
+    global _worker_model, _worker_backend
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    os.environ.setdefault("HF_HUB_DISABLE_PROGRESS_BARS", "1")
+    load_env()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    torch.set_num_interop_threads(1)
+    if EMBEDDING_BACKEND == "onnx":
+        from .onnx_backend import load_onnx_model
+
+        # Export ebeveynde yapıldı; worker sadece int8 modeli açar
+        _worker_model = load_onnx_model(threads)
+        if _worker_model is not None:
+            _worker_backend = "onnx-int8"
+            return
+    with contextlib.redirect_stderr(io.StringIO()):
+        _worker_model = SentenceTransformer(LOCAL_EMBEDDING_MODEL, device="cpu")
+
+
+def _worker_info() -> dict:
+    import torch
+
+    return {
+        "pid": os.getpid(),
+        "threads": torch.get_num_threads(),
+        "max_seq_length": int(_worker_model.max_seq_length),
+        "backend": _worker_backend,
+    }
+
+
+def _encode_batch(texts: list[str]) -> np.ndarray:
+    """Önceden formatlanmış (instruct/prefix uygulanmış) metinleri embed et."""
+    embeddings = _worker_model.encode(
+        texts,
+        batch_size=max(1, len(texts)),
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True,
+    )
+    return embeddings.astype(np.float32)
+
+
+class EmbeddingPool:
+    """Her worker'ı kendi model kopyasıyla çalışan CPU embedding havuzu."""
+
+    def __init__(self, workers: int, threads_per_worker: int | None = None):
+        self.workers = max(1, int(workers))
+        cpu = os.cpu_count() or 1
+        self.threads_per_worker = threads_per_worker or max(1, cpu // self.workers)
+        if EMBEDDING_BACKEND == "onnx":
+            from .onnx_backend import export_onnx_model, onnx_available
+
+            # Worker'lar aynı anda export etmesin
+            if onnx_available():
+                export_onnx_model()
+        # spawn: ebeveyn process'te torch yüklüyse fork güvenli değil.
+        ctx = multiprocessing.get_context("spawn")
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(self.threads_per_worker,),
+        )
+        # Tüm worker'ları ayağa kaldır (model yükleme build süresine karışmasın).
+        # spawn ilk submit'te olur; worker'lar thread değişkenlerini o anki ortamdan alır.
+        with _worker_thread_env(self.threads_per_worker):
+            infos = [self._executor.submit(_worker_info) for _ in range(self.workers * 2)]
+            first = infos[0].result()
+        self.max_seq_length = first["max_seq_length"]
+        # Worker'ların gerçekte yüklediği backend (ONNX açılamadıysa "torch"); cache anahtarına girer
+        backends = {first["backend"]} | {f.result()["backend"] for f in infos[1:]}
+        if len(backends) > 1:
+            self.close()
+            raise RuntimeError(f"Embedding worker'ları farklı backend yükledi: {sorted(backends)}")
+        self.backend = first["backend"]
+        self._tokenizer = None
+
+    @property
+    def tokenizer(self):
+        """Token uzunluğu hesabı için sadece tokenizer (model ebeveynde yüklenmez)."""
+        if self._tokenizer is None:
+            from transformers import AutoTokenizer
+
+            self._tokenizer = AutoTokenizer.from_pretrained(LOCAL_EMBEDDING_MODEL)
+        return self._tokenizer
+
+    def map(self, batches: list[list[str]]):
+        """Batch'leri worker'lara dağıt; sonuçlar giriş sırasıyla döner."""
+        return self._executor.map(_encode_batch, batches)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
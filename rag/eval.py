@@ -3,8 +3,9 @@ import json
 import random
 from pathlib import Path
 
-from .config import BASE_DIR, TOP_K
-from .retriever import load_index, search, suggest_categories
+from .config import BASE_DIR, RETRIEVAL_MODE, TOP_K, get_index_path
+from .retriever import RETRIEVAL_MODES, exact_search_index, load_index, query_cache_stats, search, suggest_categories
+from .snapshots import resolve_index_dir
 
 DEFAULT_EVAL_PATH = BASE_DIR / "rag" / "eval_dataset.jsonl"
 
@@ -71,6 +72,7 @@ def evaluate_retrieval(
     dataset: list[dict],
     top_k: int = TOP_K,
     use_category_filter: bool = False,
+    mode: str = RETRIEVAL_MODE,
 ) -> dict:
     if not dataset:
         return {
@@ -79,6 +81,7 @@ def evaluate_retrieval(
             "mrr": 0.0,
             "category_top1_acc": 0.0,
             "top_k": top_k,
+            "mode": mode,
         }
 
     hits = 0
@@ -99,6 +102,7 @@ def evaluate_retrieval(
             category=category or None,
             date_from=date_from,
             date_to=date_to,
+            mode=mode,
         )
         found_rank = None
         for i, d in enumerate(docs, 1):
@@ -127,6 +131,7 @@ def evaluate_retrieval(
         "category_top1_acc": (cat_hits / cat_total) if cat_total else 0.0,
         "top_k": top_k,
         "use_category_filter": use_category_filter,
+        "mode": mode,
     }
 
 
@@ -137,6 +142,8 @@ def run_eval(
     seed: int = 42,
     top_k: int = TOP_K,
     use_category_filter: bool = False,
+    compare_exact: bool = True,
+    mode: str = RETRIEVAL_MODE,
 ) -> dict:
     if create_if_missing and not dataset_path.exists():
         created = create_eval_dataset(dataset_path, sample_size=sample_size, seed=seed)
@@ -149,6 +156,7 @@ def run_eval(
         dataset=dataset,
         top_k=top_k,
         use_category_filter=use_category_filter,
+        mode=mode,
     )
 
     print()
@@ -158,15 +166,51 @@ def run_eval(
     print(f"Dataset path        : {dataset_path}")
     print(f"Samples             : {metrics['count']}")
     print(f"Top-K               : {metrics['top_k']}")
+    print(f"Retrieval mode      : {metrics['mode']}")
     print(f"Use category filter : {metrics['use_category_filter']}")
     print(f"Hit@K               : {metrics['hit_at_k']:.3f}")
     print(f"MRR                 : {metrics['mrr']:.3f}")
     print(f"Category Top1 Acc   : {metrics['category_top1_acc']:.3f}")
+    qc = query_cache_stats()
+    if qc:
+        print(f"Query cache         : {qc['hits']} hit, {qc['disk_hits']} disk hit, {qc['misses']} miss (hit-rate {qc['hit_rate'] * 100:.1f}%)")
     print("=" * 64)
 
+    # Kompakt (sq8/pq) index'te kesin aramaya göre kaybı da raporla
+    if compare_exact and load_index()[3].get("index_codec", "float32") != "float32":
+        metrics["exact"] = _compare_exact(dataset, metrics, top_k, use_category_filter, mode)
+
     return metrics
 
 
+def _compare_exact(
+    dataset: list[dict], metrics: dict, top_k: int, use_category_filter: bool, mode: str = RETRIEVAL_MODE
+) -> dict | None:
+    """Kompakt (sq8/pq) index'i float16 kopyadan kurulan kesin index ile karşılaştır."""
+    index, _, _, config = load_index()
+    codec = config.get("index_codec", "float32")
+    with exact_search_index() as swapped:
+        if not swapped:
+            print("[!] float16 vektör kopyası yok; kesin arama karşılaştırması atlandı.")
+            return None
+        exact = evaluate_retrieval(dataset=dataset, top_k=top_k, use_category_filter=use_category_filter, mode=mode)
+
+    index_bytes = (resolve_index_dir(get_index_path()) / "index.faiss").stat().st_size
+    per_vector = index_bytes / max(1, index.ntotal)
+    float32_per_vector = index.d * 4
+
+    print()
+    print("=" * 64)
+    print(f"Compact vs Exact ({config.get('index_type', 'flat')} / {codec})")
+    print("=" * 64)
+    print(f"{'':20}{'compact':>10}{'exact':>10}{'loss':>10}")
+    for key, label in (("hit_at_k", "Hit@K"), ("mrr", "MRR")):
+        print(f"{label:20}{metrics[key]:>10.3f}{exact[key]:>10.3f}{exact[key] - metrics[key]:>10.3f}")
+    print(f"Index bytes/vector  : {per_vector:.0f} (float32: {float32_per_vector}, {float32_per_vector / per_vector:.1f}x küçük)")
+    print("=" * 64)
+    return exact
+
+
 def cli(argv: list[str] | None = None) -> dict:
     parser = argparse.ArgumentParser(description="RAG retrieval değerlendirme")
     parser.add_argument("--dataset", default=str(DEFAULT_EVAL_PATH), help="JSONL eval dataset path")
@@ -175,6 +219,17 @@ def cli(argv: list[str] | None = None) -> dict:
     parser.add_argument("--seed", type=int, default=42, help="Rastgele seed")
     parser.add_argument("--k", type=int, default=TOP_K, help="Top-K")
     parser.add_argument("--kategori", action="store_true", help="Aramada category filtresi uygula")
+    parser.add_argument(
+        "--mode",
+        choices=RETRIEVAL_MODES,
+        default=RETRIEVAL_MODE,
+        help="dense: sadece vektör, hybrid: vektör + BM25 (RRF)",
+    )
+    parser.add_argument(
+        "--skip-exact",
+        action="store_true",
+        help="Kompakt (sq8/pq) index'te kesin arama karşılaştırmasını atla",
+    )
     args = parser.parse_args(argv)
 
     dataset_path = Path(args.dataset)
@@ -189,6 +244,8 @@ def cli(argv: list[str] | None = None) -> dict:
         seed=args.seed,
         top_k=args.k,
         use_category_filter=args.kategori,
+        compare_exact=not args.skip_exact,
+        mode=args.mode,
     )
 
 
@@ -1,10 +1,17 @@
 # Indexer - Dokümanları FAISS'e indexle
 import os
-import io
 import json
-import pickle
+import hashlib
+import queue
 import re
+import shutil
+import threading
+import time
 import contextlib
+import multiprocessing
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
 from tqdm import tqdm
 
@@ -16,102 +23,178 @@ from .config import (
     EMBEDDING_PROVIDER,
     OPENAI_EMBEDDING_MODEL, OPENAI_EMBEDDING_DIM,
     LOCAL_EMBEDDING_MODEL, LOCAL_EMBEDDING_DIM,
-    USE_GPU, USE_INSTRUCT_FORMAT, INSTRUCT_TASK,
+    USE_INSTRUCT_FORMAT, INSTRUCT_TASK,
     CHUNK_STRATEGY, CHUNK_SIZE, CHUNK_OVERLAP,
-    MIN_PARAGRAPH_LENGTH, MAX_PARAGRAPH_LENGTH
+    MIN_PARAGRAPH_LENGTH, MAX_PARAGRAPH_LENGTH,
+    USE_EMBEDDING_CACHE, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB,
+    EMBEDDING_BATCHING, EMBEDDING_TOKEN_BUDGET, EMBEDDING_MAX_BATCH,
+    OPENAI_EMBED_ASYNC,
+    INDEX_COMPACT_THRESHOLD,
+    FAISS_INDEX_TYPE,
+    CATEGORY_DESCRIPTIONS,
 )
+from .embed_cache import EmbeddingCache, embedding_cache_key
+from .models import embedding_backend, encode_queries, get_local_model, get_openai_client
+from .vector_index import (
+    RESCORE_VECTORS,
+    build_vector_index,
+    configure_index,
+    ivf_nlist,
+    is_id_mapped,
+    needs_vector_copy,
+    new_id_index,
+    open_rescore_vectors,
+    resident_vectors,
+    write_rescore_vectors,
+)
+from .chunk_store import (
+    ChunkMetadatas,
+    ChunkStoreWriter,
+    ChunkTexts,
+    has_legacy_pickles,
+    load_chunk_store,
+    read_legacy_pickles,
+    write_chunk_store,
+)
+from .category_vectors import build_centroids, descriptions_key, write_category_vectors
+from .lexical import write_lexical_index
+from .meta_cache import load_metadata_caches, write_metadata_caches
+from .snapshots import has_index, link_unchanged, new_snapshot_dir, publish_snapshot, resolve_index_dir
 
 # Lazy imports
-_openai_client = None
-_local_model = None
+_embedding_cache = None
+_embedding_pool = None
 
 
-def _silence_hf_progress() -> None:
-    """HuggingFace/Transformers progress bar ve gürültülü logları kapat."""
-    os.environ.setdefault("HF_HUB_DISABLE_PROGRESS_BARS", "1")
-    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
-
+def _parse_document(txt_file: Path, content_dir: Path) -> dict | None:
+    """Tek .txt dosyasını header metadata + gövde olarak parse et."""
     try:
-        from huggingface_hub.utils import disable_progress_bars
+        content = txt_file.read_text(encoding="utf-8")
+        
+        # Metadata parse et
+        lines = content.split("\n")
+        metadata = {}
+        body_start = 0
+        
+        for i, line in enumerate(lines):
+            if line.startswith("TITLE:"):
+                metadata["title"] = line[6:].strip()
+            elif line.startswith("URL:"):
+                metadata["url"] = line[4:].strip()
+            elif line.startswith("DATE:"):
+                metadata["date"] = line[5:].strip()
+            elif line.startswith("AUTHOR:"):
+                metadata["author"] = line[7:].strip()
+            elif line.startswith("CATEGORIES:"):
+                metadata["categories"] = line[11:].strip()
+            elif line.strip() == "-----":
+                body_start = i + 1
+                break
+        
+        body = "\n".join(lines[body_start:]).strip()
+        metadata["category"] = txt_file.parent.name
+        metadata["filename"] = txt_file.name
+        metadata["relative_path"] = str(txt_file.relative_to(content_dir))
+        
+        return {
+            "content": body,
+            "metadata": metadata
+        }
+    except Exception as e:
+        print(f"[!] Error loading {txt_file}: {e}")
+        return None
 
-        disable_progress_bars()
-    except Exception:
-        pass
 
-    try:
-        from transformers.utils import logging as hf_logging
-
-        hf_logging.set_verbosity_error()
-        hf_logging.disable_progress_bar()
-    except Exception:
-        pass
-
-
-def get_openai_client():
-    global _openai_client
-    if _openai_client is None:
-        from openai import OpenAI
-        _openai_client = OpenAI()
-    return _openai_client
-
-
-def get_local_model():
-    global _local_model
-    if _local_model is None:
-        _silence_hf_progress()
-        from sentence_transformers import SentenceTransformer
-        import torch
-        device = "cuda" if USE_GPU and torch.cuda.is_available() else "cpu"
-        print(f"[i] Loading local embedding model on: {device.upper()}")
-        if device == "cuda":
-            print(f"    GPU: {torch.cuda.get_device_name(0)}")
-        # SentenceTransformer model load sırasında çıkan "Loading weights" barını bastır.
-        with contextlib.redirect_stderr(io.StringIO()):
-            _local_model = SentenceTransformer(LOCAL_EMBEDDING_MODEL, device=device)
-    return _local_model
-
-
-def load_documents(content_dir: Path = CONTENT_DIR) -> list[dict]:
+# Process pool'a tek görevde gönderilen dosya/metin sayısı
+POOL_SHARD_SIZE = 32
+
+
+def _list_document_files(content_dir: Path) -> list[Path]:
+    """.txt dosyaları, sıralı (doc_idx her çalıştırmada aynı kalsın)."""
+    return sorted(content_dir.rglob("*.txt"))
+
+
+def _shards(items: list, size: int = POOL_SHARD_SIZE) -> list[list]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _ordered_pool_map(fn, shards, workers: int):
+    """Shard'ları process pool'da işle, sonuçları giriş sırasıyla döndür.
+
+    Aynı anda en fazla workers * 4 shard uçuşta tutulur; tüketici yavaşsa
+    üretim de bekler (streaming build belleği sınırlı kalır).
+    """
+    if workers <= 1:
+        for shard in shards:
+            yield fn(shard)
+        return
+
+    # spawn: torch/thread'ler yüklüyken fork etmek güvenli değil.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+        pending = deque()
+        for shard in shards:
+            pending.append(executor.submit(fn, shard))
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _parse_shard(paths: list[Path], content_dir: Path) -> list[dict]:
+    docs = []
+    for path in paths:
+        doc = _parse_document(path, content_dir)
+        if doc is not None:
+            docs.append(doc)
+    return docs
+
+
+def _parse_and_chunk_shard(paths: list[Path], content_dir: Path) -> list[tuple[dict, list[str]]]:
+    return [(doc, chunk_text(doc["content"])) for doc in _parse_shard(paths, content_dir)]
+
+
+def _chunk_shard(texts: list[str]) -> list[list[str]]:
+    return [chunk_text(t) for t in texts]
+
+
+def iter_documents(content_dir: Path = CONTENT_DIR, workers: int = 1):
+    """.txt dosyalarını sırayla parse ederek döndür (workers > 1: process pool)."""
+    files = _list_document_files(content_dir)
+    parse = partial(_parse_shard, content_dir=content_dir)
+    for docs in _ordered_pool_map(parse, _shards(files), workers):
+        yield from docs
+
+
+def load_documents(content_dir: Path = CONTENT_DIR, workers: int = 1) -> list[dict]:
     """Tüm .txt dosyalarını yükle."""
-    documents = []
-    
-    for txt_file in content_dir.rglob("*.txt"):
-        try:
-            content = txt_file.read_text(encoding="utf-8")
-            
-            # Metadata parse et
-            lines = content.split("\n")
-            metadata = {}
-            body_start = 0
-            
-            for i, line in enumerate(lines):
-                if line.startswith("TITLE:"):
-                    metadata["title"] = line[6:].strip()
-                elif line.startswith("URL:"):
-                    metadata["url"] = line[4:].strip()
-                elif line.startswith("DATE:"):
-                    metadata["date"] = line[5:].strip()
-                elif line.startswith("AUTHOR:"):
-                    metadata["author"] = line[7:].strip()
-                elif line.startswith("CATEGORIES:"):
-                    metadata["categories"] = line[11:].strip()
-                elif line.strip() == "-----":
-                    body_start = i + 1
-                    break
-            
-            body = "\n".join(lines[body_start:]).strip()
-            metadata["category"] = txt_file.parent.name
-            metadata["filename"] = txt_file.name
-            metadata["relative_path"] = str(txt_file.relative_to(content_dir))
-            
-            documents.append({
-                "content": body,
-                "metadata": metadata
-            })
-        except Exception as e:
-            print(f"[!] Error loading {txt_file}: {e}")
-    
-    return documents
+    return list(iter_documents(content_dir, workers=workers))
+
+
+def chunk_documents(documents: list[dict], workers: int = 1, desc: str = "Chunking") -> list[list[str]]:
+    """Her doküman için chunk listesi (giriş sırası korunur)."""
+    texts = [doc["content"] for doc in documents]
+    out: list[list[str]] = []
+    with tqdm(total=len(texts), desc=desc) as bar:
+        for shard_chunks in _ordered_pool_map(_chunk_shard, _shards(texts), workers):
+            out.extend(shard_chunks)
+            bar.update(len(shard_chunks))
+    return out
+
+
+def _iter_chunked_documents(documents: list[dict] | None, workers: int):
+    """(doküman, chunk listesi) çiftleri; parse + chunking process pool'da yapılır."""
+    if documents is None:
+        files = _list_document_files(CONTENT_DIR)
+        work = partial(_parse_and_chunk_shard, content_dir=CONTENT_DIR)
+        for pairs in _ordered_pool_map(work, _shards(files), workers):
+            yield from pairs
+        return
+
+    doc_shards = _shards(documents)
+    text_shards = ([doc["content"] for doc in shard] for shard in doc_shards)
+    for shard, shard_chunks in zip(doc_shards, _ordered_pool_map(_chunk_shard, text_shards, workers)):
+        yield from zip(shard, shard_chunks)
 
 
 # =============== CHUNKING STRATEGIES ===============
@@ -235,16 +318,12 @@ def chunk_text(text: str) -> list[str]:
 
 def get_embeddings_openai(texts: list[str]) -> np.ndarray:
     """OpenAI API ile embedding al."""
+    from .openai_embed import prepare_inputs
+
     client = get_openai_client()
     
-    processed_texts = []
-    for t in texts:
-        t = t.strip()
-        if not t:
-            t = " "
-        if len(t) > 8000:
-            t = t[:8000]
-        processed_texts.append(t)
+    # Boşları doldur, input token limitine göre kırp
+    processed_texts, _ = prepare_inputs(texts)
     
     response = client.embeddings.create(
         model=OPENAI_EMBEDDING_MODEL,
@@ -254,10 +333,8 @@ def get_embeddings_openai(texts: list[str]) -> np.ndarray:
     return np.array(embeddings, dtype=np.float32)
 
 
-def get_embeddings_local(texts: list[str], is_query: bool = False) -> np.ndarray:
-    """Yerel model ile embedding al."""
-    model = get_local_model()
-    
+def _prepare_local_texts(texts: list[str], is_query: bool = False) -> list[str]:
+    """Yerel model için instruct/prefix formatını uygula."""
     processed_texts = []
     for t in texts:
         t = t.strip() if t.strip() else " "
@@ -273,9 +350,18 @@ def get_embeddings_local(texts: list[str], is_query: bool = False) -> np.ndarray
             # Standart E5 format
             prefix = "query: " if is_query else "passage: "
             processed_texts.append(f"{prefix}{t}")
+    return processed_texts
+
+
+def get_embeddings_local(texts: list[str], is_query: bool = False) -> np.ndarray:
+    """Yerel model ile embedding al."""
+    model = get_local_model()
+    processed_texts = _prepare_local_texts(texts, is_query=is_query)
     
+    # Gelen liste zaten bir batch; encode'un kendi 32'lik bölmesini devre dışı bırak.
     embeddings = model.encode(
         processed_texts,
+        batch_size=max(1, len(processed_texts)),
         show_progress_bar=False,
         convert_to_numpy=True,
         normalize_embeddings=True
@@ -301,6 +387,258 @@ def get_embedding_dim() -> int:
         return LOCAL_EMBEDDING_DIM
 
 
+def get_embedding_cache() -> EmbeddingCache | None:
+    global _embedding_cache
+    if not USE_EMBEDDING_CACHE:
+        return None
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_MB * 1024 * 1024)
+    return _embedding_cache
+
+
+def _embedding_model_name() -> str:
+    return LOCAL_EMBEDDING_MODEL if EMBEDDING_PROVIDER == "local" else OPENAI_EMBEDDING_MODEL
+
+
+def _embedding_mode() -> str:
+    """Passage embedding'inin hangi formatla üretildiği (cache anahtarına girer)."""
+    if EMBEDDING_PROVIDER == "openai":
+        return "raw"
+    mode = "instruct" if USE_INSTRUCT_FORMAT else "prefix"
+    # int8 ONNX vektörleri fp32'ye çok yakın ama aynı değil; cache'te ayrı tutulur. Config değil,
+    # modelin gerçekte yüklendiği backend belirler (ONNX açılamazsa PyTorch'a düşülür)
+    backend = _embedding_pool.backend if _embedding_pool is not None else embedding_backend()
+    return f"{mode}+onnx-int8" if backend == "onnx-int8" else mode
+
+
+def _print_cache_stats(cache: EmbeddingCache) -> None:
+    st = cache.stats()
+    print(
+        f"[i] Embedding cache: {st['hits']} hit, {st['misses']} miss "
+        f"(hit-rate {st['hit_rate'] * 100:.1f}%), {st['evicted']} evicted, "
+        f"{st['size_bytes'] / 1024 / 1024:.1f} MB / {st['max_bytes'] / 1024 / 1024:.0f} MB"
+    )
+
+
+@contextlib.contextmanager
+def embedding_pool(workers: int):
+    """workers > 1 iken bu blok boyunca passage embedding'leri çok process'li CPU pool'unda hesapla."""
+    global _embedding_pool
+    if workers <= 1 or EMBEDDING_PROVIDER != "local" or _embedding_pool is not None:
+        yield _embedding_pool
+        return
+
+    from .embed_pool import EmbeddingPool
+
+    pool = EmbeddingPool(workers)
+    print(f"[i] Embedding pool: {pool.workers} worker x {pool.threads_per_worker} thread (CPU)")
+    _embedding_pool = pool
+    try:
+        yield pool
+    finally:
+        _embedding_pool = None
+        pool.close()
+
+
+def _token_lengths(tokenizer, max_length: int, processed_texts: list[str]) -> list[int]:
+    encoded = tokenizer(
+        processed_texts,
+        add_special_tokens=True,
+        truncation=True,
+        max_length=max_length,
+        return_attention_mask=False,
+        return_token_type_ids=False,
+    )
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def _local_token_lengths(texts: list[str]) -> list[int]:
+    """Passage metinlerinin model tokenizer'ına göre uzunlukları (truncation dahil)."""
+    if _embedding_pool is not None:
+        tokenizer, max_length = _embedding_pool.tokenizer, _embedding_pool.max_seq_length
+    else:
+        model = get_local_model()
+        tokenizer, max_length = model.tokenizer, model.max_seq_length
+    return _token_lengths(tokenizer, max_length, _prepare_local_texts(texts))
+
+
+def token_budget_batches(lengths: list[int], max_tokens: int, max_batch: int) -> list[list[int]]:
+    """Uzunluğa göre sıralı pozisyonları, batch_len * en_uzun <= max_tokens olacak şekilde grupla.
+
+    En uzun chunk'lar önce gelir: bellek sorunu varsa ilk batch'te ortaya çıkar.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_max = 0
+    for i in order:
+        length = max(1, int(lengths[i]))
+        if not current:
+            current_max = length
+        if current and ((len(current) + 1) * current_max > max_tokens or len(current) >= max_batch):
+            batches.append(current)
+            current = []
+            current_max = length
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _new_embed_stats() -> dict:
+    return {"chunks": 0, "tokens": 0, "padded_tokens": 0, "seconds": 0.0}
+
+
+def _print_embed_stats(stats: dict) -> None:
+    if not stats["chunks"]:
+        return
+    secs = max(stats["seconds"], 1e-9)
+    line = f"[i] Embedding throughput: {stats['chunks'] / secs:.1f} chunks/s"
+    if stats["tokens"]:
+        padding = 1.0 - stats["tokens"] / max(stats["padded_tokens"], 1)
+        batching = "openai-async" if _use_async_openai() else EMBEDDING_BATCHING
+        line += (
+            f", {stats['tokens'] / secs:.0f} tokens/s "
+            f"({stats['tokens']} tokens, padding {padding * 100:.1f}%, batching={batching})"
+        )
+    print(line)
+
+
+def _use_async_openai() -> bool:
+    return EMBEDDING_PROVIDER == "openai" and OPENAI_EMBED_ASYNC
+
+
+def _plan_batches(texts: list[str], batch_size: int) -> tuple[list[list[int]], list[int] | None, list[str]]:
+    """Embed edilecek metinleri batch'lere böl.
+
+    (batch'ler, token uzunlukları veya None, modele gidecek metinler) döndürür.
+    OpenAI async yolunda metinler token limitine göre kırpılır ve istekler
+    token sayısına göre paketlenir.
+    """
+    fixed = [list(range(i, min(i + batch_size, len(texts)))) for i in range(0, len(texts), batch_size)]
+    if not texts:
+        return fixed, None, texts
+
+    if _use_async_openai():
+        from .openai_embed import pack_requests, prepare_inputs
+
+        prepared, token_counts = prepare_inputs(texts)
+        return pack_requests(token_counts), token_counts, prepared
+
+    if EMBEDDING_PROVIDER != "local":
+        return fixed, None, texts
+
+    lengths = _local_token_lengths(texts)
+    if EMBEDDING_BATCHING == "tokens":
+        batches = token_budget_batches(lengths, EMBEDDING_TOKEN_BUDGET, EMBEDDING_MAX_BATCH)
+    else:
+        batches = fixed
+    return batches, lengths, texts
+
+
+def _iter_batch_embeddings(texts: list[str], batches: list[list[int]]):
+    """(batch, embedding) çiftleri; pool aktifse batch'ler worker'lara dağıtılır.
+
+    OpenAI async yolunda batch'ler tamamlanma sırasıyla gelir.
+    """
+    if _use_async_openai():
+        from .openai_embed import iter_openai_batches
+
+        yield from iter_openai_batches(texts, batches)
+        return
+    if _embedding_pool is not None and EMBEDDING_PROVIDER == "local":
+        prepared = [_prepare_local_texts([texts[j] for j in batch]) for batch in batches]
+        yield from zip(batches, _embedding_pool.map(prepared))
+        return
+    for batch in batches:
+        yield batch, get_embeddings([texts[j] for j in batch])
+
+
+def embed_chunks(
+    chunks: list[str],
+    batch_size: int = 32,
+    desc: str = "Embedding",
+    report: bool = True,
+    stats: dict | None = None,
+) -> np.ndarray:
+    """Chunk'ları embed et; cache'te olanları modele göndermeden al.
+
+    Local provider'da eksik chunk'lar token uzunluğuna göre batch'lenir ve
+    sonuçlar orijinal pozisyonlarına geri yazılır. report=False iken progress
+    bar ve özetler basılmaz (streaming build sayaçları `stats` ile toplar).
+    """
+    dim = get_embedding_dim()
+    out = np.zeros((len(chunks), dim), dtype=np.float32)
+    cache = get_embedding_cache()
+
+    keys = None
+    missing = list(range(len(chunks)))
+    if cache is not None:
+        if report:
+            cache.reset_stats()
+        model_name = _embedding_model_name()
+        mode = _embedding_mode()
+        keys = [embedding_cache_key(c, EMBEDDING_PROVIDER, model_name, mode) for c in chunks]
+        found = cache.get_many(keys, dim)
+        missing = []
+        for i, key in enumerate(keys):
+            vec = found.get(key)
+            if vec is None:
+                missing.append(i)
+            else:
+                out[i] = vec
+
+    # Aynı metin (aynı cache anahtarı) modele bir kez gider; kopyalar sonda doldurulur
+    first: dict[str, int] = {}
+    copies: list[tuple[int, int]] = []
+    unique = []
+    for i in missing:
+        j = first.setdefault(keys[i] if keys is not None else chunks[i], i)
+        if j == i:
+            unique.append(i)
+        else:
+            copies.append((i, j))
+    missing = unique
+
+    if stats is None:
+        stats = _new_embed_stats()
+    missing_texts = [chunks[i] for i in missing]
+    batches, lengths, missing_texts = _plan_batches(missing_texts, batch_size)
+
+    t0 = time.perf_counter()
+    put_keys = None
+    batch_iter = _iter_batch_embeddings(missing_texts, batches)
+    for batch, embeddings in tqdm(batch_iter, total=len(batches), desc=desc, disable=not report):
+        batch_ids = [missing[j] for j in batch]
+        stats["chunks"] += len(batch)
+        if lengths is not None:
+            batch_lengths = [lengths[j] for j in batch]
+            stats["tokens"] += sum(batch_lengths)
+            if EMBEDDING_PROVIDER == "local":
+                stats["padded_tokens"] += max(batch_lengths) * len(batch_lengths)
+            else:
+                stats["padded_tokens"] += sum(batch_lengths)
+
+        out[batch_ids] = embeddings
+        if cache is not None:
+            if put_keys is None:
+                # Model artık yüklü: backend tahmini tuttuysa aynı anahtarlar, tutmadıysa gerçek format
+                actual = _embedding_mode()
+                put_keys = keys if actual == mode else [embedding_cache_key(c, EMBEDDING_PROVIDER, model_name, actual) for c in chunks]
+            # Her batch'i hemen yaz: yarıda kalan build bir sonraki denemede kaldığı yerden devam eder.
+            cache.put_many([(put_keys[i], embeddings[j]) for j, i in enumerate(batch_ids)])
+    stats["seconds"] += time.perf_counter() - t0
+    if copies:
+        dst, src = zip(*copies)
+        out[list(dst)] = out[list(src)]
+
+    if report:
+        _print_embed_stats(stats)
+        if cache is not None:
+            _print_cache_stats(cache)
+    return out
+
+
 def _doc_identity(metadata: dict) -> str:
     """Incremental indexing için belge kimliği."""
     url = (metadata.get("url") or "").strip()
@@ -316,167 +654,685 @@ def _doc_identity(metadata: dict) -> str:
     return f"file::{filename}::cat::{category}"
 
 
+# =============== CHUNK IDS ===============
+
+# remove_ids ile çıkarılamayan (ama chunk store'dan silinmiş) chunk_id'ler
+TOMBSTONES_FILE = "tombstones.npy"
+
+
+def _doc_content_hash(doc: dict) -> int:
+    """Header metadata + gövde için 64-bit hash (değişen makaleyi tespit etmek için)."""
+    h = hashlib.blake2b(digest_size=8)
+    h.update(json.dumps(doc["metadata"], sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    h.update(b"\0")
+    h.update(doc["content"].encode("utf-8"))
+    return int.from_bytes(h.digest(), "little", signed=True)
+
+
+def _chunk_metadatas(metadata: dict, n_chunks: int, doc_idx: int, content_hash: int, first_chunk_id: int) -> list[dict]:
+    return [
+        {
+            **metadata,
+            "chunk_idx": chunk_idx,
+            "doc_idx": doc_idx,
+            "chunk_id": first_chunk_id + chunk_idx,
+            "content_hash": content_hash,
+        }
+        for chunk_idx in range(n_chunks)
+    ]
+
+
+def _as_id_mapped(index: faiss.Index, ids: np.ndarray) -> faiss.Index:
+    """Eski ID'siz index'i (etiket = satır sırası) IndexIDMap2'ye çevir."""
+    if is_id_mapped(index):
+        return index
+    mapped = new_id_index(index.d)
+    if index.ntotal:
+        mapped.add_with_ids(index.reconstruct_n(0, index.ntotal), ids)
+    return mapped
+
+
+def _id_mapped_vectors(index: faiss.Index) -> tuple[np.ndarray, np.ndarray]:
+    """IndexIDMap2 içindeki (id, vektör) çiftleri, ekleme sırasıyla."""
+    ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+    inner = faiss.downcast_index(index.index)
+    return ids, inner.reconstruct_n(0, inner.ntotal)
+
+
+def _stored_chunk_ids(metadatas) -> np.ndarray:
+    """Chunk store satırlarının chunk_id'leri (eski index'lerde satır numarası)."""
+    col = metadatas.column("chunk_id")
+    if col is None:
+        return np.arange(len(metadatas), dtype=np.int64)
+    return np.asarray(col, dtype=np.int64)
+
+
+def _remove_or_tombstone(index: faiss.Index, ids: np.ndarray, tombstones: np.ndarray) -> np.ndarray:
+    """ID'leri index'ten çıkar; index tipi desteklemiyorsa tombstone listesine ekle."""
+    if ids.size == 0:
+        return tombstones
+    try:
+        index.remove_ids(np.ascontiguousarray(ids, dtype=np.int64))
+        return tombstones
+    except RuntimeError:
+        return np.union1d(tombstones, ids).astype(np.int64)
+
+
+def _load_tombstones(index_path: Path) -> np.ndarray:
+    path = index_path / TOMBSTONES_FILE
+    if not path.exists():
+        return np.array([], dtype=np.int64)
+    return np.load(path).astype(np.int64)
+
+
+def _write_tombstones(index_path: Path, tombstones: np.ndarray | None) -> None:
+    path = index_path / TOMBSTONES_FILE
+    if tombstones is None or tombstones.size == 0:
+        path.unlink(missing_ok=True)
+    else:
+        np.save(path, np.asarray(tombstones, dtype=np.int64))
+
+
+def _read_index_config(index_path: Path) -> dict:
+    config_path = index_path / "config.json"
+    if not config_path.exists():
+        return {}
+    with open(config_path) as f:
+        return json.load(f)
+
+
+def _write_index_config(index_path: Path, config: dict) -> None:
+    with open(index_path / "config.json", "w") as f:
+        json.dump(config, f, indent=2)
+
+
 # =============== INDEXING ===============
 
-def index_documents(documents: list[dict] = None, batch_size: int = 32):
+# Streaming build ayarları
+STREAM_QUEUE_SIZE = 64  # loader -> chunker -> embedder kuyruk kapasitesi
+STREAM_EMBED_WINDOW = 1024  # embedder'ın tek seferde işlediği (token'a göre batch'lenen) chunk sayısı
+
+_STREAM_DONE = object()
+
+
+class _VectorBuffer:
+    """Embedding'leri diske yazan, önceden ayrılmış ve katlanarak büyüyen float32 memmap."""
+
+    def __init__(self, path: Path, dim: int, capacity: int):
+        self.path = path
+        self.dim = dim
+        self.size = 0
+        self.capacity = 0
+        self._mm = None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_bytes(b"")
+        self._resize(max(1, capacity))
+
+    def _resize(self, capacity: int) -> None:
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+        # truncate sparse dosya ayırır; veri kopyalanmaz.
+        os.truncate(self.path, capacity * self.dim * 4)
+        self._mm = np.memmap(self.path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self.capacity = capacity
+
+    def append(self, vectors: np.ndarray) -> None:
+        n = int(vectors.shape[0])
+        if self.size + n > self.capacity:
+            self._resize(max(self.capacity * 2, self.size + n))
+        self._mm[self.size:self.size + n] = vectors
+        self.size += n
+
+    def view(self) -> np.ndarray:
+        return self._mm[:self.size]
+
+    def close(self) -> None:
+        self._mm = None
+        self.path.unlink(missing_ok=True)
+
+
+def _run_stage(target, *args, errors: list):
+    """Pipeline aşamasını thread'de çalıştır; hatayı ana thread'e taşı."""
+    def _wrapped():
+        try:
+            target(*args)
+        except BaseException as e:  # noqa: BLE001 - ana thread yeniden fırlatır
+            errors.append(e)
+
+    t = threading.Thread(target=_wrapped, daemon=True)
+    t.start()
+    return t
+
+
+def _put_until_stopped(q, item, stop) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.2)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get_until_stopped(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.2)
+        except queue.Empty:
+            continue
+    return _STREAM_DONE
+
+
+def _index_documents_streaming(documents=None, batch_size: int = 32, workers: int = 1):
+    """Load -> chunk -> embed -> memmap hattını sınırlı kuyruklarla çalıştır.
+
+    Dosya okuma, chunking ve embedding ayrı aşamalarda üst üste biner; vektörler
+    RAM'de biriktirilmez, önceden ayrılmış memmap'e yazılır ve FAISS'e bloklar
+    halinde eklenir. Chunk metinleri ve metadata da gelen sırayla yeni snapshot'ın
+    chunk store'una eklenir; bellekte sadece embed penceresi kalır.
+    workers > 1 iken parse + chunking process pool'da yapılır.
+    """
+    dim = get_embedding_dim()
+    index_path = get_index_path()
+
+    if workers > 1:
+        doc_source = _iter_chunked_documents(documents, workers)
+    elif documents is None:
+        doc_source = ((doc, None) for doc in iter_documents())
+    else:
+        doc_source = ((doc, None) for doc in documents)
+    if documents is None:
+        est_docs = len(_list_document_files(CONTENT_DIR))
+    else:
+        est_docs = len(documents)
+
+    doc_q = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    chunk_q = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+    stop = threading.Event()
+    errors: list[BaseException] = []
+
+    def _load_stage():
+        try:
+            for item in doc_source:
+                if not _put_until_stopped(doc_q, item, stop):
+                    return
+        finally:
+            _put_until_stopped(doc_q, _STREAM_DONE, stop)
+
+    def _chunk_stage():
+        try:
+            doc_idx = 0
+            while True:
+                item = _get_until_stopped(doc_q, stop)
+                if item is _STREAM_DONE:
+                    return
+                doc, chunks = item
+                if chunks is None:
+                    chunks = chunk_text(doc["content"])
+                item = (doc_idx, doc["metadata"], chunks, _doc_content_hash(doc))
+                if not _put_until_stopped(chunk_q, item, stop):
+                    return
+                doc_idx += 1
+        finally:
+            _put_until_stopped(chunk_q, _STREAM_DONE, stop)
+
+    # Paragraf başına ~4 chunk varsayımıyla ön-ayırma; yetmezse kapasite katlanır.
+    buffer = _VectorBuffer(index_path / "vectors.stream.tmp", dim, capacity=max(1024, est_docs * 4))
+    cache = get_embedding_cache()
+    if cache is not None:
+        cache.reset_stats()
+    embed_stats = _new_embed_stats()
+
+    snapshot = new_snapshot_dir(index_path)
+    store = ChunkStoreWriter(snapshot)
+    pending: list[str] = []
+    n_docs = 0
+
+    def _flush_pending():
+        if not pending:
+            return
+        vectors = embed_chunks(pending, batch_size=batch_size, report=False, stats=embed_stats)
+        if EMBEDDING_PROVIDER == "openai":
+            faiss.normalize_L2(vectors)
+        buffer.append(vectors)
+        progress.update(len(pending))
+        pending.clear()
+
+    threads = [
+        _run_stage(_load_stage, errors=errors),
+        _run_stage(_chunk_stage, errors=errors),
+    ]
+    progress = tqdm(desc="Embedding (stream)", unit="chunk")
+    try:
+        while True:
+            item = chunk_q.get()
+            if item is _STREAM_DONE:
+                break
+            doc_idx, metadata, chunks, content_hash = item
+            n_docs += 1
+            store.append(chunks, _chunk_metadatas(metadata, len(chunks), doc_idx, content_hash, store.num_rows))
+            pending.extend(chunks)
+            if len(pending) >= STREAM_EMBED_WINDOW:
+                _flush_pending()
+        _flush_pending()
+    except BaseException:
+        stop.set()
+        buffer.close()
+        store.abort()
+        shutil.rmtree(snapshot, ignore_errors=True)
+        raise
+    finally:
+        progress.close()
+        for t in threads:
+            t.join(timeout=5)
+
+    if errors:
+        buffer.close()
+        store.abort()
+        shutil.rmtree(snapshot, ignore_errors=True)
+        raise errors[0]
+
+    n_chunks = store.num_rows
+    store.close()
+    print(f"[i] Loaded {n_docs} documents, created {n_chunks} chunks")
+    _print_embed_stats(embed_stats)
+    if cache is not None:
+        _print_cache_stats(cache)
+    if not n_chunks:
+        buffer.close()
+        shutil.rmtree(snapshot, ignore_errors=True)
+        print("[!] Indexlenecek chunk yok.")
+        return 0
+
+    vectors = buffer.view()
+    index, index_type, codec = build_vector_index(vectors, np.arange(buffer.size, dtype=np.int64))
+    _save_index(index, None, None, index_type=index_type, codec=codec, rescore_vectors=[vectors], snapshot=snapshot)
+    del vectors
+    buffer.close()
+
+    print(f"[✓] Indexed {n_chunks} chunks to: {index_path}")
+    return n_chunks
+
+
+def index_documents(
+    documents: list[dict] = None,
+    batch_size: int = 32,
+    streaming: bool = False,
+    workers: int = 1,
+    embed_workers: int = 1,
+):
     """Dokümanları FAISS'e indexle (tam rebuild)."""
     
+    if embed_workers > 1 and _embedding_pool is None:
+        with embedding_pool(embed_workers):
+            return index_documents(documents, batch_size=batch_size, streaming=streaming, workers=workers)
+
+    if streaming:
+        print(f"[i] Streaming build | provider: {EMBEDDING_PROVIDER} | chunk strategy: {CHUNK_STRATEGY}")
+        return _index_documents_streaming(documents, batch_size=batch_size, workers=workers)
+
     if documents is None:
         print("[i] Loading documents...")
-        documents = load_documents()
+        documents = load_documents(workers=workers)
     
     print(f"[i] Loaded {len(documents)} documents")
     print(f"[i] Embedding provider: {EMBEDDING_PROVIDER}")
     print(f"[i] Chunk strategy: {CHUNK_STRATEGY}")
+    if workers > 1:
+        print(f"[i] Workers: {workers}")
     
     # Chunk'la
     all_chunks = []
     all_metadatas = []
     
-    for doc_idx, doc in enumerate(tqdm(documents, desc="Chunking")):
-        chunks = chunk_text(doc["content"])
-        for chunk_idx, chunk in enumerate(chunks):
-            all_chunks.append(chunk)
-            all_metadatas.append({
-                **doc["metadata"],
-                "chunk_idx": chunk_idx,
-                "doc_idx": doc_idx
-            })
+    for doc_idx, (doc, chunks) in enumerate(zip(documents, chunk_documents(documents, workers=workers))):
+        all_metadatas.extend(
+            _chunk_metadatas(doc["metadata"], len(chunks), doc_idx, _doc_content_hash(doc), len(all_chunks))
+        )
+        all_chunks.extend(chunks)
     
     print(f"[i] Created {len(all_chunks)} chunks")
     if not all_chunks:
         print("[!] Indexlenecek chunk yok.")
         return 0
     
-    # Tüm embedding'leri topla
-    all_embeddings = []
-    
-    for i in tqdm(range(0, len(all_chunks), batch_size), desc="Embedding"):
-        batch_chunks = all_chunks[i:i + batch_size]
-        embeddings = get_embeddings(batch_chunks)
-        all_embeddings.append(embeddings)
-    
-    # Birleştir
-    embeddings_matrix = np.vstack(all_embeddings)
-    
-    # FAISS index oluştur
-    dim = get_embedding_dim()
-    index = faiss.IndexFlatIP(dim)
+    # Tüm embedding'leri topla (cache'te olanlar modele gitmez)
+    embeddings_matrix = embed_chunks(all_chunks, batch_size=batch_size)
     
     # Local zaten normalize, OpenAI için normalize et
     if EMBEDDING_PROVIDER == "openai":
         faiss.normalize_L2(embeddings_matrix)
     
-    index.add(embeddings_matrix)
+    # FAISS index oluştur (chunk_id = satır sırası)
+    index, index_type, codec = build_vector_index(embeddings_matrix, np.arange(len(all_chunks), dtype=np.int64))
     
     # Kaydet
-    _save_index(index, all_chunks, all_metadatas)
+    _save_index(
+        index, all_chunks, all_metadatas, index_type=index_type, codec=codec, rescore_vectors=[embeddings_matrix]
+    )
     
     print(f"[✓] Indexed {len(all_chunks)} chunks to: {get_index_path()}")
     return len(all_chunks)
 
 
-def update_index(batch_size: int = 32):
-    """Sadece yeni dokümanları mevcut index'e ekle."""
+def update_index(batch_size: int = 32, workers: int = 1, embed_workers: int = 1):
+    """Yeni, değişen ve silinen dokümanları mevcut index'e yansıt.
+
+    Chunk'lar kalıcı chunk_id ile tutulur. İçerik hash'i değişen veya diskten
+    silinen dokümanların chunk'ları index'ten çıkarılır; yeni ve değişen
+    dokümanlar embed edilip yeni ID'lerle eklenir.
+    """
+    if embed_workers > 1 and _embedding_pool is None:
+        with embedding_pool(embed_workers):
+            return update_index(batch_size=batch_size, workers=workers)
+
     index_path = get_index_path()
     
     # Mevcut index var mı?
-    if not (index_path / "index.faiss").exists():
+    if not has_index(index_path):
         print("[i] Mevcut index yok, tam index oluşturuluyor...")
-        return index_documents()
-    
-    # Mevcut indexed dosyaları bul
-    with open(index_path / "metadatas.pkl", "rb") as f:
-        existing_metadatas = pickle.load(f)
+        return index_documents(workers=workers)
+    # Aktif snapshot okunur; sonuç yeni snapshot olarak yayınlanır
+    current_dir = resolve_index_dir(index_path)
     
-    indexed_docs = set()
-    for m in existing_metadatas:
-        indexed_docs.add(_doc_identity(m))
+    # Mevcut chunk'ları (doküman kimliği, içerik hash'i) anahtarıyla grupla.
+    # Eski index'lerde hash yok: sadece kimliğe bakılır.
+    existing_chunks, existing_metadatas = load_chunk_store(current_dir)
+    existing_ids = _stored_chunk_ids(existing_metadatas)
+    hash_col = existing_metadatas.column("content_hash")
+    legacy = hash_col is None or existing_metadatas.vocab("content_hash") is not None
+
+    def _key(identity: str, content_hash: int):
+        return identity if legacy else (identity, content_hash)
+
+    rows_by_key: dict = defaultdict(list)
+    indexed_identities = set()
+    for row, m in enumerate(existing_metadatas):
+        identity = _doc_identity(m)
+        indexed_identities.add(identity)
+        rows_by_key[_key(identity, None if legacy else int(hash_col[row]))].append(row)
     
-    # Tüm dokümanları yükle ve yeni olanları filtrele
+    # Tüm dokümanları yükle; yeni/değişenleri ve silinenleri ayır
     print("[i] Loading documents...")
-    all_docs = load_documents()
-    new_docs = [d for d in all_docs if _doc_identity(d["metadata"]) not in indexed_docs]
-    
-    if not new_docs:
-        print(f"[✓] Index güncel! ({len(indexed_docs)} doküman zaten indexte)")
+    all_docs = load_documents(workers=workers)
+    if not all_docs:
+        print("[!] Hiç doküman bulunamadı; index'e dokunulmadı.")
+        return 0
+
+    current_keys = set()
+    current_hash_by_identity: dict[str, int] = {}
+    new_docs, new_hashes = [], []
+    for doc in all_docs:
+        identity = _doc_identity(doc["metadata"])
+        content_hash = _doc_content_hash(doc)
+        key = _key(identity, content_hash)
+        current_keys.add(key)
+        current_hash_by_identity.setdefault(identity, content_hash)
+        if key not in rows_by_key:
+            new_docs.append(doc)
+            new_hashes.append(content_hash)
+
+    stale_keys = [key for key in rows_by_key if key not in current_keys]
+    stale_rows = np.array(sorted(row for key in stale_keys for row in rows_by_key[key]), dtype=np.int64)
+    n_changed = sum(1 for doc in new_docs if _doc_identity(doc["metadata"]) in indexed_identities)
+    n_removed = len({key if legacy else key[0] for key in stale_keys} - set(current_hash_by_identity))
+
+    if not new_docs and stale_rows.size == 0:
+        print(f"[✓] Index güncel! ({len(rows_by_key)} doküman zaten indexte)")
         return 0
     
-    print(f"[i] {len(new_docs)} new documents to index (skipping {len(indexed_docs)} existing)")
+    print(
+        f"[i] {len(new_docs) - n_changed} new, {n_changed} changed, {n_removed} removed documents "
+        f"({stale_rows.size} stale chunks)"
+    )
     print(f"[i] Embedding provider: {EMBEDDING_PROVIDER}")
     print(f"[i] Chunk strategy: {CHUNK_STRATEGY}")
+
+    index_config = _read_index_config(current_dir)
+    index_type = index_config.get("index_type", "flat")
+    codec = index_config.get("index_codec", "float32")
+    if index_type != FAISS_INDEX_TYPE:
+        print(f"[i] Mevcut index tipi {index_type} (config: {FAISS_INDEX_TYPE}); tip değişikliği için `index --full`")
+    index = configure_index(faiss.read_index(str(current_dir / "index.faiss")))
+    if not is_id_mapped(index):
+        print("[i] Eski (ID'siz) index chunk_id'li formata çevriliyor...")
+        index = _as_id_mapped(index, existing_ids)
+    tombstones = _load_tombstones(current_dir)
+    next_chunk_id = max(
+        int(index_config.get("next_chunk_id", 0)),
+        int(existing_ids.max()) + 1 if existing_ids.size else 0,
+        int(tombstones.max()) + 1 if tombstones.size else 0,
+    )
+
+    # Eskiyen chunk'ları index'ten çıkar (desteklenmiyorsa tombstone)
+    tombstones = _remove_or_tombstone(index, existing_ids[stale_rows], tombstones)
+    keep = np.ones(len(existing_ids), dtype=bool)
+    keep[stale_rows] = False
+    kept_chunks = []
+    kept_metadatas = []
+    for row in np.flatnonzero(keep).tolist():
+        m = existing_metadatas[row]
+        m["chunk_id"] = int(existing_ids[row])
+        if legacy:
+            m["content_hash"] = current_hash_by_identity[_doc_identity(m)]
+        kept_chunks.append(existing_chunks[row])
+        kept_metadatas.append(m)
     
-    # Yeni dokümanları chunk'la
+    # Yeni/değişen dokümanları chunk'la
     new_chunks = []
     new_metadatas = []
-    base_doc_idx = len(indexed_docs)
+    doc_col = existing_metadatas.column("doc_idx")
+    base_doc_idx = int(np.max(doc_col)) + 1 if doc_col is not None and len(doc_col) else 0
     
-    for doc_idx, doc in enumerate(tqdm(new_docs, desc="Chunking")):
-        chunks = chunk_text(doc["content"])
-        for chunk_idx, chunk in enumerate(chunks):
-            new_chunks.append(chunk)
-            new_metadatas.append({
-                **doc["metadata"],
-                "chunk_idx": chunk_idx,
-                "doc_idx": base_doc_idx + doc_idx
-            })
+    for offset, (doc, chunks) in enumerate(zip(new_docs, chunk_documents(new_docs, workers=workers))):
+        new_metadatas.extend(
+            _chunk_metadatas(doc["metadata"], len(chunks), base_doc_idx + offset, new_hashes[offset], next_chunk_id)
+        )
+        new_chunks.extend(chunks)
+        next_chunk_id += len(chunks)
     
     print(f"[i] Created {len(new_chunks)} new chunks")
-    if not new_chunks:
-        print("[i] Yeni chunk oluşmadı, index değişmedi.")
-        return 0
-    
-    # Embedding'leri al
-    new_embeddings = []
-    for i in tqdm(range(0, len(new_chunks), batch_size), desc="Embedding"):
-        batch = new_chunks[i:i + batch_size]
-        embeddings = get_embeddings(batch)
-        new_embeddings.append(embeddings)
-    
-    new_embeddings_matrix = np.vstack(new_embeddings)
-    
-    if EMBEDDING_PROVIDER == "openai":
-        faiss.normalize_L2(new_embeddings_matrix)
-    
-    # Mevcut index'i yükle ve genişlet
-    index = faiss.read_index(str(index_path / "index.faiss"))
-    
-    with open(index_path / "chunks.pkl", "rb") as f:
-        existing_chunks = pickle.load(f)
-    
-    index.add(new_embeddings_matrix)
-    all_chunks = existing_chunks + new_chunks
-    all_metadatas = existing_metadatas + new_metadatas
+    if new_chunks:
+        # Embedding'leri al (cache'te olanlar modele gitmez)
+        new_embeddings_matrix = embed_chunks(new_chunks, batch_size=batch_size)
+        if EMBEDDING_PROVIDER == "openai":
+            faiss.normalize_L2(new_embeddings_matrix)
+        new_ids = np.array([m["chunk_id"] for m in new_metadatas], dtype=np.int64)
+        index.add_with_ids(new_embeddings_matrix, new_ids)
+
+    all_chunks = kept_chunks + new_chunks
+    all_metadatas = kept_metadatas + new_metadatas
+
+    # float16 kopya (kompakt / IVF index) satır sırasını izler: kalanlar + yeniler
+    rescore_parts = None
+    if needs_vector_copy(index):
+        old_vectors = open_rescore_vectors(current_dir)
+        if old_vectors is not None and len(old_vectors) == len(existing_ids):
+            rescore_parts = [np.asarray(old_vectors[np.flatnonzero(keep)])]
+            if new_chunks:
+                rescore_parts.append(new_embeddings_matrix)
+        else:
+            print("[!] float16 kopya eksik/uyumsuz; yeniden yazmak için `index --full` gerekli")
+        del old_vectors
     
     # Kaydet
-    _save_index(index, all_chunks, all_metadatas)
+    _save_index(
+        index,
+        all_chunks,
+        all_metadatas,
+        next_chunk_id=next_chunk_id,
+        tombstones=tombstones,
+        index_type=index_type,
+        codec=codec,
+        rescore_vectors=rescore_parts,
+    )
     
-    print(f"[✓] Added {len(new_chunks)} chunks (total: {len(all_chunks)}) to: {index_path}")
+    print(
+        f"[✓] Added {len(new_chunks)} chunks, removed {stale_rows.size} "
+        f"(total: {len(all_chunks)}, tombstones: {tombstones.size}) to: {index_path}"
+    )
+    if tombstones.size and tombstones.size / max(1, index.ntotal) >= INDEX_COMPACT_THRESHOLD:
+        compact_index()
     return len(new_chunks)
 
 
-def _save_index(index, chunks, metadatas):
-    """Index ve verileri diske kaydet."""
+def compact_index(force: bool = False) -> int:
+    """Tombstone'lu ID'leri atarak index'i sadece canlı chunk vektörleriyle yeniden yaz.
+
+    force=False iken tombstone oranı INDEX_COMPACT_THRESHOLD altındaysa bir şey yapmaz.
+    Sonuç yeni snapshot olarak yayınlanır; chunk store dosyaları değişmediği için
+    hard link ile taşınır. Atılan vektör sayısını döndürür.
+    """
     index_path = get_index_path()
-    index_path.mkdir(parents=True, exist_ok=True)
-    
-    faiss.write_index(index, str(index_path / "index.faiss"))
+    if not has_index(index_path):
+        print(f"[!] Index bulunamadı: {index_path}")
+        return 0
+    current_dir = resolve_index_dir(index_path)
+
+    index = faiss.read_index(str(current_dir / "index.faiss"))
+    tombstones = _load_tombstones(current_dir)
+    if tombstones.size == 0 or not isinstance(index, faiss.IndexIDMap2):
+        print("[i] Tombstone yok, compaction gerekmiyor.")
+        return 0
+
+    ratio = tombstones.size / max(1, index.ntotal)
+    if not force and ratio < INDEX_COMPACT_THRESHOLD:
+        print(f"[i] Tombstone oranı {ratio:.1%} < {INDEX_COMPACT_THRESHOLD:.0%}, compaction atlandı.")
+        return 0
+
+    _, metadatas = load_chunk_store(current_dir)
+    ids, vectors = _id_mapped_vectors(index)
+    keep = np.isin(ids, _stored_chunk_ids(metadatas))
+
+    compacted = faiss.clone_index(index)
+    compacted.reset()
+    compacted.add_with_ids(np.ascontiguousarray(vectors[keep]), ids[keep])
+
+    snapshot = new_snapshot_dir(index_path)
+    faiss.write_index(compacted, str(snapshot / "index.faiss"))
+    link_unchanged(current_dir, snapshot, _chunk_store_files(current_dir))
+    config = _read_index_config(current_dir)
+    config["num_tombstones"] = 0
+    _write_index_config(snapshot, config)
+    publish_snapshot(index_path, snapshot)
+
+    dropped = int((~keep).sum())
+    print(f"[✓] Compacted index: dropped {dropped} vectors (total: {compacted.ntotal})")
+    return dropped
+
+
+def _chunk_store_files(index_dir: Path) -> list[str]:
+    """Snapshot'ta index.faiss / tombstone / config dışındaki (chunk store + float16 kopya) dosyalar."""
+    skip = {"index.faiss", TOMBSTONES_FILE, "config.json"}
+    return [p.name for p in index_dir.iterdir() if p.is_file() and p.name not in skip]
+
+
+def _write_category_vectors(snapshot: Path, index: faiss.Index) -> None:
+    """Kategori önerisi için açıklama vektörleri + kategori chunk merkezleri.
+
+    Vektörler index'ten kopyasız veya snapshot'ın float16 kopyasından okunur; ikisi de
+    yoksa dosyalar yazılmaz (retriever açıklamaları process'te encode eder). Embedding
+    pool'u açıkken açıklama vektörleri yazılmaz: model ebeveynde sadece bunun için yüklenmez.
+    """
+    metadatas = ChunkMetadatas.open(snapshot)
+    vectors, vector_rows = resident_vectors(index, _stored_chunk_ids(metadatas)) or (open_rescore_vectors(snapshot), None)
+    if vectors is None or (vector_rows is None and len(vectors) != len(metadatas)):
+        return
+    _, _, category_to_indices = load_metadata_caches(snapshot, metadatas)
+    centroids, counts = build_centroids(vectors, vector_rows, category_to_indices, list(CATEGORY_DESCRIPTIONS))
+
+    # Sorgu yolundaki encode (aynı format): vektörler suggest_categories'dekiyle birebir aynı
+    desc_vectors = None
+    if _embedding_pool is not None:
+        print("[i] Embedding pool açık: kategori açıklamaları sorguda encode edilecek")
+    else:
+        try:
+            desc_vectors = encode_queries(list(CATEGORY_DESCRIPTIONS.values()), EMBEDDING_PROVIDER)
+        except Exception as e:
+            print(f"[!] Kategori açıklamaları encode edilemedi (sorguda encode edilecek): {e}")
+    write_category_vectors(snapshot, desc_vectors, centroids, counts, descriptions_key(EMBEDDING_PROVIDER))
+
+
+def _save_index(
+    index,
+    chunks,
+    metadatas,
+    next_chunk_id: int | None = None,
+    tombstones: np.ndarray | None = None,
+    index_type: str = "flat",
+    codec: str = "float32",
+    rescore_vectors: list[np.ndarray] | None = None,
+    snapshot: Path | None = None,
+):
+    """Index ve verileri yeni snapshot'a yazıp CURRENT'ı ona çevir.
+
+    Vektörleri kopyasız okunamayan (sq8/pq, IVF) index'lerde rescore_vectors
+    parçaları chunk sırasıyla float16 kopya olarak yazılır. snapshot verilirse
+    chunk store oraya zaten yazılmıştır (streaming build); chunks/metadatas None olur.
+    """
+    index_path = get_index_path()
+    if snapshot is None:
+        snapshot = new_snapshot_dir(index_path)
+        # Chunk metinleri + metadata kolonları (mmap ile açılır)
+        write_chunk_store(snapshot, chunks, metadatas)
+    else:
+        chunks = ChunkTexts.open(snapshot)
     
-    with open(index_path / "chunks.pkl", "wb") as f:
-        pickle.dump(chunks, f)
+    faiss.write_index(index, str(snapshot / "index.faiss"))
+    _write_tombstones(snapshot, tombstones)
+    if rescore_vectors is not None and needs_vector_copy(index):
+        write_rescore_vectors(snapshot, rescore_vectors)
     
-    with open(index_path / "metadatas.pkl", "wb") as f:
-        pickle.dump(metadatas, f)
+    write_metadata_caches(snapshot, ChunkMetadatas.open(snapshot))
+    # BM25 ters index'i (hibrit arama)
+    write_lexical_index(snapshot, chunks)
+    # Kategori açıklama vektörleri + merkezleri (suggest_categories)
+    _write_category_vectors(snapshot, index)
     
     # Config kaydet
-    with open(index_path / "config.json", "w") as f:
-        json.dump({
-            "embedding_provider": EMBEDDING_PROVIDER,
-            "embedding_model": LOCAL_EMBEDDING_MODEL if EMBEDDING_PROVIDER == "local" else OPENAI_EMBEDDING_MODEL,
-            "embedding_dim": get_embedding_dim(),
-            "chunk_strategy": CHUNK_STRATEGY,
-            "num_chunks": len(chunks)
-        }, f, indent=2)
+    _write_index_config(snapshot, {
+        "embedding_provider": EMBEDDING_PROVIDER,
+        "embedding_model": LOCAL_EMBEDDING_MODEL if EMBEDDING_PROVIDER == "local" else OPENAI_EMBEDDING_MODEL,
+        "embedding_dim": get_embedding_dim(),
+        "chunk_strategy": CHUNK_STRATEGY,
+        "num_chunks": len(chunks),
+        "chunk_store": "columnar-v1",
+        "index_ids": "chunk_id",
+        "index_type": index_type,
+        "index_codec": codec,
+        "ivf_nlist": ivf_nlist(index),
+        "next_chunk_id": int(next_chunk_id if next_chunk_id is not None else len(chunks)),
+        "num_tombstones": int(tombstones.size) if tombstones is not None else 0
+    })
+
+    # Okuyucular ya eski ya yeni snapshot'ı bütünüyle görür
+    publish_snapshot(index_path, snapshot)
+
+
+def migrate_index() -> int:
+    """Eski chunks.pkl / metadatas.pkl index'ini kolon formatında yeni snapshot'a taşı."""
+    index_path = get_index_path()
+    current_dir = resolve_index_dir(index_path)
+    if not has_legacy_pickles(current_dir):
+        print(f"[i] Taşınacak pickle bulunamadı: {index_path}")
+        return 0
+
+    chunks, metadatas = read_legacy_pickles(current_dir)
+    snapshot = new_snapshot_dir(index_path)
+    write_chunk_store(snapshot, chunks, metadatas)
+    write_metadata_caches(snapshot, ChunkMetadatas.open(snapshot))
+    write_lexical_index(snapshot, chunks)
+    link_unchanged(current_dir, snapshot, ["index.faiss", TOMBSTONES_FILE, RESCORE_VECTORS])
+    _write_category_vectors(snapshot, configure_index(faiss.read_index(str(snapshot / "index.faiss"))))
+    config = _read_index_config(current_dir)
+    if config:
+        config["chunk_store"] = "columnar-v1"
+        _write_index_config(snapshot, config)
+    publish_snapshot(index_path, snapshot)
+
+    print(f"[✓] Migrated {len(chunks)} chunks to columnar store: {snapshot}")
+    return len(chunks)
 
 
 if __name__ == "__main__":
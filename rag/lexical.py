@@ -0,0 +1,201 @@
+# Lexical - BM25 için Türkçe'ye duyarlı ters index (hibrit arama)
+#
+# Index kaydedilirken chunk store'un yanına yazılır, ilk hibrit aramada mmap ile açılır:
+#   lexical_terms.json   : terimler (term id sırasıyla)
+#   lexical_indptr.npy   : int64, CSR başlangıçları (terim t = rows[indptr[t]:indptr[t+1]])
+#   lexical_rows.npy     : int32, terime göre gruplanmış, sıralı chunk satırları
+#   lexical_tf.npy       : uint16, aynı sırada terim frekansları
+#   lexical_doc_len.npy  : int32, chunk başına terim sayısı
+#
+# Terimler: Türkçe küçük harf (I -> ı, İ -> i), aksan katlama (ç -> c, ı -> i, ...),
+# kesme işaretinden sonrası atılır (Gettier'in -> gettier), basit ek kırpma.
+import json
+import math
+import re
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from .config import BM25_B, BM25_K1
+
+TERMS = "lexical_terms.json"
+INDPTR = "lexical_indptr.npy"
+ROWS = "lexical_rows.npy"
+TF = "lexical_tf.npy"
+DOC_LEN = "lexical_doc_len.npy"
+
+# str.translate Türkçe metinde karakter başına Python'a düşüyor; replace zinciri C'de kalır
+_TR_UPPER = (("I", "ı"), ("İ", "i"))
+_FOLD = tuple(zip("çğıöşüâîû", "cgiosuaiu"))
+_APOSTROPHE_SUFFIX = re.compile(r"['’`]\w+")
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Ekler katlanmış (ASCII) biçimde; en uzun eşleşen ek sondan en fazla MAX_SUFFIXES kez
+# kırpılır (hal, iyelik, çoğul: kitaplarinin -> kitaplari -> kitap). Kök en az MIN_STEM harf.
+MIN_STEM = 4
+MAX_SUFFIXES = 3
+_SUFFIXES = tuple(sorted(
+    {
+        "ndan", "nden", "daki", "deki", "dan", "den", "tan", "ten", "nin", "nun", "nda", "nde",
+        "da", "de", "ta", "te", "na", "ne", "yi", "yu", "ya", "ye", "in", "un", "i", "u", "a", "e",
+        "leri", "lari", "si", "su", "ler", "lar",
+    },
+    key=len,
+    reverse=True,
+))
+STOPWORDS = frozenset(
+    "ve veya ile ama fakat ancak ya da de ki mi mu bu su o bir icin gibi kadar daha en cok "
+    "olan olarak ise hem ne nasil neden niye her hic sey diye degil var yok".split()
+)
+
+
+def _stem(token: str) -> str:
+    for _ in range(MAX_SUFFIXES):
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= MIN_STEM:
+                token = token[: -len(suffix)]
+                break
+        else:
+            break
+    return token
+
+
+def normalize_text(text: str) -> str:
+    """Türkçe küçük harf + aksan katlama; kesme işaretli ekler atılır."""
+    text = _APOSTROPHE_SUFFIX.sub("", text or "")
+    for src, dst in _TR_UPPER:
+        text = text.replace(src, dst)
+    text = text.lower()
+    for src, dst in _FOLD:
+        text = text.replace(src, dst)
+    if not text.isascii():
+        text = "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+    return text
+
+
+def tokenize(text: str) -> list[str]:
+    """Metnin BM25 terimleri (sorgular için; build _term_counts kullanır)."""
+    return [_stem(t) for t in _TOKEN.findall(normalize_text(text)) if len(t) >= 2 and t not in STOPWORDS]
+
+
+def _term_counts(text: str, stems: dict[str, str]) -> dict[str, int]:
+    """Terim -> frekans; ham token'lar önce sayılır, her farklı token bir kez köklenir."""
+    counts: dict[str, int] = {}
+    for token, count in Counter(_TOKEN.findall(normalize_text(text))).items():
+        stem = stems.get(token)
+        if stem is None:
+            stem = stems[token] = "" if len(token) < 2 or token in STOPWORDS else _stem(token)
+        if stem:
+            counts[stem] = counts.get(stem, 0) + count
+    return counts
+
+
+class LexicalIndex:
+    """Terim -> (chunk satırları, frekanslar) CSR dizileri üzerinde BM25."""
+
+    def __init__(self, terms: list[str], indptr: np.ndarray, rows: np.ndarray, tf: np.ndarray, doc_len: np.ndarray):
+        self.terms = terms
+        self.term_ids = {term: i for i, term in enumerate(terms)}
+        self.indptr = indptr
+        self.rows = rows
+        self.tf = tf
+        self.doc_len = doc_len
+        # BM25 uzunluk normalizasyonu chunk başına bir kez: k1 * (1 - b + b * dl / avgdl)
+        avgdl = float(np.mean(doc_len)) if len(doc_len) else 0.0
+        self._norm = (BM25_K1 * (1.0 - BM25_B + BM25_B * np.asarray(doc_len, dtype=np.float32) / max(avgdl, 1e-9))).astype(np.float32)
+
+    @classmethod
+    def build(cls, chunks) -> "LexicalIndex":
+        term_ids: dict[str, int] = {}
+        stems: dict[str, str] = {}
+        doc_len = np.zeros(len(chunks), dtype=np.int32)
+        term_parts, row_parts, tf_parts = [], [], []
+        for row, text in enumerate(chunks):
+            counts = _term_counts(text, stems)
+            if not counts:
+                continue
+            doc_len[row] = sum(counts.values())
+            term_parts.append(np.fromiter((term_ids.setdefault(t, len(term_ids)) for t in counts), dtype=np.int64, count=len(counts)))
+            row_parts.append(np.full(len(counts), row, dtype=np.int32))
+            tf_parts.append(np.fromiter(counts.values(), dtype=np.int64, count=len(counts)))
+
+        term_col = np.concatenate(term_parts) if term_parts else np.zeros(0, dtype=np.int64)
+        # Satırlar artan sırayla eklendi; stable sıralama terim içinde satır sırasını korur
+        order = np.argsort(term_col, kind="stable")
+        rows = np.concatenate(row_parts)[order] if row_parts else np.zeros(0, dtype=np.int32)
+        tf = np.concatenate(tf_parts)[order] if tf_parts else np.zeros(0, dtype=np.int64)
+        indptr = np.zeros(len(term_ids) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum(np.bincount(term_col, minlength=len(term_ids)))
+        tf = np.minimum(tf, np.iinfo(np.uint16).max).astype(np.uint16)
+        return cls(list(term_ids), indptr, rows, tf, doc_len)
+
+    @classmethod
+    def open(cls, index_dir: Path) -> "LexicalIndex":
+        with open(index_dir / TERMS, encoding="utf-8") as f:
+            terms = json.load(f)
+        return cls(
+            terms,
+            np.load(index_dir / INDPTR),
+            np.load(index_dir / ROWS, mmap_mode="r"),
+            np.load(index_dir / TF, mmap_mode="r"),
+            np.load(index_dir / DOC_LEN, mmap_mode="r"),
+        )
+
+    def save(self, index_dir: Path) -> None:
+        np.save(index_dir / INDPTR, self.indptr)
+        np.save(index_dir / ROWS, self.rows)
+        np.save(index_dir / TF, self.tf)
+        np.save(index_dir / DOC_LEN, self.doc_len)
+        with open(index_dir / TERMS, "w", encoding="utf-8") as f:
+            json.dump(self.terms, f, ensure_ascii=False)
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def scores(self, query: str) -> np.ndarray | None:
+        """Chunk başına BM25 skoru (float32, len(self)); sorgu terimi index'te yoksa None."""
+        ids = {self.term_ids[t] for t in tokenize(query) if t in self.term_ids}
+        if not ids:
+            return None
+        n = len(self)
+        scores = np.zeros(n, dtype=np.float32)
+        for t in ids:
+            lo, hi = int(self.indptr[t]), int(self.indptr[t + 1])
+            rows = self.rows[lo:hi]
+            tf = self.tf[lo:hi].astype(np.float32)
+            df = hi - lo
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            # Bir terimin satırları tekil; fancy += güvenli
+            scores[rows] += idf * (BM25_K1 + 1.0) * tf / (tf + self._norm[rows])
+        return scores
+
+    def search(self, query: str, top_n: int, allowed_rows: np.ndarray | None = None) -> dict[int, float]:
+        """{chunk satırı: BM25 skoru}, skora göre azalan (eşitlikte küçük satır önce); en fazla top_n."""
+        if top_n <= 0:
+            return {}
+        scores = self.scores(query)
+        if scores is None:
+            return {}
+        rows = np.flatnonzero(scores) if allowed_rows is None else allowed_rows[scores[allowed_rows] > 0]
+        if rows.size > top_n:
+            rows = rows[np.argpartition(-scores[rows], top_n - 1)[:top_n]]
+            rows.sort()
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return {int(r): float(scores[r]) for r in rows}
+
+
+def write_lexical_index(index_dir: Path, chunks) -> None:
+    LexicalIndex.build(chunks).save(index_dir)
+
+
+def load_lexical_index(index_dir: Path, chunks) -> LexicalIndex:
+    """Kaydedilmiş ters index (mmap); dosyalar yoksa (eski snapshot) chunk'lardan kur."""
+    paths = [index_dir / name for name in (TERMS, INDPTR, ROWS, TF, DOC_LEN)]
+    if all(p.exists() for p in paths):
+        lexical = LexicalIndex.open(index_dir)
+        if len(lexical) == len(chunks):
+            return lexical
+    print(f"[i] BM25 index'i {len(chunks)} chunk'tan kuruluyor (snapshot'ta yok)...")
+    return LexicalIndex.build(chunks)
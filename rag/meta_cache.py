@@ -0,0 +1,123 @@
+# Meta cache - tarih ve kategori filtreleri için önceden hesaplanmış diziler
+#
+# Index kaydedilirken chunk store'un yanına yazılır, load_index'te mmap ile açılır:
+#   cache_date_ordinals.npy     : int32, chunk başına tarih ordinal'i (MISSING_DATE = yok)
+#   cache_date_order.npy        : int64, tarihi olan chunk satırları, tarihe göre sıralı
+#   cache_date_sorted.npy       : int32, aynı sırada ordinal'ler (tarih aralığı = iki searchsorted)
+#   cache_categories.json       : kategori anahtarları (küçük harf)
+#   cache_category_indptr.npy   : int64, CSR satır başlangıçları (kategori i = indices[indptr[i]:indptr[i+1]])
+#   cache_category_indices.npy  : int64, kategoriye göre gruplanmış, sıralı chunk satırları
+import json
+from pathlib import Path
+
+import numpy as np
+
+from .dates import parse_date_string
+
+DATE_ORDINALS = "cache_date_ordinals.npy"
+DATE_ORDER = "cache_date_order.npy"
+DATE_SORTED = "cache_date_sorted.npy"
+CATEGORIES = "cache_categories.json"
+CATEGORY_INDPTR = "cache_category_indptr.npy"
+CATEGORY_INDICES = "cache_category_indices.npy"
+MISSING_DATE = np.iinfo(np.int32).min
+
+
+def to_ordinal(raw: str) -> int | None:
+    parsed = parse_date_string(raw)
+    return parsed.toordinal() if parsed else None
+
+
+def build_metadata_caches(metadatas) -> tuple[np.ndarray, list[str], np.ndarray, np.ndarray]:
+    """(tarih ordinal'leri, kategori anahtarları, CSR indptr, CSR indices).
+
+    Kolon formatında tarih ve kategori her farklı değer için bir kez parse edilir.
+    """
+    n = len(metadatas)
+    date_codes = metadatas.column("date")
+    date_vocab = metadatas.vocab("date")
+    date_ordinals = np.full(n, MISSING_DATE, dtype=np.int32)
+    if date_codes is not None and date_vocab is not None:
+        ordinals = [to_ordinal(v) if isinstance(v, str) else None for v in date_vocab]
+        vocab_ordinals = np.array(
+            [MISSING_DATE if o is None else o for o in ordinals] + [MISSING_DATE],
+            dtype=np.int32,
+        )
+        # -1 (yok) kodu sondaki MISSING_DATE'e düşer
+        date_ordinals = vocab_ordinals[np.asarray(date_codes)]
+
+    grouped: dict[str, list[np.ndarray]] = {}
+    cat_codes = metadatas.column("category")
+    cat_vocab = metadatas.vocab("category")
+    if cat_codes is not None and cat_vocab is not None:
+        codes = np.asarray(cat_codes)
+        for code, raw in enumerate(cat_vocab):
+            cat = (raw or "").strip().lower() if isinstance(raw, str) else ""
+            if cat:
+                grouped.setdefault(cat, []).append(np.flatnonzero(codes == code))
+
+    categories = list(grouped)
+    parts = [np.sort(np.concatenate(grouped[cat])).astype(np.int64) for cat in categories]
+    indptr = np.zeros(len(parts) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(p) for p in parts])
+    indices = np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+    return date_ordinals, categories, indptr, indices
+
+
+def build_date_index(date_ordinals: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """(sıralı ordinal'ler, satırlar): tarihi olan satırlar ordinal'e göre (stable) sıralı."""
+    date_ordinals = np.asarray(date_ordinals)
+    dated = np.flatnonzero(date_ordinals != MISSING_DATE)
+    order = dated[np.argsort(date_ordinals[dated], kind="stable")].astype(np.int64)
+    return date_ordinals[order].astype(np.int32), order
+
+
+def date_range_rows(date_index: tuple[np.ndarray, np.ndarray], from_ord: int | None, to_ord: int | None) -> np.ndarray:
+    """[from_ord, to_ord] aralığındaki satırlar (tarih sırasında); uçlardan biri None olabilir."""
+    sorted_ordinals, order = date_index
+    lo = 0 if from_ord is None else int(np.searchsorted(sorted_ordinals, from_ord, side="left"))
+    hi = len(order) if to_ord is None else int(np.searchsorted(sorted_ordinals, to_ord, side="right"))
+    return np.asarray(order[lo:max(lo, hi)])
+
+
+def write_metadata_caches(index_dir: Path, metadatas) -> None:
+    date_ordinals, categories, indptr, indices = build_metadata_caches(metadatas)
+    date_sorted, date_order = build_date_index(date_ordinals)
+    np.save(index_dir / DATE_ORDINALS, date_ordinals)
+    np.save(index_dir / DATE_ORDER, date_order)
+    np.save(index_dir / DATE_SORTED, date_sorted)
+    np.save(index_dir / CATEGORY_INDPTR, indptr)
+    np.save(index_dir / CATEGORY_INDICES, indices)
+    with open(index_dir / CATEGORIES, "w", encoding="utf-8") as f:
+        json.dump(categories, f, ensure_ascii=False)
+
+
+def _csr_to_dict(categories: list[str], indptr: np.ndarray, indices: np.ndarray) -> dict[str, np.ndarray]:
+    return {cat: indices[indptr[i]:indptr[i + 1]] for i, cat in enumerate(categories)}
+
+
+def _load_date_index(index_dir: Path, date_ordinals: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    order_path, sorted_path = index_dir / DATE_ORDER, index_dir / DATE_SORTED
+    if order_path.exists() and sorted_path.exists():
+        return np.load(sorted_path, mmap_mode="r"), np.load(order_path, mmap_mode="r")
+    # Tarih index'inden önce yazılmış snapshot: yüklemede hesapla
+    return build_date_index(date_ordinals)
+
+
+def load_metadata_caches(
+    index_dir: Path, metadatas
+) -> tuple[np.ndarray, tuple[np.ndarray, np.ndarray], dict[str, np.ndarray]]:
+    """Tarih ordinal'leri, tarih index'i ve kategori -> satırlar (mmap); dosyalar yoksa (eski index) hesapla."""
+    paths = [index_dir / name for name in (DATE_ORDINALS, CATEGORIES, CATEGORY_INDPTR, CATEGORY_INDICES)]
+    if all(p.exists() for p in paths):
+        date_ordinals = np.load(paths[0], mmap_mode="r")
+        if len(date_ordinals) == len(metadatas):
+            with open(paths[1], encoding="utf-8") as f:
+                categories = json.load(f)
+            indptr = np.load(paths[2])
+            indices = np.load(paths[3], mmap_mode="r")
+            date_index = _load_date_index(index_dir, date_ordinals)
+            return date_ordinals, date_index, _csr_to_dict(categories, indptr, indices)
+
+    date_ordinals, categories, indptr, indices = build_metadata_caches(metadatas)
+    return date_ordinals, build_date_index(date_ordinals), _csr_to_dict(categories, indptr, indices)
@@ -0,0 +1,262 @@
+# Models - process genelinde paylaşılan model registry'si
+#
+# Embedding modeli, reranker ve OpenAI istemcisi process başına bir kez yüklenir;
+# indexer ve retriever aynı kopyayı kullanır. Yükleme lazy'dir (ilk kullanımda),
+# süre ve ağırlıkların bellekte kapladığı yer raporlanır, unload_model ile bırakılır.
+# Sorgu formatı ve sorgu encode'u (encode_queries) da burada: retriever'ın araması ile
+# indexer'ın kategori açıklama vektörleri aynı vektörleri üretir.
+import contextlib
+import gc
+import io
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from .config import (
+    EMBEDDING_BACKEND,
+    INSTRUCT_TASK,
+    LOCAL_EMBEDDING_MODEL,
+    MODEL_WARMUP,
+    OPENAI_EMBEDDING_MODEL,
+    RERANKER_MODEL,
+    USE_GPU,
+    USE_INSTRUCT_FORMAT,
+    load_env,
+)
+
+EMBEDDING_MODEL = "embedding"
+RERANKER = "reranker"
+OPENAI_CLIENT = "openai"
+
+# ad -> {"model", "name", "device", "load_seconds", "warmup_seconds", "resident_mb"}
+_models: dict[str, dict[str, Any]] = {}
+_lock = threading.RLock()
+# HF fast tokenizer aynı anda iki thread'den çağrılamaz ("Already borrowed"); sorgu encode'ları
+# sıraya girer, çağıranların FAISS/BM25/MMR adımları bu sırada paralel ilerler
+_encode_lock = threading.Lock()
+
+
+def silence_hf_progress() -> None:
+    """HuggingFace/Transformers progress bar ve gürültülü logları kapat."""
+    os.environ.setdefault("HF_HUB_DISABLE_PROGRESS_BARS", "1")
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+    try:
+        from huggingface_hub.utils import disable_progress_bars
+
+        disable_progress_bars()
+    except Exception:
+        pass
+
+    try:
+        from transformers.utils import logging as hf_logging
+
+        hf_logging.set_verbosity_error()
+        hf_logging.disable_progress_bar()
+    except Exception:
+        pass
+
+
+def select_device() -> str:
+    """USE_GPU açık ve CUDA varsa "cuda", yoksa "cpu"."""
+    import torch
+
+    if USE_GPU and torch.cuda.is_available():
+        return "cuda"
+    return "cpu"
+
+
+def _resident_mb(model) -> float:
+    """Ağırlık + buffer'ların kapladığı bellek (MB); ONNX modelinde .onnx dosya boyutu."""
+    try:
+        import torch
+    except ImportError:
+        return 0.0
+    modules = [model] if isinstance(model, torch.nn.Module) else [getattr(model, "model", None)]
+    total = 0
+    for module in modules:
+        if not isinstance(module, torch.nn.Module):
+            continue
+        for tensor in list(module.parameters()) + list(module.buffers()):
+            total += tensor.numel() * tensor.element_size()
+    if total == 0 and hasattr(model, "_first_module"):
+        # ONNX Runtime ağırlıkları torch parametresi değil
+        model_path = getattr(getattr(model._first_module(), "auto_model", None), "model_path", None)
+        if model_path is not None and Path(model_path).exists():
+            total = Path(model_path).stat().st_size
+    return total / (1024 * 1024)
+
+
+def _register(key: str, name: str, loader, warmup=None):
+    """key yüklü değilse yükle, ölç ve kaydet; modeli döndür.
+
+    loader() (model, cihaz) döndürür; cihazı olmayan istemcilerde cihaz None.
+    """
+    entry = _models.get(key)
+    if entry is not None:
+        return entry["model"]
+    with _lock:
+        entry = _models.get(key)
+        if entry is not None:
+            return entry["model"]
+
+        load_env()
+        t0 = time.perf_counter()
+        model, device = loader()
+        load_seconds = time.perf_counter() - t0
+        if warmup is not None and MODEL_WARMUP:
+            # İlk çağrının (CUDA kernel, tokenizer init) gecikmesi yüklemeye yansısın
+            warmup(model)
+        entry = {
+            "model": model,
+            "name": name,
+            "device": device,
+            "load_seconds": load_seconds,
+            "warmup_seconds": time.perf_counter() - t0 - load_seconds,
+            "resident_mb": _resident_mb(model),
+        }
+        _models[key] = entry
+
+    if device is not None:
+        print(
+            f"[i] Loaded {name} on {device.upper()} in {entry['load_seconds']:.1f}s "
+            f"(warm-up {entry['warmup_seconds']:.2f}s, {entry['resident_mb']:.0f} MB)"
+        )
+    return model
+
+
+def get_local_model():
+    """Paylaşılan SentenceTransformer embedding modeli."""
+
+    def load():
+        silence_hf_progress()
+        if EMBEDDING_BACKEND == "onnx":
+            from .onnx_backend import load_onnx_model
+
+            try:
+                model = load_onnx_model()
+            except Exception as e:
+                print(f"[!] ONNX backend yüklenemedi, PyTorch kullanılıyor: {e}")
+                model = None
+            if model is not None:
+                return model, "onnx-cpu"
+
+        from sentence_transformers import SentenceTransformer
+
+        device = select_device()
+        if device == "cuda":
+            import torch
+
+            print(f"[i] GPU: {torch.cuda.get_device_name(0)}")
+        # SentenceTransformer model load sırasında çıkan "Loading weights" barını bastır.
+        with contextlib.redirect_stderr(io.StringIO()):
+            return SentenceTransformer(LOCAL_EMBEDDING_MODEL, device=device), device
+
+    def warmup(model):
+        model.encode(["query: warm-up"], convert_to_numpy=True, normalize_embeddings=True)
+
+    return _register(EMBEDDING_MODEL, LOCAL_EMBEDDING_MODEL, load, warmup)
+
+
+def get_reranker_model():
+    """Paylaşılan CrossEncoder reranker."""
+
+    def load():
+        silence_hf_progress()
+        from sentence_transformers import CrossEncoder
+
+        device = select_device()
+        # Opsiyonel reranker yüklemesinde de aynı progress/log spam'ini bastır.
+        with contextlib.redirect_stderr(io.StringIO()):
+            return CrossEncoder(RERANKER_MODEL, device=device), device
+
+    def warmup(model):
+        model.predict([("warm-up", "warm-up")])
+
+    return _register(RERANKER, RERANKER_MODEL, load, warmup)
+
+
+def get_openai_client():
+    def load():
+        from openai import OpenAI
+
+        return OpenAI(), None
+
+    return _register(OPENAI_CLIENT, "openai", load)
+
+
+def unload_model(key: str | None = None) -> None:
+    """Modeli (key=None ise hepsini) bırak; GPU belleği de boşaltılır."""
+    with _lock:
+        keys = list(_models) if key is None else [key]
+        freed = [_models.pop(k) for k in keys if k in _models]
+    if not freed:
+        return
+    on_gpu = any(entry["device"] == "cuda" for entry in freed)
+    del freed
+    gc.collect()
+    if on_gpu:
+        import torch
+
+        torch.cuda.empty_cache()
+
+
+def loaded_models() -> list[dict[str, Any]]:
+    """Yüklü modellerin raporu (ad, cihaz, yükleme süresi, bellek)."""
+    return [
+        {k: v for k, v in entry.items() if k != "model"} | {"key": key}
+        for key, entry in _models.items()
+    ]
+
+
+def embedding_backend() -> str:
+    """Local embedding'lerin gerçekte üretildiği backend: "onnx-int8" veya "torch".
+
+    EMBEDDING_BACKEND="onnx" iken ONNX kurulu değilse ya da export/parity başarısızsa model
+    PyTorch'a düşer; cache anahtarları config'e değil bu sonuca göre ayrılır. Model yüklüyse
+    kaydındaki cihaz belirler, yüklenmemişse (cache isabeti model yüklemeden) export durumu.
+    """
+    if EMBEDDING_BACKEND != "onnx":
+        return "torch"
+    entry = _models.get(EMBEDDING_MODEL)
+    if entry is not None:
+        return "onnx-int8" if entry["device"] == "onnx-cpu" else "torch"
+    from .onnx_backend import onnx_ready
+
+    return "onnx-int8" if onnx_ready() else "torch"
+
+
+def query_format(provider: str) -> str:
+    """Sorgu vektörlerinin üretildiği format (query cache anahtarı ve açıklama vektörleri için)."""
+    if provider == "openai":
+        return "query"
+    mode = f"query-instruct:{INSTRUCT_TASK}" if USE_INSTRUCT_FORMAT else "query-prefix"
+    if embedding_backend() == "onnx-int8":
+        mode += "+onnx-int8"
+    return mode
+
+
+def encode_queries(queries: list[str], provider: str):
+    """(len(queries), dim) normalize float32 sorgu vektörleri; tek encode / API çağrısı, cache'siz."""
+    import numpy as np
+
+    if provider == "openai":
+        import faiss
+
+        client = get_openai_client()
+        response = client.embeddings.create(model=OPENAI_EMBEDDING_MODEL, input=queries)
+        data = sorted(response.data, key=lambda d: d.index)
+        emb = np.array([d.embedding for d in data], dtype=np.float32)
+        faiss.normalize_L2(emb)
+        return emb
+
+    model = get_local_model()
+    if USE_INSTRUCT_FORMAT:
+        processed = [f"Instruct: {INSTRUCT_TASK}\nQuery: {q}" for q in queries]
+    else:
+        processed = [f"query: {q}" for q in queries]
+    with _encode_lock:
+        emb = model.encode(processed, convert_to_numpy=True, normalize_embeddings=True)
+    return np.asarray(emb, dtype=np.float32).reshape(len(queries), -1)
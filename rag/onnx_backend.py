@@ -0,0 +1,161 @@
+# ONNX backend - yerel embedding modelinin ONNX Runtime (int8) ile CPU'da çalıştırılması
+#
+# Model bir kez sentence-transformers'ın ONNX backend'i ile dışa aktarılır, ağırlıklar
+# dinamik int8 kuantizasyonuyla küçültülür ve faiss_index/onnx/<model>/ altına yazılır.
+# Export sonunda PyTorch modeliyle parity kontrolü yapılır (export.json); eşik
+# tutmazsa backend kullanılmaz ve PyTorch'a dönülür.
+#
+# Gereken paketler: pyproject'teki `onnx` extra'sı (onnxruntime + optimum).
+import contextlib
+import io
+import json
+import platform
+from pathlib import Path
+
+import numpy as np
+
+from .config import (
+    CATEGORY_DESCRIPTIONS,
+    LOCAL_EMBEDDING_MODEL,
+    ONNX_CACHE_DIR,
+    ONNX_PARITY_MIN,
+    ONNX_QUANTIZATION,
+    load_env,
+)
+
+EXPORT_META = "export.json"
+
+
+def onnx_available() -> bool:
+    try:
+        import onnxruntime  # noqa: F401
+        import optimum.onnxruntime  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def export_dir() -> Path:
+    return ONNX_CACHE_DIR / LOCAL_EMBEDDING_MODEL.replace("/", "_")
+
+
+def quantization_config() -> str:
+    """Kuantizasyon profili; "auto" iken CPU'ya göre (arm64 / avx512_vnni / avx512 / avx2)."""
+    if ONNX_QUANTIZATION != "auto":
+        return ONNX_QUANTIZATION
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        flags = Path("/proc/cpuinfo").read_text(errors="ignore")
+    except OSError:
+        flags = ""
+    if "avx512_vnni" in flags or "avx512vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
+
+
+def read_export_meta() -> dict | None:
+    path = export_dir() / EXPORT_META
+    if not path.exists():
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def onnx_ready() -> bool:
+    """Export edilmiş ve parity kontrolünü geçmiş bir int8 model var mı (export yapmadan)."""
+    if not onnx_available():
+        return False
+    meta = read_export_meta()
+    return bool(meta and meta.get("parity_ok"))
+
+
+def open_onnx_model(file_name: str, threads: int | None = None):
+    """Export dizinindeki ONNX dosyasını sentence-transformers modeli olarak aç."""
+    from sentence_transformers import SentenceTransformer
+
+    model_kwargs = {"file_name": file_name, "provider": "CPUExecutionProvider"}
+    if threads:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = int(threads)
+        model_kwargs["session_options"] = options
+    with contextlib.redirect_stderr(io.StringIO()):
+        return SentenceTransformer(str(export_dir()), device="cpu", backend="onnx", model_kwargs=model_kwargs)
+
+
+def _parity_texts() -> list[str]:
+    """Parity için kısa Türkçe passage + query örnekleri (korpus gerektirmez)."""
+    from .indexer import _prepare_local_texts
+
+    descriptions = list(CATEGORY_DESCRIPTIONS.values())
+    return _prepare_local_texts(descriptions) + _prepare_local_texts(descriptions[:4], is_query=True)
+
+
+def parity(reference, candidate, texts: list[str]) -> np.ndarray:
+    """İki modelin aynı metinler için embedding'leri arasındaki satır bazında cosine."""
+    kwargs = {"batch_size": 16, "show_progress_bar": False, "convert_to_numpy": True, "normalize_embeddings": True}
+    a = np.asarray(reference.encode(texts, **kwargs), dtype=np.float32)
+    b = np.asarray(candidate.encode(texts, **kwargs), dtype=np.float32)
+    return np.sum(a * b, axis=1)
+
+
+def export_onnx_model(force: bool = False) -> dict:
+    """Modeli ONNX'e aktar, int8'e kuantize et, PyTorch ile karşılaştır; export.json'u döndür."""
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    meta = read_export_meta()
+    if meta is not None and not force:
+        return meta
+
+    load_env()
+    out_dir = export_dir()
+    config = quantization_config()
+    print(f"[i] Exporting {LOCAL_EMBEDDING_MODEL} to ONNX (int8, {config}): {out_dir}")
+    with contextlib.redirect_stderr(io.StringIO()):
+        model = SentenceTransformer(LOCAL_EMBEDDING_MODEL, device="cpu", backend="onnx")
+    model.save_pretrained(str(out_dir))
+    suffix = f"int8_{config}"
+    export_dynamic_quantized_onnx_model(model, config, str(out_dir), file_suffix=suffix)
+    del model
+
+    # sentence-transformers sürümüne göre alt klasör değişebilir; dosyayı ada göre bul
+    found = sorted(out_dir.rglob(f"model_{suffix}.onnx"))
+    if not found:
+        raise FileNotFoundError(f"Kuantize ONNX dosyası bulunamadı: {out_dir}")
+    file_name = found[0].relative_to(out_dir).as_posix()
+
+    with contextlib.redirect_stderr(io.StringIO()):
+        reference = SentenceTransformer(LOCAL_EMBEDDING_MODEL, device="cpu")
+    cosines = parity(reference, open_onnx_model(file_name), _parity_texts())
+    meta = {
+        "model": LOCAL_EMBEDDING_MODEL,
+        "file_name": file_name,
+        "quantization": config,
+        "parity_min_cosine": float(cosines.min()),
+        "parity_mean_cosine": float(cosines.mean()),
+        "parity_ok": bool(cosines.min() >= ONNX_PARITY_MIN),
+    }
+    with open(out_dir / EXPORT_META, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    status = "OK" if meta["parity_ok"] else f"< {ONNX_PARITY_MIN}, PyTorch kullanılacak"
+    print(
+        f"[✓] ONNX export: min cosine {meta['parity_min_cosine']:.4f}, "
+        f"mean {meta['parity_mean_cosine']:.4f} ({status})"
+    )
+    return meta
+
+
+def load_onnx_model(threads: int | None = None):
+    """int8 ONNX embedding modeli (gerekirse önce export); kullanılamıyorsa None."""
+    if not onnx_available():
+        print("[!] onnxruntime/optimum yüklü değil (uv sync --extra onnx); PyTorch kullanılıyor")
+        return None
+    meta = export_onnx_model()
+    if not meta.get("parity_ok"):
+        return None
+    return open_onnx_model(meta["file_name"], threads)
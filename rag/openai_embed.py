@@ -0,0 +1,277 @@
+# OpenAI embeddings - eşzamanlı, rate-limit farkındalıklı async istemci
+#
+# Index build'de embeddings endpoint'ine token sayısına göre paketlenmiş
+# istekler gönderilir ve aynı anda N istek uçuşta tutulur. 429 gelince
+# eşzamanlılık yarıya iner ve Retry-After / üstel bekleme uygulanır; başarılı
+# isteklerle yavaşça geri artar. Başarısız batch'ler tek tek yeniden denenir.
+import asyncio
+import os
+import queue
+import random
+import threading
+
+import numpy as np
+
+from .config import (
+    OPENAI_EMBEDDING_MODEL,
+    OPENAI_EMBED_CONCURRENCY,
+    OPENAI_EMBED_MAX_INPUTS,
+    OPENAI_EMBED_MAX_INPUT_TOKENS,
+    OPENAI_EMBED_MAX_REQUEST_TOKENS,
+    OPENAI_EMBED_MAX_RETRIES,
+    load_env,
+)
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+REQUEST_TIMEOUT = 120
+# Bu kadar ardışık başarılı istekten sonra eşzamanlılık limiti 1 artar
+_RAISE_AFTER_SUCCESSES = 8
+# tiktoken yoksa token sayısı için kaba (muhafazakâr) tahmin: UTF-8 byte / 2
+_APPROX_BYTES_PER_TOKEN = 2
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    """tiktoken opsiyonel: kuruluysa gerçek token sayımı, değilse tahmin."""
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+
+            try:
+                _encoding = tiktoken.encoding_for_model(OPENAI_EMBEDDING_MODEL)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("cl100k_base")
+        except ImportError:
+            _encoding = None
+    return _encoding
+
+
+def prepare_inputs(texts: list[str], max_tokens: int = OPENAI_EMBED_MAX_INPUT_TOKENS) -> tuple[list[str], list[int]]:
+    """Boş metinleri doldur, token limitine göre kırp; (metinler, token sayıları) döndür."""
+    enc = _get_encoding()
+    out_texts, out_tokens = [], []
+    for t in texts:
+        t = t.strip() or " "
+        if enc is not None:
+            ids = enc.encode(t)
+            if len(ids) > max_tokens:
+                ids = ids[:max_tokens]
+                t = enc.decode(ids)
+            n_tokens = len(ids)
+        else:
+            max_bytes = max_tokens * _APPROX_BYTES_PER_TOKEN
+            raw = t.encode("utf-8")
+            if len(raw) > max_bytes:
+                t = raw[:max_bytes].decode("utf-8", errors="ignore")
+                raw = t.encode("utf-8")
+            n_tokens = max(1, len(raw) // _APPROX_BYTES_PER_TOKEN)
+        out_texts.append(t)
+        out_tokens.append(n_tokens)
+    return out_texts, out_tokens
+
+
+def pack_requests(
+    token_counts: list[int],
+    max_request_tokens: int = OPENAI_EMBED_MAX_REQUEST_TOKENS,
+    max_inputs: int = OPENAI_EMBED_MAX_INPUTS,
+) -> list[list[int]]:
+    """Pozisyonları istek başına token ve input limitine sığacak şekilde (sırayla) paketle."""
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for i, n in enumerate(token_counts):
+        if current and (current_tokens + n > max_request_tokens or len(current) >= max_inputs):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += n
+    if current:
+        batches.append(current)
+    return batches
+
+
+class RateLimitError(Exception):
+    def __init__(self, retry_after: float | None):
+        super().__init__("rate limited")
+        self.retry_after = retry_after
+
+
+class _AdaptiveLimiter:
+    """AIMD eşzamanlılık limiti: 429'da yarıya in, başarıda yavaşça art."""
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, rate_limited: bool) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+            else:
+                self._successes += 1
+                if self._successes >= _RAISE_AFTER_SUCCESSES and self.limit < self.max_concurrency:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+class AsyncEmbeddingClient:
+    """Embeddings endpoint'i için eşzamanlı istemci (aiohttp)."""
+
+    def __init__(
+        self,
+        model: str = OPENAI_EMBEDDING_MODEL,
+        base_url: str | None = None,
+        api_key: str | None = None,
+        concurrency: int = OPENAI_EMBED_CONCURRENCY,
+        max_retries: int = OPENAI_EMBED_MAX_RETRIES,
+    ):
+        load_env()
+        self.model = model
+        self.base_url = (base_url or os.environ.get("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.stats = {"requests": 0, "rate_limited": 0, "retries": 0, "failed_batches": 0}
+
+    async def _post(self, session, texts: list[str]) -> np.ndarray:
+        import aiohttp
+
+        async with session.post(
+            f"{self.base_url}/embeddings",
+            json={"model": self.model, "input": texts, "encoding_format": "float"},
+        ) as resp:
+            self.stats["requests"] += 1
+            if resp.status == 429:
+                retry_after = resp.headers.get("Retry-After")
+                try:
+                    wait = float(retry_after) if retry_after else None
+                except ValueError:
+                    wait = None
+                raise RateLimitError(wait)
+            if resp.status >= 400:
+                body = await resp.text()
+                raise aiohttp.ClientResponseError(
+                    resp.request_info, resp.history, status=resp.status, message=body[:200]
+                )
+            payload = await resp.json()
+
+        data = sorted(payload["data"], key=lambda item: item["index"])
+        if len(data) != len(texts):
+            raise ValueError(f"Beklenen {len(texts)} embedding, gelen {len(data)}")
+        return np.array([item["embedding"] for item in data], dtype=np.float32)
+
+    async def _embed_batch(self, session, limiter: _AdaptiveLimiter, texts: list[str]) -> np.ndarray:
+        import aiohttp
+
+        attempt = 0
+        while True:
+            await limiter.acquire()
+            rate_limited = False
+            try:
+                return await self._post(session, texts)
+            except RateLimitError as e:
+                rate_limited = True
+                self.stats["rate_limited"] += 1
+                wait = e.retry_after
+                error = e
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                status = getattr(e, "status", None)
+                if status is not None and 400 <= status < 500:
+                    raise  # istek hatalı; tekrar denemek anlamsız
+                wait = None
+                error = e
+            finally:
+                await limiter.release(rate_limited)
+
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            self.stats["retries"] += 1
+            if wait is None:
+                wait = min(60.0, 0.5 * (2 ** (attempt - 1)))
+            await asyncio.sleep(wait * (1.0 + 0.25 * random.random()))
+
+    async def embed_batches(self, batches: list[list[str]], on_result) -> list[tuple[int, BaseException]]:
+        """Batch'leri eşzamanlı embed et; her biri bittikçe on_result(batch_no, vektörler) çağrılır.
+
+        Kalıcı olarak başarısız olan batch'ler (batch_no, hata) listesi olarak döner;
+        diğer batch'ler etkilenmez.
+        """
+        import aiohttp
+
+        limiter = _AdaptiveLimiter(self.concurrency)
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+        timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
+        failures: list[tuple[int, BaseException]] = []
+
+        async with aiohttp.ClientSession(headers=headers, timeout=timeout) as session:
+            async def _run(batch_no: int, texts: list[str]):
+                try:
+                    vectors = await self._embed_batch(session, limiter, texts)
+                except Exception as e:  # noqa: BLE001 - batch bazında raporlanır
+                    self.stats["failed_batches"] += 1
+                    failures.append((batch_no, e))
+                    return
+                on_result(batch_no, vectors)
+
+            await asyncio.gather(*(_run(i, b) for i, b in enumerate(batches)))
+        return failures
+
+
+def iter_openai_batches(texts: list[str], batches: list[list[int]], client: AsyncEmbeddingClient | None = None):
+    """Senkron köprü: async istemciyi ayrı thread'de çalıştır, biten batch'leri sırayla bekletmeden döndür.
+
+    (batch, vektörler) çiftleri tamamlanma sırasıyla gelir; çağıran taraf bunları
+    hemen cache'e yazabilir. Başarısız batch varsa tüm başarılılar döndükten sonra
+    RuntimeError fırlatılır.
+    """
+    client = client or AsyncEmbeddingClient()
+    results: queue.Queue = queue.Queue()
+    done = object()
+    outcome: dict = {}
+
+    def _on_result(batch_no: int, vectors: np.ndarray):
+        results.put((batches[batch_no], vectors))
+
+    def _runner():
+        try:
+            payload = [[texts[j] for j in batch] for batch in batches]
+            outcome["failures"] = asyncio.run(client.embed_batches(payload, _on_result))
+        except BaseException as e:  # noqa: BLE001 - ana thread'e taşınır
+            outcome["error"] = e
+        finally:
+            results.put(done)
+
+    thread = threading.Thread(target=_runner, daemon=True)
+    thread.start()
+    while True:
+        item = results.get()
+        if item is done:
+            break
+        yield item
+    thread.join()
+
+    if "error" in outcome:
+        raise outcome["error"]
+    failures = outcome.get("failures") or []
+    if failures:
+        first = failures[0][1]
+        raise RuntimeError(
+            f"{len(failures)} embedding batch'i başarısız oldu (ilk hata: {first}). "
+            "Tamamlanan batch'ler cache'te; build'i tekrar çalıştırmak sadece eksikleri embed eder."
+        )
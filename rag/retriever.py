@@ -1,227 +1,89 @@
 # Retriever - FAISS'den arama
-import os
-import io
 import json
-import pickle
-import re
 import contextlib
-from collections import Counter, defaultdict
-from datetime import date
+import threading
+import time
+from collections import Counter
 from pathlib import Path
 from typing import Any
 
-import faiss
 import numpy as np
 
 from .config import (
     EMBEDDING_PROVIDER,
+    CATEGORY_CENTROID_WEIGHT,
     CATEGORY_DESCRIPTIONS,
+    INDEX_HOT_RELOAD,
+    INDEX_RELOAD_CHECK_SECONDS,
     LOCAL_EMBEDDING_MODEL,
     MMR_LAMBDA,
     OPENAI_EMBEDDING_MODEL,
+    QUERY_CACHE_MAX_MB,
+    QUERY_CACHE_PATH,
+    QUERY_CACHE_PERSIST,
+    QUERY_CACHE_SIZE,
+    RERANK_BATCH_SIZE,
+    RERANK_CACHE_SIZE,
+    RERANK_SKIP_MARGIN,
     RERANK_TOP_N,
     RERANK_WEIGHT,
-    RERANKER_MODEL,
+    RESCORE_OVERSAMPLE,
+    RETRIEVAL_MODE,
+    RETRIEVAL_WORKERS,
+    RRF_K,
     SEMANTIC_CATEGORY_MIN_CHUNKS,
     TOP_K,
-    USE_GPU,
-    USE_INSTRUCT_FORMAT,
     USE_MMR,
     USE_RERANKER,
     get_index_path,
-    INSTRUCT_TASK,
 )
+from .category_vectors import build_centroids, descriptions_key, load_category_vectors
+from .chunk_store import load_chunk_store
+from .embed_cache import EmbeddingCache, QueryEmbeddingCache, RerankScoreCache, embedding_cache_key
+from .meta_cache import MISSING_DATE, date_range_rows, load_metadata_caches, to_ordinal
+from .models import RERANKER, encode_queries, get_reranker_model, query_format, unload_model
+from .snapshots import current_version, has_index, snapshot_dir
 
 # Lazy imports
-_openai_client = None
-_local_model = None
-_reranker_model = None
 _index_cache: dict[str, Any] | None = None
-_category_index_cache: dict[str, tuple[faiss.Index, np.ndarray]] = {}
+_reload_lock = threading.Lock()
+_reload_thread: threading.Thread | None = None
+_query_cache: QueryEmbeddingCache | None = None
+_rerank_cache: RerankScoreCache | None = None
+_executor = None  # asearch/amulti_search thread havuzu (ilk async çağrıda)
+# Eşzamanlı çağıranlar için: ilk index yüklemesi ve lazy nesneler (cache'ler, havuz, BM25) bir kez kurulur
+_init_lock = threading.RLock()
+# Reranker çağrıları sıraya girer (HF fast tokenizer thread-safe değil; sorgu encode'u models'ta)
+_rerank_lock = threading.Lock()
+# Reranker çağrı sayaçları (rerank_stats): çalışan, margin ile atlanan, modele giden çift.
+# Ayrı kilit: margin ile atlanan çağrılar başka thread'in predict'ini beklemez
+_rerank_counters = {"runs": 0, "skipped": 0, "scored_pairs": 0}
+_rerank_counters_lock = threading.Lock()
 
 # Retrieval tuning
 DEFAULT_CANDIDATE_MULTIPLIER = 8
 DEFAULT_MIN_CANDIDATES = 30
-MAX_MULTI_QUERY_PER_QUERY_K = 14
+# IVF/HNSW'de bu boyuta kadar filtreler IDSelector yerine filtre satırları üzerinde kesin taranır
 MAX_SUBSET_VECTOR_SEARCH = 12000
+RETRIEVAL_MODES = ("dense", "hybrid")
 CONTEXT_MAX_CHARS = 12000
 CONTEXT_MAX_CHARS_PER_DOC = 1500
 
-TR_MONTHS = {
-    "ocak": 1,
-    "şubat": 2,
-    "subat": 2,
-    "mart": 3,
-    "nisan": 4,
-    "mayıs": 5,
-    "mayis": 5,
-    "haziran": 6,
-    "temmuz": 7,
-    "ağustos": 8,
-    "agustos": 8,
-    "eylül": 9,
-    "eylul": 9,
-    "ekim": 10,
-    "kasım": 11,
-    "kasim": 11,
-    "aralık": 12,
-    "aralik": 12,
-}
-
-
-# Description embeddings cache
-_desc_embedding_cache = {}
-
-
-def _silence_hf_progress() -> None:
-    """HuggingFace/Transformers progress bar ve gürültülü logları kapat."""
-    os.environ.setdefault("HF_HUB_DISABLE_PROGRESS_BARS", "1")
-    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
-
-    try:
-        from huggingface_hub.utils import disable_progress_bars
-
-        disable_progress_bars()
-    except Exception:
-        pass
-
-    try:
-        from transformers.utils import logging as hf_logging
-
-        hf_logging.set_verbosity_error()
-        hf_logging.disable_progress_bar()
-    except Exception:
-        pass
-
-
-def _get_description_embeddings(config):
-    """Kategori açıklamalarını önceden vektörleştir (lazy load)."""
-    global _desc_embedding_cache
-    if _desc_embedding_cache:
-        return _desc_embedding_cache
-
-    provider = config.get("embedding_provider", "local")
-    
-    # OpenAI için batch embed gerekebilir, şimdilik local odaklı yapıyoruz
-    # Veya tek tek embed ediyoruz (az kategori var zaten)
-    
-    cats = {}
-    
-    for cat, desc in CATEGORY_DESCRIPTIONS.items():
-        # Açıklamayı bir "doküman" gibi değil, bir "query" gibi de düşünebiliriz
-        # ama en doğrusu: Query -> Description eşleşmesi.
-        # Basitlik için _resolve_query_embedding kullanıyoruz.
-        vec = _resolve_query_embedding(desc, config)
-        if vec is not None:
-             cats[cat] = vec
-             
-    _desc_embedding_cache = cats
-    return cats
-
-
-def get_openai_client():
-    global _openai_client
-    if _openai_client is None:
-        from openai import OpenAI
-
-        _openai_client = OpenAI()
-    return _openai_client
-
-
-def get_local_model():
-    global _local_model
-    if _local_model is None:
-        _silence_hf_progress()
-        from sentence_transformers import SentenceTransformer
-        import torch
-
-        device = "cuda" if USE_GPU and torch.cuda.is_available() else "cpu"
-        # SentenceTransformer model load sırasında çıkan "Loading weights" barını bastır.
-        with contextlib.redirect_stderr(io.StringIO()):
-            _local_model = SentenceTransformer(LOCAL_EMBEDDING_MODEL, device=device)
-    return _local_model
-
-
-def get_reranker_model():
-    global _reranker_model
-    if _reranker_model is None:
-        _silence_hf_progress()
-        from sentence_transformers import CrossEncoder
-
-        # Opsiyonel reranker yüklemesinde de aynı progress/log spam'ini bastır.
-        with contextlib.redirect_stderr(io.StringIO()):
-            _reranker_model = CrossEncoder(RERANKER_MODEL)
-    return _reranker_model
-
-
 def _cache_fits(index_path: Path) -> bool:
     return _index_cache is not None and _index_cache.get("index_path") == str(index_path)
 
 
 def clear_cache():
     """Retriever cache'ini temizle (uzun processlerde yenileme için)."""
-    global _index_cache, _category_index_cache, _reranker_model
+    global _index_cache
     _index_cache = None
-    _category_index_cache = {}
-    _reranker_model = None
+    unload_model(RERANKER)
 
 
 def _clean_query(query: str) -> str:
     return " ".join((query or "").split())
 
 
-def _safe_date(y: int, m: int, d: int) -> date | None:
-    try:
-        return date(y, m, d)
-    except ValueError:
-        return None
-
-
-def parse_date_string(raw: str) -> date | None:
-    """Metadata veya kullanıcı filtresinden tarih parse et."""
-    text = (raw or "").strip()
-    if not text:
-        return None
-
-    # ISO tarzı: 2024-03-18 veya 2024-03-18T...
-    m = re.search(r"(\d{4})-(\d{2})-(\d{2})", text)
-    if m:
-        parsed = _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
-        if parsed:
-            return parsed
-
-    # DD.MM.YYYY veya DD/MM/YYYY
-    m = re.search(r"\b(\d{1,2})[./](\d{1,2})[./](\d{4})\b", text)
-    if m:
-        parsed = _safe_date(int(m.group(3)), int(m.group(2)), int(m.group(1)))
-        if parsed:
-            return parsed
-
-    # "18 Mart 2021"
-    m = re.search(r"\b(\d{1,2})\s+([A-Za-zÇĞİÖŞÜçğıöşü]+)\s+(\d{4})\b", text)
-    if m:
-        day = int(m.group(1))
-        month_name = m.group(2).lower()
-        month = TR_MONTHS.get(month_name)
-        year = int(m.group(3))
-        if month:
-            parsed = _safe_date(year, month, day)
-            if parsed:
-                return parsed
-
-    # Sadece yıl
-    m = re.search(r"\b(19\d{2}|20\d{2})\b", text)
-    if m:
-        return date(int(m.group(1)), 1, 1)
-
-    return None
-
-
-def _to_ordinal_or_none(raw: str) -> int | None:
-    parsed = parse_date_string(raw)
-    return parsed.toordinal() if parsed else None
-
-
 def _doc_key(metadata: dict, content: str) -> str:
     url = (metadata.get("url") or "").strip()
     if url:
@@ -238,96 +100,254 @@ def _candidate_k(top_k: int, total: int) -> int:
     return min(total, max(top_k * DEFAULT_CANDIDATE_MULTIPLIER, top_k + DEFAULT_MIN_CANDIDATES))
 
 
-def _build_metadata_caches(metadatas: list[dict]) -> tuple[list[int | None], dict[str, np.ndarray]]:
-    date_ordinals: list[int | None] = []
-    category_to_indices: dict[str, list[int]] = defaultdict(list)
+def _check_mode(mode: str) -> None:
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Bilinmeyen retrieval modu: {mode} (seçenekler: {', '.join(RETRIEVAL_MODES)})")
 
-    for i, m in enumerate(metadatas):
-        date_ordinals.append(_to_ordinal_or_none(m.get("date", "")))
-        cat = (m.get("category") or "").strip().lower()
-        if cat:
-            category_to_indices[cat].append(i)
 
-    category_arrays = {k: np.array(v, dtype=np.int64) for k, v in category_to_indices.items()}
-    return date_ordinals, category_arrays
+def _read_index(index_path: Path) -> dict[str, Any]:
+    """Aktif snapshot'ı oku; arama için gereken her şey tek bir cache dict'inde."""
+    # CURRENT bir kez okunur; dosyalar hep aynı snapshot'tan gelir
+    import faiss
 
+    from .vector_index import configure_index, open_rescore_vectors, resident_vectors
 
-def load_index(force_reload: bool = False):
-    """FAISS index ve verileri yükle (process içi cache'li)."""
-    global _index_cache, _category_index_cache
-    index_path = get_index_path()
+    version = current_version(index_path)
+    index_dir = snapshot_dir(index_path, version)
 
-    if not index_path.exists():
-        raise FileNotFoundError(f"Index bulunamadı: {index_path}\nÖnce 'python main.py index' çalıştırın.")
-
-    if not force_reload and _cache_fits(index_path):
-        return (
-            _index_cache["index"],
-            _index_cache["chunks"],
-            _index_cache["metadatas"],
-            _index_cache["config"],
-        )
+    # IVF/HNSW varsayılan nprobe/efSearch ve IVF direct map (reconstruct için)
+    index = configure_index(faiss.read_index(str(index_dir / "index.faiss")))
 
-    index = faiss.read_index(str(index_path / "index.faiss"))
+    # Chunk metinleri mmap'ten, sadece erişildiğinde decode edilir.
+    chunks, metadatas = load_chunk_store(index_dir)
 
-    with open(index_path / "chunks.pkl", "rb") as f:
-        chunks = pickle.load(f)
-
-    with open(index_path / "metadatas.pkl", "rb") as f:
-        metadatas = pickle.load(f)
-
-    config_path = index_path / "config.json"
+    config_path = index_dir / "config.json"
     config = {}
     if config_path.exists():
         with open(config_path) as f:
             config = json.load(f)
 
-    date_ordinals, category_to_indices = _build_metadata_caches(metadatas)
+    # Tarih ordinal'leri ve kategori -> satırlar index ile birlikte yazıldı (mmap)
+    date_ordinals, date_index, category_to_indices = load_metadata_caches(index_dir, metadatas)
 
-    _index_cache = {
+    # FAISS etiketleri chunk_id; eski (ID'siz) index'lerde satır numarası.
+    chunk_id_col = metadatas.column("chunk_id")
+    if chunk_id_col is None:
+        chunk_ids = np.arange(len(metadatas), dtype=np.int64)
+    else:
+        chunk_ids = np.asarray(chunk_id_col, dtype=np.int64)
+    chunk_id_sorter = None if np.all(chunk_ids[1:] > chunk_ids[:-1]) else np.argsort(chunk_ids)
+
+    # Vektör matrisi (MMR, filtreli kesin skor): flat/HNSW'de index belleğine kopyasız
+    # görünüm, diğer tiplerde float16 kopya (mmap). Yoksa (eski snapshot) reconstruct_batch.
+    vectors, vector_rows = resident_vectors(index, chunk_ids) or (None, None)
+    if vectors is None:
+        vectors = open_rescore_vectors(index_dir)
+        if vectors is not None and len(vectors) != len(chunks):
+            print("[!] float16 vektör kopyası chunk sayısıyla uyuşmuyor; kullanılmıyor")
+            vectors = None
+
+    # Sıkıştırılmış index: adaylar float16 kopyadan kesin skorla yeniden sıralanır
+    rescore_vectors = vectors if config.get("index_codec", "float32") != "float32" else None
+
+    return {
         "index_path": str(index_path),
+        "index_dir": index_dir,
+        "version": version,
+        "checked_at": time.monotonic(),
         "index": index,
         "chunks": chunks,
         "metadatas": metadatas,
         "config": config,
         "date_ordinals": date_ordinals,
+        "date_index": date_index,
         "category_to_indices": category_to_indices,
-
+        "chunk_ids": chunk_ids,
+        "chunk_id_sorter": chunk_id_sorter,
+        "vectors": vectors,
+        "vector_rows": vector_rows,
+        "rescore_vectors": rescore_vectors,
+        "lexical": None,
         "category_centroids": None,
     }
-    _category_index_cache = {}
-    return index, chunks, metadatas, config
 
 
-def _resolve_query_embedding(query: str, config: dict) -> np.ndarray:
-    provider = config.get("embedding_provider", EMBEDDING_PROVIDER)
+def _reload_in_background(index_path: Path, version: str) -> None:
+    global _index_cache
+    try:
+        cache = _read_index(index_path)
+    except Exception as e:
+        # Eski snapshot ile devam; bir sonraki kontrolde tekrar denenir
+        print(f"[!] Index snapshot {version} yüklenemedi: {e}")
+        return
+    with _reload_lock:
+        if _cache_fits(index_path):
+            _index_cache = cache
+    print(f"[i] Index snapshot yüklendi: {cache['version']}")
+
+
+def _maybe_reload(cache: dict[str, Any], index_path: Path) -> None:
+    """CURRENT değiştiyse yeni snapshot'ı arka planda yükle.
+
+    Yükleme bitene kadar aramalar eski cache ile devam eder; geçiş tek bir
+    atama ile olur. Arama başında alınan cache sorgu bitene kadar kullanılır.
+    """
+    global _reload_thread
+    now = time.monotonic()
+    if now - cache["checked_at"] < INDEX_RELOAD_CHECK_SECONDS:
+        return
+    cache["checked_at"] = now
+    version = current_version(index_path)
+    if version is None or version == cache["version"]:
+        return
+    with _reload_lock:
+        if _reload_thread is not None and _reload_thread.is_alive():
+            return
+        _reload_thread = threading.Thread(
+            target=_reload_in_background,
+            args=(index_path, version),
+            name="index-reload",
+            daemon=True,
+        )
+        _reload_thread.start()
+
+
+def _get_cache(force_reload: bool = False) -> dict[str, Any]:
+    """Aktif index cache'i (ilk çağrıda yüklenir, sonra CURRENT'a göre yenilenir)."""
+    global _index_cache
+    index_path = get_index_path()
+    cache = _index_cache
+
+    if force_reload or cache is None or cache["index_path"] != str(index_path):
+        with _init_lock:
+            # Eşzamanlı ilk çağrılarda index bir kez okunur, diğerleri hazır cache'i alır
+            cache = _index_cache
+            if force_reload or cache is None or cache["index_path"] != str(index_path):
+                if not has_index(index_path):
+                    raise FileNotFoundError(f"Index bulunamadı: {index_path}\nÖnce 'python main.py index' çalıştırın.")
+                cache = _read_index(index_path)
+                with _reload_lock:
+                    _index_cache = cache
+    elif INDEX_HOT_RELOAD:
+        _maybe_reload(cache, index_path)
+    return cache
+
+
+def load_index(force_reload: bool = False):
+    """FAISS index ve verileri yükle (process içi cache'li)."""
+    cache = _get_cache(force_reload)
+    return cache["index"], cache["chunks"], cache["metadatas"], cache["config"]
+
+
+def load_vectors(force_reload: bool = False) -> tuple[np.ndarray | None, np.ndarray | None]:
+    """Index'in vektör matrisi ve chunk satırı -> matris satırı eşlemesi.
+
+    Flat/HNSW index'lerde index belleğine kopyasız float32 görünüm, diğer tiplerde
+    float16 kopya (mmap). Eşleme None ise chunk satırı i matrisin i. satırıdır.
+    Matris yoksa (float16 kopyası olmayan eski snapshot) (None, None).
+    """
+    cache = _get_cache(force_reload)
+    return cache["vectors"], cache["vector_rows"]
+
+
+@contextlib.contextmanager
+def exact_search_index():
+    """Sıkıştırılmış index yerine float16 kopyadan kurulan kesin (flat) index ile ara.
+
+    Kompakt modun Hit@K/MRR kaybını ölçmek için (eval). Index sıkıştırılmamışsa
+    hiçbir şey değiştirmez ve False verir.
+    """
+    import faiss
+
+    from .vector_index import resident_vectors
+
+    global _index_cache
+    cache = _get_cache()
+    rescore_vectors = cache["rescore_vectors"]
+    if rescore_vectors is None:
+        yield False
+        return
+
+    chunk_ids = cache["chunk_ids"]
+    exact = faiss.IndexIDMap2(faiss.IndexFlatIP(cache["index"].d))
+    block = 65536
+    for start in range(0, len(chunk_ids), block):
+        vectors = np.asarray(rescore_vectors[start:start + block], dtype=np.float32)
+        exact.add_with_ids(vectors, chunk_ids[start:start + block])
+
+    # Karşılaştırma bitene kadar hot reload kapalı (checked_at = inf)
+    vectors, vector_rows = resident_vectors(exact, chunk_ids) or (None, None)
+    _index_cache = {
+        **cache,
+        "index": exact,
+        "vectors": vectors,
+        "vector_rows": vector_rows,
+        "rescore_vectors": None,
+        "checked_at": float("inf"),
+    }
+    try:
+        yield True
+    finally:
+        _index_cache = cache
+
+
+def get_query_cache() -> QueryEmbeddingCache | None:
+    global _query_cache
+    if QUERY_CACHE_SIZE <= 0:
+        return None
+    if _query_cache is None:
+        with _init_lock:
+            if _query_cache is None:
+                disk = EmbeddingCache(QUERY_CACHE_PATH, QUERY_CACHE_MAX_MB * 1024 * 1024) if QUERY_CACHE_PERSIST else None
+                _query_cache = QueryEmbeddingCache(QUERY_CACHE_SIZE, disk)
+    return _query_cache
+
+
+def query_cache_stats() -> dict:
+    """Sorgu embedding cache'inin hit/miss raporu (cache kapalıysa boş)."""
+    query_cache = get_query_cache()
+    return query_cache.stats() if query_cache is not None else {}
+
+
+def _query_cache_key(query: str, provider: str) -> str:
     if provider == "openai":
-        client = get_openai_client()
-        response = client.embeddings.create(model=OPENAI_EMBEDDING_MODEL, input=query)
-        emb = np.array([response.data[0].embedding], dtype=np.float32)
-        faiss.normalize_L2(emb)
-        return emb
-
-    model = get_local_model()
-    if USE_INSTRUCT_FORMAT:
-        processed = f"Instruct: {INSTRUCT_TASK}\nQuery: {query}"
-    else:
-        processed = f"query: {query}"
-    emb = model.encode([processed], convert_to_numpy=True, normalize_embeddings=True)
-    return emb.astype(np.float32)
+        return embedding_cache_key(query, provider, OPENAI_EMBEDDING_MODEL, "query")
+    return embedding_cache_key(query, provider, LOCAL_EMBEDDING_MODEL, query_format(provider))
+
+
+def _resolve_query_embedding(query: str, config: dict, use_cache: bool = True) -> np.ndarray:
+    return _resolve_query_embeddings([query], config, use_cache)
+
+
+def _resolve_query_embeddings(queries: list[str], config: dict, use_cache: bool = True) -> np.ndarray:
+    """(len(queries), dim) sorgu vektörleri; cache'te olmayanlar tek encode çağrısında."""
+    provider = config.get("embedding_provider", EMBEDDING_PROVIDER)
+    queries = [_clean_query(q) for q in queries]
+    query_cache = get_query_cache() if use_cache else None
+    if query_cache is None:
+        return encode_queries(queries, provider)
+
+    dim = int(config.get("embedding_dim") or 0)
+    keys = [_query_cache_key(q, provider) for q in queries]
+    found = [query_cache.get(key, dim) for key in keys]
+    missing = [i for i, emb in enumerate(found) if emb is None]
+    if missing:
+        encoded = encode_queries([queries[i] for i in missing], provider)
+        for row, i in enumerate(missing):
+            found[i] = encoded[row : row + 1]
+            # Anahtar encode'dan sonra: model ONNX yerine PyTorch'a düştüyse int8 anahtarına yazılmaz
+            query_cache.put(_query_cache_key(queries[i], provider), found[i])
+    return np.vstack(found).astype(np.float32, copy=False)
 
 
 def _get_allowed_indices(
-    metadatas: list[dict],
+    cache: dict[str, Any],
     category: str | None,
     date_from: str | None,
     date_to: str | None,
 ) -> np.ndarray | None:
-    if _index_cache is None:
-        load_index()
-
-    date_ordinals = _index_cache["date_ordinals"]
-    category_to_indices = _index_cache["category_to_indices"]
+    date_ordinals = cache["date_ordinals"]
+    category_to_indices = cache["category_to_indices"]
 
     allowed: np.ndarray | None = None
 
@@ -337,91 +357,292 @@ def _get_allowed_indices(
         if allowed is None:
             return np.array([], dtype=np.int64)
 
-    from_ord = _to_ordinal_or_none(date_from or "")
-    to_ord = _to_ordinal_or_none(date_to or "")
+    from_ord = to_ordinal(date_from or "")
+    to_ord = to_ordinal(date_to or "")
 
     if from_ord is None and to_ord is None:
         return allowed
 
+    # Tarih aralığı sıralı tarih index'inde iki searchsorted
+    date_rows = date_range_rows(cache["date_index"], from_ord, to_ord)
     if allowed is None:
-        base_indices = np.arange(len(metadatas), dtype=np.int64)
-    else:
-        base_indices = allowed
-
-    filtered = []
-    for idx in base_indices:
-        d_ord = date_ordinals[int(idx)]
-        if d_ord is None:
-            continue
-        if from_ord is not None and d_ord < from_ord:
-            continue
-        if to_ord is not None and d_ord > to_ord:
-            continue
-        filtered.append(int(idx))
-    return np.array(filtered, dtype=np.int64)
-
-
-def _vector_candidates(
-    index,
+        return np.sort(date_rows)
+
+    # Kategori ile kesişim küçük taraf üzerinden: kategori küçükse kendi ordinal'lerine bakılır
+    allowed = np.asarray(allowed, dtype=np.int64)
+    if len(allowed) <= len(date_rows):
+        ordinals = np.asarray(date_ordinals[allowed])
+        lo = MISSING_DATE + 1 if from_ord is None else from_ord
+        hi = np.iinfo(np.int32).max if to_ord is None else to_ord
+        return allowed[(ordinals >= lo) & (ordinals <= hi)]
+    return np.intersect1d(allowed, date_rows, assume_unique=True)
+
+
+def _labels_to_rows(cache: dict[str, Any], labels: np.ndarray) -> np.ndarray:
+    """FAISS etiketlerini (chunk_id) chunk store satırlarına çevir; silinmişler -1."""
+    chunk_ids = cache["chunk_ids"]
+    sorter = cache["chunk_id_sorter"]
+    labels = np.asarray(labels, dtype=np.int64)
+    if chunk_ids.size == 0:
+        return np.full(labels.shape, -1, dtype=np.int64)
+    pos = np.searchsorted(chunk_ids, labels, sorter=sorter)
+    pos = np.minimum(pos, chunk_ids.size - 1)
+    rows = pos if sorter is None else sorter[pos]
+    return np.where(chunk_ids[rows] == labels, rows, -1)
+
+
+def _reconstruct_rows(cache: dict[str, Any], rows) -> np.ndarray:
+    """Chunk satırlarının vektörleri (yeni float32 dizi); vektör matrisinden fancy indexing ile."""
+    rows = np.asarray(rows, dtype=np.int64)
+    vectors = cache["vectors"]
+    if vectors is not None:
+        if cache["vector_rows"] is not None:
+            rows = cache["vector_rows"][rows]
+        return np.asarray(vectors[rows], dtype=np.float32)
+    index = cache["index"]
+    return np.asarray(index.reconstruct_batch(cache["chunk_ids"][rows]), dtype=np.float32)
+
+
+def _rescore(
+    cache: dict[str, Any],
     query_embedding: np.ndarray,
+    candidates: dict[int, float],
     top_n: int,
-    allowed_indices: np.ndarray | None = None,
 ) -> dict[int, float]:
+    """Sıkıştırılmış index'in yaklaşık skorlarını float16 kopya ile kesin skora çevir."""
+    if cache["rescore_vectors"] is None or not candidates:
+        return candidates
+    rows = np.fromiter(candidates.keys(), dtype=np.int64, count=len(candidates))
+    order = np.argsort(rows)  # mmap'ten artan sırayla oku
+    exact = np.empty(len(rows), dtype=np.float32)
+    vectors = np.asarray(cache["rescore_vectors"][rows[order]], dtype=np.float32)
+    exact[order] = vectors @ query_embedding[0]
+    best = np.argsort(-exact, kind="stable")[:top_n]
+    return {int(rows[i]): float(exact[i]) for i in best}
+
+
+def _subset_candidates(
+    cache: dict[str, Any],
+    query_embeddings: np.ndarray,
+    allowed_indices: np.ndarray,
+    top_n: int,
+) -> list[dict[int, float]]:
+    """Filtre satırlarının vektörleri üzerinde kesin (brute-force) skor; her sorgu için top_n."""
+    vectors = _reconstruct_rows(cache, allowed_indices)
+    scores = query_embeddings @ vectors.T
+    k = min(top_n, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    results = []
+    for q in range(len(query_embeddings)):
+        order = top[q][np.argsort(-scores[q, top[q]], kind="stable")]
+        results.append({int(allowed_indices[j]): float(scores[q, j]) for j in order})
+    return results
+
+
+def vector_candidates(
+    cache: dict[str, Any],
+    query_embeddings: np.ndarray,
+    top_n: int,
+    allowed_indices: np.ndarray | None = None,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+) -> list[dict[int, float]]:
+    """Her sorgu satırı için {chunk satırı: skor}; tüm sorgular tek index.search çağrısında (nq>1).
+
+    cache aktif snapshot'tır; bench'ler aynı anahtarlarla (index, chunk_ids, chunk_id_sorter,
+    vectors, vector_rows, rescore_vectors) sentetik bir index de verebilir.
+    Kategori/tarih filtresi FAISS'e IDSelector olarak verilir: filtre tek geçişte
+    uygulanır, alt-index kurulmaz ve k büyütülerek tekrar aranmaz. IVF/HNSW seçici
+    filtrelerde taradığı listelerde/komşularda yeterli aday bulamaz; küçük filtreler
+    orada filtre satırlarının vektörleri üzerinde kesin skorlanır.
+    """
+    import faiss
+
+    from .vector_index import is_exhaustive, search_params, supports_id_selector
+
+    nq = len(query_embeddings)
     if top_n <= 0:
-        return {}
+        return [{} for _ in range(nq)]
 
+    index = cache["index"]
     total = index.ntotal
     if total <= 0:
-        return {}
+        return [{} for _ in range(nq)]
+    # Kompakt modda ilk geçiş daha geniş, sonra float16 ile kesin skor
+    first_n = top_n * RESCORE_OVERSAMPLE if cache["rescore_vectors"] is not None else top_n
 
-    # Filtre yoksa düz arama
     if allowed_indices is None:
-        k = min(total, top_n)
-        dists, idxs = index.search(query_embedding, k)
-        return {int(idx): float(dists[0][i]) for i, idx in enumerate(idxs[0]) if int(idx) >= 0}
+        # Tombstone'lu (index'te kalan ama silinmiş) vektörler sonuçtan düşer
+        dead = max(0, total - len(cache["chunk_ids"]))
+        k = min(total, first_n + dead)
+        params = search_params(index, nprobe=nprobe, ef_search=ef_search)
+    else:
+        if allowed_indices.size == 0:
+            return [{} for _ in range(nq)]
+        small = int(allowed_indices.size) <= MAX_SUBSET_VECTOR_SEARCH
+        if not supports_id_selector(index) or (small and not is_exhaustive(index)):
+            return _subset_candidates(cache, query_embeddings, allowed_indices, top_n)
+        # Selector chunk_id (FAISS etiketi) ile çalışır; silinmiş ID'ler zaten filtrede yok
+        selector = faiss.IDSelectorBatch(np.ascontiguousarray(cache["chunk_ids"][allowed_indices]))
+        k = min(first_n, int(allowed_indices.size))
+        params = search_params(index, nprobe=nprobe, ef_search=ef_search, sel=selector)
+
+    dists, labels = index.search(query_embeddings, k, params=params)
+    results = []
+    for q in range(nq):
+        rows = _labels_to_rows(cache, labels[q])
+        out = {}
+        for i, row in enumerate(rows.tolist()):
+            if row >= 0 and len(out) < first_n:
+                out[row] = float(dists[q][i])
+        results.append(_rescore(cache, query_embeddings[q : q + 1], out, top_n))
+    return results
+
+
+def _get_lexical(cache: dict[str, Any]):
+    """Snapshot'ın BM25 ters index'i; ilk hibrit aramada açılır (eski snapshot'ta kurulur)."""
+    lexical = cache["lexical"]
+    if lexical is None:
+        from .lexical import load_lexical_index
+
+        with _init_lock:
+            lexical = cache["lexical"]
+            if lexical is None:
+                lexical = cache["lexical"] = load_lexical_index(cache["index_dir"], cache["chunks"])
+    return lexical
+
+
+def _get_category_vectors(cache: dict[str, Any]) -> dict[str, Any]:
+    """Kategori açıklama vektörleri + chunk merkezleri; ilk kategori önerisinde açılır.
+
+    Build'de yazılan dosyalardan okunur. Açıklama vektörleri başka model/format/metin için
+    yazılmışsa bir kez encode edilir; dosyası olmayan (eski) snapshot'ta merkezler vektör
+    matrisinden hesaplanır. "matrix" = [açıklamalar; merkezler], öneri tek matris çarpımı.
+    Encode/hesap kilit dışında yapılır (diğer ilk yüklemeler beklemez); aynı anda gelen
+    çağıranlardan ilk biten sonucu yayınlar.
+    """
+    vecs = cache["category_centroids"]
+    if vecs is not None:
+        return vecs
+    loaded = _load_category_vectors(cache)
+    with _init_lock:
+        if cache["category_centroids"] is None:
+            cache["category_centroids"] = loaded
+    return cache["category_centroids"]
+
+
+def _load_category_vectors(cache: dict[str, Any]) -> dict[str, Any]:
+    config = cache["config"]
+    provider = config.get("embedding_provider", EMBEDDING_PROVIDER)
+    categories = list(CATEGORY_DESCRIPTIONS)
+    vecs = load_category_vectors(cache["index_dir"], descriptions_key(provider))
+    if vecs is None:
+        vecs = {"categories": categories, "descriptions": None, "centroids": None, "counts": None}
+        if cache["vectors"] is not None:
+            vecs["centroids"], vecs["counts"] = build_centroids(
+                cache["vectors"], cache["vector_rows"], cache["category_to_indices"], categories
+            )
+    if vecs["descriptions"] is None:
+        vecs["descriptions"] = _resolve_query_embeddings(list(CATEGORY_DESCRIPTIONS.values()), config)
+    if vecs["centroids"] is None:
+        vecs["matrix"] = vecs["descriptions"]
+    else:
+        vecs["matrix"] = np.vstack([vecs["descriptions"], vecs["centroids"]]).astype(np.float32, copy=False)
+    return vecs
 
-    if allowed_indices.size == 0:
-        return {}
 
-    # Küçük filtrede alt-index daha stabil
-    if int(allowed_indices.size) <= MAX_SUBSET_VECTOR_SEARCH:
-        vectors = np.vstack([index.reconstruct(int(i)) for i in allowed_indices]).astype(np.float32)
-        sub_index = faiss.IndexFlatIP(vectors.shape[1])
-        sub_index.add(vectors)
-        k = min(int(allowed_indices.size), top_n)
-        dists, local_idxs = sub_index.search(query_embedding, k)
-        out = {}
-        for i, loc in enumerate(local_idxs[0]):
-            if int(loc) < 0:
-                continue
-            real_idx = int(allowed_indices[int(loc)])
-            out[real_idx] = float(dists[0][i])
-        return out
+def _lexical_candidates(
+    cache: dict[str, Any], queries: list[str], top_n: int, allowed_indices: np.ndarray | None = None
+) -> list[dict[int, float]]:
+    """Her sorgu için {chunk satırı: BM25 skoru} (filtre satırlarıyla sınırlı)."""
+    lexical = _get_lexical(cache)
+    return [lexical.search(q, top_n, allowed_indices) for q in queries]
+
+
+def _fuse_candidates(
+    cache: dict[str, Any], rankings: list[dict[int, float]], query_embeddings: np.ndarray, vector_lists: int
+) -> list[dict]:
+    """Aday listelerini RRF ile birleştir; ilk vector_lists liste cosine skorludur.
+
+    score RRF'in [0, 1]'e ölçeklenmiş hali (reranker/MMR bununla çalışır), vector_score
+    sorgular arasındaki en iyi cosine; sadece BM25'in bulduğu satırlarda vektörden hesaplanır.
+    """
+    fused = _reciprocal_rank_fusion(rankings)
+    if not fused:
+        return []
+
+    best_vector: dict[int, float] = {}
+    for scores in rankings[:vector_lists]:
+        for idx, score in scores.items():
+            best_vector[idx] = max(best_vector.get(idx, -1.0), score)
+    missing = [idx for idx in fused if idx not in best_vector]
+    if missing:
+        sims = _reconstruct_rows(cache, missing) @ query_embeddings.T
+        best_vector.update(zip(missing, sims.max(axis=1).tolist()))
+
+    max_rrf = max(fused.values())
+    ranked = [
+        {"idx": idx, "score": rrf / max_rrf, "rrf_score": rrf, "vector_score": best_vector[idx]}
+        for idx, rrf in fused.items()
+    ]
+    ranked.sort(key=lambda x: (x["score"], x["vector_score"]), reverse=True)
+    return ranked
+
+
+def get_rerank_cache() -> RerankScoreCache | None:
+    global _rerank_cache
+    if RERANK_CACHE_SIZE <= 0:
+        return None
+    if _rerank_cache is None:
+        with _init_lock:
+            if _rerank_cache is None:
+                _rerank_cache = RerankScoreCache(RERANK_CACHE_SIZE)
+    return _rerank_cache
+
+
+def rerank_stats() -> dict:
+    """Reranker sayaçları ve skor cache'inin hit/miss raporu."""
+    rerank_cache = get_rerank_cache()
+    with _rerank_counters_lock:
+        counters = dict(_rerank_counters)
+    return counters | {"cache": rerank_cache.stats() if rerank_cache is not None else {}}
 
-    # Büyük filtrelerde global arayıp sonra süz
-    allowed_set = set(int(x) for x in allowed_indices)
-    k = min(total, max(top_n * 4, 200))
-    candidates: dict[int, float] = {}
-
-    while True:
-        dists, idxs = index.search(query_embedding, k)
-        for i, idx in enumerate(idxs[0]):
-            idx_int = int(idx)
-            if idx_int < 0:
-                continue
-            if idx_int in allowed_set:
-                candidates[idx_int] = float(dists[0][i])
-
-        if len(candidates) >= top_n or k >= total:
-            break
-        k = min(total, int(k * 1.8))
 
-    sorted_items = sorted(candidates.items(), key=lambda x: x[1], reverse=True)[:top_n]
-    return dict(sorted_items)
+def reset_rerank_stats() -> None:
+    with _rerank_counters_lock:
+        for key in _rerank_counters:
+            _rerank_counters[key] = 0
+    if _rerank_cache is not None:
+        _rerank_cache.reset_stats()
 
 
-def _apply_reranker(query: str, candidates: list[dict], chunks: list[str]) -> list[dict]:
-    if not candidates:
+def _count_rerank(**deltas: int) -> None:
+    with _rerank_counters_lock:
+        for key, delta in deltas.items():
+            _rerank_counters[key] += delta
+
+
+def _rerank_margin(candidates: list[dict], top_k: int) -> float:
+    """İlk RERANK_TOP_N aday içinde dense (cosine) top-1 ile top-k skoru arasındaki fark."""
+    dense = sorted((item["vector_score"] for item in candidates[:RERANK_TOP_N]), reverse=True)
+    return float(dense[0] - dense[min(max(top_k, 1), len(dense)) - 1])
+
+
+def _apply_reranker(
+    cache: dict[str, Any], queries: list[str], candidates: list[dict], top_k: int, skip_margin: float = RERANK_SKIP_MARGIN
+) -> list[dict]:
+    """İlk RERANK_TOP_N adayı cross-encoder skoruyla harmanla.
+
+    Her (sorgu, chunk) çifti skorlanır, chunk'ın skoru sorgular arasındaki en yüksek skordur
+    (multi_search'te alt sorgulardan birine uyan chunk cezalanmaz). Skorlar (snapshot, sorgu,
+    chunk_id) anahtarlı LRU'dan gelir; sadece cache'te olmayan çiftler tek predict çağrısında
+    (RERANK_BATCH_SIZE'lık batch'ler) modele gider. Dense top-1/top-k farkı skip_margin'i
+    geçerse sıralama zaten net sayılır ve model çağrılmaz (0: her zaman rerank).
+    """
+    if not candidates or not queries:
+        return candidates
+    if skip_margin > 0 and _rerank_margin(candidates, top_k) > skip_margin:
+        _count_rerank(skipped=1)
         return candidates
     try:
         model = get_reranker_model()
@@ -430,22 +651,35 @@ def _apply_reranker(query: str, candidates: list[dict], chunks: list[str]) -> li
 
     top_n = min(RERANK_TOP_N, len(candidates))
     top_slice = candidates[:top_n]
-    pairs = [(query, chunks[item["idx"]][:1200]) for item in top_slice]
-
-    try:
-        raw_scores = model.predict(pairs)
-    except Exception:
-        return candidates
-
-    # Normalize reranker scores to [0,1]
-    raw_arr = np.array(raw_scores, dtype=np.float32)
+    chunk_ids = [int(cache["chunk_ids"][item["idx"]]) for item in top_slice]
+    # Tam rebuild chunk_id'leri baştan dağıtır; snapshot adı anahtarda olunca reload sonrası eski skor dönmez
+    version = cache["version"]
+    keys = [(version, query, chunk_id) for query in queries for chunk_id in chunk_ids]
+    rerank_cache = get_rerank_cache()
+    known = rerank_cache.get_many(keys) if rerank_cache is not None else {}
+    missing = [i for i, key in enumerate(keys) if key not in known]
+    if missing:
+        pairs = [(keys[i][1], cache["chunks"][top_slice[i % top_n]["idx"]][:1200]) for i in missing]
+        try:
+            with _rerank_lock:
+                raw = model.predict(pairs, batch_size=RERANK_BATCH_SIZE, show_progress_bar=False)
+        except Exception:
+            return candidates
+        fresh = {keys[i]: float(score) for i, score in zip(missing, np.asarray(raw, dtype=np.float32).ravel())}
+        known.update(fresh)
+        if rerank_cache is not None:
+            rerank_cache.put_many(fresh)
+    _count_rerank(runs=1, scored_pairs=len(missing))
+
+    # (sorgu, chunk) skorları -> chunk başına en iyi sorgunun skoru, sonra [0,1]'e normalize
+    raw_arr = np.array([known[key] for key in keys], dtype=np.float32).reshape(len(queries), top_n).max(axis=0)
     min_v, max_v = float(raw_arr.min()), float(raw_arr.max())
     if max_v - min_v < 1e-9:
         rerank_norm = {item["idx"]: 1.0 for item in top_slice}
     else:
-        rerank_norm = {item["idx"]: float((raw_scores[i] - min_v) / (max_v - min_v)) for i, item in enumerate(top_slice)}
+        rerank_norm = {item["idx"]: float((raw_arr[i] - min_v) / (max_v - min_v)) for i, item in enumerate(top_slice)}
 
-    rerank_map = {item["idx"]: float(raw_scores[i]) for i, item in enumerate(top_slice)}
+    rerank_map = {item["idx"]: float(raw_arr[i]) for i, item in enumerate(top_slice)}
 
     updated = []
     for item in candidates:
@@ -460,53 +694,61 @@ def _apply_reranker(query: str, candidates: list[dict], chunks: list[str]) -> li
     return updated
 
 
-def _apply_mmr(index, candidates: list[dict], top_k: int, lambda_mult: float) -> list[dict]:
+def mmr_select(vecs: np.ndarray, rel: np.ndarray, sizes: np.ndarray, k: int, lambda_mult: float) -> np.ndarray:
+    """Batch, artımlı MMR seçimi.
+
+    vecs (B, P, d) normalize havuz vektörleri, rel (B, P) alaka skorları, sizes (B,) satır
+    başına geçerli havuz boyu. Her seçimden sonra sadece seçilenle benzerlik (tek
+    matris-vektör çarpımı) hesaplanır ve aday başına en yüksek benzerlik güncellenir.
+    (B, min(k, P)) seçilen havuz sıraları döner; havuzu kısa satırlar -1 ile dolar.
+    """
+    batch, pool = rel.shape
+    steps = min(k, pool)
+    out = np.full((batch, steps), -1, dtype=np.int64)
+    if steps <= 0:
+        return out
+
+    rows = np.arange(batch)
+    available = np.arange(pool)[None, :] < sizes[:, None]
+    rel_term = lambda_mult * rel.astype(np.float32)
+    max_sim = np.full((batch, pool), -np.inf, dtype=np.float32)
+    chosen = np.argmax(np.where(available, rel, -np.inf), axis=1)
+    for step in range(steps):
+        live = sizes > step
+        out[live, step] = chosen[live]
+        available[rows, chosen] = False
+        if step + 1 == steps:
+            break
+        sims = np.matmul(vecs, vecs[rows, chosen][:, :, None])[:, :, 0]
+        np.maximum(max_sim, sims, out=max_sim)
+        # Ceza terimi float64'te hesaplanıp float32'ye yuvarlanır (skalar döngüyle aynı sonuç)
+        scores = rel_term - ((1.0 - lambda_mult) * max_sim.astype(np.float64)).astype(np.float32)
+        scores[~available] = -np.inf
+        chosen = np.argmax(scores, axis=1)
+    return out
+
+
+def _apply_mmr(cache: dict[str, Any], candidates: list[dict], top_k: int, lambda_mult: float) -> list[dict]:
+    """Aday listesine MMR: havuz vektörleri tek seferde okunur, seçim mmr_select ile artımlı."""
     if top_k <= 0 or len(candidates) <= top_k:
         return candidates[:top_k]
 
-    pool_size = min(len(candidates), max(top_k * 8, 40))
-    pool = candidates[:pool_size]
-    vecs = np.vstack([index.reconstruct(item["idx"]) for item in pool]).astype(np.float32)
+    import faiss
+
+    pool = candidates[: max(top_k * 8, 40)]
+    vecs = _reconstruct_rows(cache, [item["idx"] for item in pool])
     faiss.normalize_L2(vecs)
     rel = np.array([item["score"] for item in pool], dtype=np.float32)
 
-    selected = []
-    selected_mask = np.zeros(pool_size, dtype=bool)
-
-    first = int(np.argmax(rel))
-    selected.append(first)
-    selected_mask[first] = True
-
-    while len(selected) < min(top_k, pool_size):
-        best_idx = -1
-        best_score = -1e9
-        for i in range(pool_size):
-            if selected_mask[i]:
-                continue
-            if not selected:
-                diversity_penalty = 0.0
-            else:
-                sims = vecs[i : i + 1] @ vecs[selected].T
-                diversity_penalty = float(np.max(sims))
-            mmr_score = float(lambda_mult * rel[i] - (1.0 - lambda_mult) * diversity_penalty)
-            if mmr_score > best_score:
-                best_score = mmr_score
-                best_idx = i
-        if best_idx < 0:
-            break
-        selected.append(best_idx)
-        selected_mask[best_idx] = True
-
-    selected_items = [pool[i] for i in selected]
+    picks = mmr_select(vecs[None], rel[None], np.array([len(pool)]), top_k, lambda_mult)[0]
+    selected_items = [pool[i] for i in picks if i >= 0]
     selected_items.sort(key=lambda x: x["score"], reverse=True)
 
     # Havuz dışındakileri sadece gerekirse ekle
-    if len(selected_items) < top_k:
-        extras = pool_size
-        while len(selected_items) < top_k and extras < len(candidates):
-            selected_items.append(candidates[extras])
-            extras += 1
-
+    extras = len(pool)
+    while len(selected_items) < top_k and extras < len(candidates):
+        selected_items.append(candidates[extras])
+        extras += 1
     return selected_items[:top_k]
 
 
@@ -528,28 +770,6 @@ def _dedupe_by_source(candidates: list[dict], chunks: list[str], metadatas: list
     return out
 
 
-def _build_category_index(index, metadatas: list[dict], category: str) -> tuple[faiss.Index, np.ndarray] | None:
-    cat_key = category.lower().strip()
-    if not cat_key:
-        return None
-    cached = _category_index_cache.get(cat_key)
-    if cached is not None:
-        return cached
-
-    cat_indices = np.array(
-        [i for i, m in enumerate(metadatas) if m.get("category", "").lower() == cat_key],
-        dtype=np.int64,
-    )
-    if cat_indices.size == 0:
-        return None
-
-    vectors = np.vstack([index.reconstruct(int(i)) for i in cat_indices]).astype(np.float32)
-    cat_index = faiss.IndexFlatIP(vectors.shape[1])
-    cat_index.add(vectors)
-    _category_index_cache[cat_key] = (cat_index, cat_indices)
-    return cat_index, cat_indices
-
-
 def search(
     query: str,
     top_k: int = TOP_K,
@@ -560,16 +780,32 @@ def search(
     use_mmr: bool = USE_MMR,
     mmr_lambda: float = MMR_LAMBDA,
     use_reranker: bool = USE_RERANKER,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    mode: str = RETRIEVAL_MODE,
+    rerank_skip_margin: float = RERANK_SKIP_MARGIN,
+    use_query_cache: bool = True,
 ) -> list[dict]:
-    """Sorguya en benzer dokümanları getir (vector + opsiyonel reranker + MMR)."""
+    """Sorguya en benzer dokümanları getir (vector [+ BM25] + opsiyonel reranker + MMR).
+
+    nprobe (IVF) ve ef_search (HNSW) verilirse sadece bu sorgu için index varsayılanını ezer.
+    mode="hybrid" iken vektör ve BM25 aday listeleri RRF ile birleşir.
+    rerank_skip_margin dense top-1/top-k farkı bunu geçince reranker'ı atlar (0: hiç atlama).
+    use_query_cache=False iken sorgu vektörü cache'e bakılmadan encode edilir.
+    Dönen score sıralamanın nihai skorudur (hybrid'de ölçekli RRF, reranker varsa harmanı),
+    vector_score ise her iki modda da sorgunun cosine skorudur.
+    """
+    _check_mode(mode)
     clean_query = _clean_query(query)
     if not clean_query or top_k <= 0:
         return []
 
-    index, chunks, metadatas, config = load_index()
-    query_embedding = _resolve_query_embedding(clean_query, config)
+    # Sorgu boyunca aynı snapshot (hot reload arada cache'i değiştirse de)
+    cache = _get_cache()
+    chunks, metadatas, config = cache["chunks"], cache["metadatas"], cache["config"]
+    query_embedding = _resolve_query_embedding(clean_query, config, use_query_cache)
 
-    allowed_indices = _get_allowed_indices(metadatas, category, date_from, date_to)
+    allowed_indices = _get_allowed_indices(cache, category, date_from, date_to)
     if allowed_indices is not None and allowed_indices.size == 0:
         return []
 
@@ -577,33 +813,41 @@ def search(
     if candidate_n <= 0:
         return []
 
-    vector_scores = _vector_candidates(index, query_embedding, candidate_n, allowed_indices)
-    if not vector_scores:
-        return []
+    vector_scores = vector_candidates(
+        cache, query_embedding, candidate_n, allowed_indices, nprobe=nprobe, ef_search=ef_search
+    )[0]
 
-    # Vector scores -> ranked list
-    ranked = [{"idx": idx, "score": score} for idx, score in vector_scores.items()]
-    ranked.sort(key=lambda x: x["score"], reverse=True)
+    if mode == "hybrid":
+        lexical_scores = _lexical_candidates(cache, [clean_query], candidate_n, allowed_indices)
+        ranked = _fuse_candidates(cache, [vector_scores] + lexical_scores, query_embedding, vector_lists=1)
+    else:
+        # Vector scores -> ranked list
+        ranked = [{"idx": idx, "score": score, "vector_score": score} for idx, score in vector_scores.items()]
+        ranked.sort(key=lambda x: x["score"], reverse=True)
+    if not ranked:
+        return []
 
     if use_reranker:
-        ranked = _apply_reranker(clean_query, ranked, chunks)
+        ranked = _apply_reranker(cache, [clean_query], ranked, top_k, rerank_skip_margin)
 
     if use_mmr:
-        ranked = _apply_mmr(index, ranked, max(top_k * 2, top_k), mmr_lambda)
+        ranked = _apply_mmr(cache, ranked, top_k * 2, mmr_lambda)
 
     ranked = _dedupe_by_source(ranked, chunks, metadatas, top_k, diversify_by_url)
 
     docs = []
     for item in ranked[:top_k]:
         idx = item["idx"]
-        docs.append(
-            {
-                "content": chunks[idx],
-                "metadata": metadatas[idx],
-                "score": float(item["score"]),
-                "rerank_score": float(item.get("rerank_score", 0.0)),
-            }
-        )
+        doc = {
+            "content": chunks[idx],
+            "metadata": metadatas[idx],
+            "score": float(item["score"]),
+            "vector_score": float(item["vector_score"]),
+            "rerank_score": float(item.get("rerank_score", 0.0)),
+        }
+        if "rrf_score" in item:
+            doc["rrf_score"] = float(item["rrf_score"])
+        docs.append(doc)
     return docs
 
 
@@ -619,6 +863,15 @@ def _unique_preserve_order(items: list[str]) -> list[str]:
     return out
 
 
+def _reciprocal_rank_fusion(rankings: list[dict[int, float]], k: int = RRF_K) -> dict[int, float]:
+    """Sıralı listeleri birleştir: her listede sırası r olan satıra 1 / (k + r) (r 1'den başlar)."""
+    fused: dict[int, float] = {}
+    for scores in rankings:
+        for rank, idx in enumerate(sorted(scores, key=scores.get, reverse=True), 1):
+            fused[idx] = fused.get(idx, 0.0) + 1.0 / (k + rank)
+    return fused
+
+
 def multi_search(
     queries: list[str],
     top_k: int = TOP_K,
@@ -627,8 +880,19 @@ def multi_search(
     date_to: str = None,
     use_mmr: bool = USE_MMR,
     use_reranker: bool = USE_RERANKER,
+    mode: str = RETRIEVAL_MODE,
+    rerank_skip_margin: float = RERANK_SKIP_MARGIN,
+    use_query_cache: bool = True,
 ) -> list[dict]:
-    """Birden fazla sorgu ile arama yap, sonuçları birleştir."""
+    """Birden fazla sorgu ile arama yap, sonuçları birleştir.
+
+    Sorgular tek encode ve tek index.search (nq>1) ile aranır, aday listeleri (hybrid
+    modda sorgu başına BM25 listeleri de) reciprocal rank fusion ile birleşir; reranker
+    (chunk başına en iyi alt sorgunun skoru), MMR ve kaynak tekilleştirme birleşik havuzda
+    bir kez çalışır. score ve vector_score search() ile aynı anlamdadır (vector_score alt
+    sorgular arasındaki en iyi cosine).
+    """
+    _check_mode(mode)
     if top_k <= 0:
         return []
 
@@ -636,35 +900,82 @@ def multi_search(
     if not unique_queries:
         return []
 
-    all_docs: dict[str, dict] = {}
-    hit_counts: dict[str, int] = {}
-
-    per_query_k = max(4, min(MAX_MULTI_QUERY_PER_QUERY_K, top_k // len(unique_queries) + 3))
-
-    for query in unique_queries:
-        docs = search(
-            query=query,
-            top_k=per_query_k,
-            category=category,
-            diversify_by_url=True,
-            date_from=date_from,
-            date_to=date_to,
-            use_mmr=use_mmr,
-            use_reranker=use_reranker,
+    # Tüm sorgular aynı snapshot'ta
+    cache = _get_cache()
+    chunks, metadatas, config = cache["chunks"], cache["metadatas"], cache["config"]
+
+    allowed_indices = _get_allowed_indices(cache, category, date_from, date_to)
+    if allowed_indices is not None and allowed_indices.size == 0:
+        return []
+
+    candidate_n = _candidate_k(top_k, int(allowed_indices.size) if allowed_indices is not None else len(chunks))
+    if candidate_n <= 0:
+        return []
+
+    query_embeddings = _resolve_query_embeddings(unique_queries, config, use_query_cache)
+    rankings = vector_candidates(cache, query_embeddings, candidate_n, allowed_indices)
+    if mode == "hybrid":
+        rankings += _lexical_candidates(cache, unique_queries, candidate_n, allowed_indices)
+    ranked = _fuse_candidates(cache, rankings, query_embeddings, vector_lists=len(unique_queries))
+    if not ranked:
+        return []
+
+    if use_reranker:
+        ranked = _apply_reranker(cache, unique_queries, ranked, top_k, rerank_skip_margin)
+
+    if use_mmr:
+        ranked = _apply_mmr(cache, ranked, top_k * 2, MMR_LAMBDA)
+
+    ranked = _dedupe_by_source(ranked, chunks, metadatas, top_k, diversify_by_url=True)
+
+    docs = []
+    for item in ranked[:top_k]:
+        idx = item["idx"]
+        docs.append(
+            {
+                "content": chunks[idx],
+                "metadata": metadatas[idx],
+                "score": float(item["score"]),
+                "vector_score": float(item["vector_score"]),
+                "rrf_score": float(item["rrf_score"]),
+                "rerank_score": float(item.get("rerank_score", 0.0)),
+            }
         )
-        for doc in docs:
-            key = _doc_key(doc["metadata"], doc["content"])
-            hit_counts[key] = hit_counts.get(key, 0) + 1
-            if key not in all_docs or doc["score"] > all_docs[key]["score"]:
-                all_docs[key] = doc
+    return docs
+
+
+def _get_executor():
+    """asearch/amulti_search için RETRIEVAL_WORKERS thread'li havuz (ilk async çağrıda kurulur)."""
+    global _executor
+    if _executor is None:
+        with _init_lock:
+            if _executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                _executor = ThreadPoolExecutor(max_workers=RETRIEVAL_WORKERS, thread_name_prefix="retrieval")
+    return _executor
+
+
+async def _run_in_pool(executor, fn, *args, **kwargs):
+    import asyncio
+    import functools
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor or _get_executor(), functools.partial(fn, *args, **kwargs))
+
 
-    ranked = []
-    for key, doc in all_docs.items():
-        combined_score = doc["score"] + 0.03 * (hit_counts.get(key, 1) - 1)
-        ranked.append((combined_score, doc))
+async def asearch(query: str, executor=None, **kwargs) -> list[dict]:
+    """search()'ün async sürümü (aynı parametreler).
 
-    ranked.sort(key=lambda x: x[0], reverse=True)
-    return [doc for _, doc in ranked[:top_k]]
+    Arama thread havuzunda çalışır; event loop beklemez. executor verilmezse paylaşılan
+    havuz kullanılır: en fazla RETRIEVAL_WORKERS arama aynı anda çalışır, fazlası sıra bekler.
+    """
+    return await _run_in_pool(executor, search, query, **kwargs)
+
+
+async def amulti_search(queries: list[str], executor=None, **kwargs) -> list[dict]:
+    """multi_search()'ün async sürümü (aynı parametreler); varsayılan olarak asearch ile aynı havuzda."""
+    return await _run_in_pool(executor, multi_search, queries, **kwargs)
 
 
 def format_context(
@@ -738,48 +1049,48 @@ def build_evidence_snippets(
     return "\n".join(lines)
 
 
-def suggest_categories(query: str, top_n: int = 3, min_chunks: int = 1) -> list[dict]:
-    """Sorguya semantik olarak en yakın kategorileri öner (Açıklama bazlı)."""
+def suggest_categories(
+    query: str,
+    top_n: int = 3,
+    min_chunks: int = 1,
+    centroid_weight: float = CATEGORY_CENTROID_WEIGHT,
+) -> list[dict]:
+    """Sorguya semantik olarak en yakın kategorileri öner (açıklama + chunk merkezi bazlı).
+
+    Skor açıklama benzerliği ile kategori chunk'larının merkez benzerliğinin
+    (1 - centroid_weight, centroid_weight) ağırlıklı toplamı; chunk'ı olmayan
+    kategoride sadece açıklama.
+    """
     clean_q = _clean_query(query)
     if not clean_q:
         return []
 
-    # Config'i yükle
-    _, _, _, config = load_index()
-    
-    # 1. Sorgu vektörü
-    q_vec = _resolve_query_embedding(clean_q, config)
-    if q_vec is None:
-        return []
-    
-    # 2. Kategori açıklama vektörleri
-    desc_vecs = _get_description_embeddings(config)
-    if not desc_vecs:
+    cache = _get_cache()
+    q_vec = _resolve_query_embedding(clean_q, cache["config"])
+    vecs = _get_category_vectors(cache)
+    categories = vecs["categories"]
+    if q_vec is None or not categories:
         return []
-        
-    scores = []
-    for cat, d_vec in desc_vecs.items():
-        # Cosine similarity (vektörler zaten normalize geliyor _resolve_query_embedding'den)
-        # q_vec: (1, dim), d_vec: (1, dim)
-        score = float(np.dot(q_vec[0], d_vec[0]))
-        scores.append((score, cat))
-        
-    # Sırala
-    scores.sort(key=lambda x: x[0], reverse=True)
-    
-    # Formatla
-    suggestions = []
-    # Index'ten chunk sayılarını alalım (sadece bilgi amaçlı)
-    existing_cats = get_categories(min_chunks=0)
-    
-    for score, cat in scores[:top_n]:
-        suggestions.append({
-            "category": cat,
-            "score": score,
-            "chunks": existing_cats.get(cat, 0) # Eğer indexte yoksa 0 (ama açıklama var)
-        })
-        
-    return suggestions
+
+    # Açıklamalar ve merkezler tek matriste: (2C, dim) @ (dim,)
+    sims = vecs["matrix"] @ q_vec[0]
+    n = len(categories)
+    scores = sims[:n]
+    counts = vecs["counts"]
+    if centroid_weight and vecs["centroids"] is not None:
+        blended = (1.0 - centroid_weight) * scores + centroid_weight * sims[n:]
+        scores = np.where(counts > 0, blended, scores)
+
+    # Chunk sayıları (bilgi amaçlı) build'de merkezlerle birlikte yazıldı
+    if counts is None:
+        existing = get_categories(min_chunks=0)
+        counts = np.array([existing.get(cat, 0) for cat in categories], dtype=np.int64)
+
+    order = np.argsort(-scores, kind="stable")[:top_n]
+    return [
+        {"category": categories[i], "score": float(scores[i]), "chunks": int(counts[i])}
+        for i in order
+    ]
 
 
 def get_categories(min_chunks: int = SEMANTIC_CATEGORY_MIN_CHUNKS) -> dict[str, int]:
@@ -787,16 +1098,23 @@ def get_categories(min_chunks: int = SEMANTIC_CATEGORY_MIN_CHUNKS) -> dict[str,
     index, _, metadatas, _ = load_index()
     cats = Counter()
 
-    for m in metadatas:
-        cat_str = m.get("category")
-        if not cat_str:
+    # Satır satır dict üretmek yerine kategori kodlarını say
+    cat_codes = metadatas.column("category")
+    cat_vocab = metadatas.vocab("category")
+    if cat_codes is None or cat_vocab is None:
+        return {}
+    codes = np.asarray(cat_codes)
+    code_counts = np.bincount(codes[codes >= 0], minlength=len(cat_vocab))
+
+    for cat_str, count in zip(cat_vocab, code_counts.tolist()):
+        if not isinstance(cat_str, str) or not cat_str or not count:
             continue
             
         # Birden fazla kategori olabilir
         parts = [c.strip() for c in cat_str.replace("/", ",").split(",") if c.strip()]
         for c in parts:
             if c in CATEGORY_DESCRIPTIONS:
-                cats[c] += 1
+                cats[c] += count
 
     return {k: v for k, v in sorted(cats.items(), key=lambda x: -x[1]) if v >= min_chunks}
 
@@ -0,0 +1,122 @@
+# Snapshots - versiyonlu index dizinleri ve atomik yayınlama
+#
+# Disk düzeni (get_index_path() altında):
+#   snapshots/<versiyon>/   : bir build'in tüm dosyaları (index.faiss, chunk store, config.json, ...)
+#   CURRENT                 : aktif snapshot'ın adı
+#
+# Her build yeni bir snapshot dizinine yazılır; bitince CURRENT, geçici dosya +
+# os.replace ile tek adımda değiştirilir. Okuyucular ya eski ya yeni snapshot'ı
+# bütünüyle görür. Snapshot dosyaları yazıldıktan sonra değişmez; değişmeyen
+# dosyalar yeni snapshot'a hard link ile taşınır.
+import os
+import shutil
+import time
+from pathlib import Path
+
+from .config import INDEX_KEEP_SNAPSHOTS
+
+SNAPSHOTS_DIR = "snapshots"
+CURRENT_FILE = "CURRENT"
+
+# Snapshot düzeninden önceki index'lerin kök dizindeki dosyaları
+_LEGACY_FILES = (
+    "index.faiss",
+    "config.json",
+    "chunks.bin",
+    "chunk_offsets.npy",
+    "meta_schema.json",
+    "tombstones.npy",
+    "vectors_f16.npy",
+    "chunks.pkl",
+    "metadatas.pkl",
+)
+
+
+def current_version(root: Path) -> str | None:
+    """Aktif snapshot adı (CURRENT yoksa None)."""
+    try:
+        name = (root / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return name or None
+
+
+def snapshot_dir(root: Path, version: str | None) -> Path:
+    """Versiyonun dizini; versiyon yoksa (eski düzen) kök dizin."""
+    if version is not None:
+        snapshot = root / SNAPSHOTS_DIR / version
+        if snapshot.is_dir():
+            return snapshot
+    return root
+
+
+def resolve_index_dir(root: Path) -> Path:
+    """Okunacak index dizini: aktif snapshot, yoksa (eski düzen) kök dizin."""
+    return snapshot_dir(root, current_version(root))
+
+
+def has_index(root: Path) -> bool:
+    return (resolve_index_dir(root) / "index.faiss").exists()
+
+
+def new_snapshot_dir(root: Path) -> Path:
+    """Yazılacak yeni (boş) snapshot dizini; ad zamana göre sıralanır."""
+    base = root / SNAPSHOTS_DIR
+    base.mkdir(parents=True, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    for i in range(1000):
+        path = base / f"v{stamp}-{i:03d}"
+        try:
+            path.mkdir()
+            return path
+        except FileExistsError:
+            continue
+    raise RuntimeError(f"Snapshot dizini oluşturulamadı: {base}")
+
+
+def link_unchanged(src: Path, dst: Path, names) -> None:
+    """Değişmeyen dosyaları yeni snapshot'a hard link ile taşı (olmuyorsa kopyala)."""
+    for name in names:
+        source = src / name
+        if not source.exists():
+            continue
+        target = dst / name
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+
+
+def publish_snapshot(root: Path, snapshot: Path) -> None:
+    """CURRENT'ı atomik olarak yeni snapshot'a çevir, eski snapshot'ları buda."""
+    tmp = root / (CURRENT_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(snapshot.name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, root / CURRENT_FILE)
+    _remove_legacy_layout(root)
+    prune_snapshots(root)
+
+
+def prune_snapshots(root: Path, keep: int = INDEX_KEEP_SNAPSHOTS) -> None:
+    """Aktif olan dahil en yeni `keep` snapshot dışındakileri sil.
+
+    Açık process'ler eski dosyaları mmap'lemiş olabilir; Linux/macOS'ta silinen
+    dosya son referans kapanana kadar okunabilir kalır.
+    """
+    base = root / SNAPSHOTS_DIR
+    if not base.exists():
+        return
+    active = current_version(root)
+    snapshots = sorted(p for p in base.iterdir() if p.is_dir())
+    for path in snapshots[:-max(1, keep)]:
+        if path.name != active:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def _remove_legacy_layout(root: Path) -> None:
+    for name in _LEGACY_FILES:
+        (root / name).unlink(missing_ok=True)
+    for path in root.glob("meta_*.npy"):
+        path.unlink(missing_ok=True)
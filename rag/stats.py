@@ -4,7 +4,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 
 from .config import CONTENT_DIR
-from .retriever import parse_date_string
+from .dates import parse_date_string
 
 
 def _utc_now_iso() -> str:
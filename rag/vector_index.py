@@ -0,0 +1,268 @@
+# Vector index - FAISS index tipleri (flat / IVF / HNSW / IVF-PQ), eğitim ve arama ayarları
+#
+# Index'in etiketleri her tipte chunk_id'dir. IVF olmayan tipler IndexIDMap2 ile sarılır;
+# IVF tipleri ID'leri kendi listelerinde tutar (IDMap2'nin remove_ids'i IVF'nin
+# pozisyon düzeniyle uyumsuz). Kullanılan tip index'in config.json'una yazılır.
+#
+# Kompakt modda (INDEX_CODEC = "sq8" / "pq") index sadece sıkıştırılmış kodları
+# tutar; vektörlerin float16 kopyası (vectors_f16.npy, chunk store satır sırasıyla)
+# mmap ile açılır ve en iyi adayların kesin skorlaması için kullanılır.
+# Flat ve HNSW,Flat index'lerde vektörler index belleğinden kopyasız okunur; float32
+# dizisini tek parça tutmayan IVF tipleri de aynı float16 kopyayı yazar (MMR, filtre).
+import os
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from .config import (
+    FAISS_INDEX_TYPE,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_EF_SEARCH,
+    HNSW_M,
+    INDEX_CODEC,
+    INDEX_TRAIN_SAMPLE,
+    IVF_NLIST,
+    IVF_NPROBE,
+    PQ_M,
+    PQ_NBITS,
+)
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+INDEX_CODECS = ("float32", "sq8", "pq")
+RESCORE_VECTORS = "vectors_f16.npy"
+# k-means için merkez başına önerilen en az eğitim vektörü (FAISS uyarı eşiği)
+_MIN_POINTS_PER_CENTROID = 39
+# Eklemeler bu boyda bloklarla yapılır (memmap'ten okurken bellek sınırlı kalsın)
+ADD_BLOCK = 65536
+
+
+def resolve_index_type(index_type: str, n: int) -> str:
+    """İstenen tipi vektör sayısına göre uygula; eğitim için çok az vektör varsa düşür."""
+    if index_type not in INDEX_TYPES:
+        print(f"[!] Unknown index type: {index_type}, using flat")
+        return "flat"
+    if index_type == "ivf_pq" and n < (2 ** PQ_NBITS) * _MIN_POINTS_PER_CENTROID:
+        print(f"[!] {n} vektör PQ eğitimi için az, ivf_flat kullanılıyor")
+        index_type = "ivf_flat"
+    if index_type.startswith("ivf") and n < 2 * _MIN_POINTS_PER_CENTROID:
+        print(f"[!] {n} vektör IVF eğitimi için az, flat kullanılıyor")
+        return "flat"
+    return index_type
+
+
+def resolve_codec(index_type: str, codec: str, n: int) -> str:
+    """Vektör kodlaması; ivf_pq her zaman pq, PQ eğitimi için az vektör varsa sq8."""
+    if index_type == "ivf_pq":
+        return "pq"
+    if codec not in INDEX_CODECS:
+        print(f"[!] Unknown index codec: {codec}, using float32")
+        return "float32"
+    if codec == "pq" and n < (2 ** PQ_NBITS) * _MIN_POINTS_PER_CENTROID:
+        print(f"[!] {n} vektör PQ eğitimi için az, sq8 kullanılıyor")
+        return "sq8"
+    return codec
+
+
+def _auto_nlist(n: int) -> int:
+    nlist = IVF_NLIST or int(4 * np.sqrt(max(1, n)))
+    return max(1, min(nlist, n // _MIN_POINTS_PER_CENTROID))
+
+
+def _pq_m(dim: int) -> int:
+    """PQ_M'e en yakın (küçük veya eşit) dim böleni."""
+    m = max(1, min(PQ_M, dim))
+    while dim % m:
+        m -= 1
+    return m
+
+
+def index_factory_string(index_type: str, dim: int, n: int, codec: str = "float32") -> str:
+    if index_type == "ivf_pq":
+        return f"IVF{_auto_nlist(n)},PQ{_pq_m(dim)}x{PQ_NBITS}"
+    storage = {"sq8": "SQ8", "pq": f"PQ{_pq_m(dim)}x{PQ_NBITS}"}.get(codec, "Flat")
+    if index_type == "hnsw":
+        return f"HNSW{HNSW_M},{storage}"
+    if index_type == "ivf_flat":
+        return f"IVF{_auto_nlist(n)},{storage}"
+    return storage
+
+
+def _hnsw(index: faiss.Index):
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    return inner if isinstance(inner, faiss.IndexHNSW) else None
+
+
+def is_id_mapped(index: faiss.Index) -> bool:
+    """Etiketler chunk_id mi (IDMap2 veya kendi ID'lerini tutan IVF)?"""
+    return isinstance(index, faiss.IndexIDMap2) or faiss.try_extract_index_ivf(index) is not None
+
+
+def ivf_nlist(index: faiss.Index) -> int | None:
+    ivf = faiss.try_extract_index_ivf(index)
+    return int(ivf.nlist) if ivf is not None else None
+
+
+def configure_index(index: faiss.Index, nprobe: int | None = None, ef_search: int | None = None) -> faiss.Index:
+    """Okunan/kurulan index'e varsayılan arama parametrelerini ve IVF direct map'ini uygula."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = int(nprobe or IVF_NPROBE)
+        # reconstruct(chunk_id) ve remove_ids ikisi de hashtable direct map ile çalışır
+        if ivf.direct_map.type != faiss.DirectMap.Hashtable:
+            ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+    hnsw = _hnsw(index)
+    if hnsw is not None:
+        hnsw.hnsw.efSearch = int(ef_search or HNSW_EF_SEARCH)
+    return index
+
+
+def is_exhaustive(index: faiss.Index) -> bool:
+    """Her sorguda tüm vektörleri tarayan (flat / SQ / PQ) index mi? (IVF/HNSW değil)"""
+    return faiss.try_extract_index_ivf(index) is None and _hnsw(index) is None
+
+
+def supports_id_selector(index: faiss.Index) -> bool:
+    """search(params=SearchParameters(sel=...)) destekleniyor mu? (IndexPQ desteklemiyor)"""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    return not isinstance(inner, faiss.IndexPQ)
+
+
+def search_params(
+    index: faiss.Index,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    sel: faiss.IDSelector | None = None,
+):
+    """Sorgu bazında nprobe / efSearch / ID filtresi (index'in varsayılanlarını değiştirmeden).
+
+    sel verilirse sadece o ID'ler (chunk_id) sonuç olabilir. SearchParameters verilince
+    index'in nprobe/efSearch değeri kullanılmadığı için mevcut değerler açıkça taşınır.
+    """
+    extra = {"sel": sel} if sel is not None else {}
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and (nprobe or sel is not None):
+        return faiss.SearchParametersIVF(nprobe=int(nprobe or ivf.nprobe), **extra)
+    hnsw = _hnsw(index)
+    if hnsw is not None and (ef_search or sel is not None):
+        return faiss.SearchParametersHNSW(efSearch=int(ef_search or hnsw.hnsw.efSearch), **extra)
+    if sel is not None:
+        return faiss.SearchParameters(sel=sel)
+    return None
+
+
+def flat_storage(index: faiss.Index) -> faiss.IndexFlat | None:
+    """Vektörleri tek bir float32 dizide tutan iç index (flat veya HNSW,Flat); yoksa None."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap2) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner = faiss.downcast_index(inner.storage)
+    return inner if isinstance(inner, faiss.IndexFlat) else None
+
+
+def resident_vectors(index: faiss.Index, chunk_ids: np.ndarray) -> tuple[np.ndarray, np.ndarray | None] | None:
+    """Index'in float32 vektör dizisine kopyasız (salt okunur) NumPy görünümü.
+
+    (matris, satırlar) döner: satırlar chunk store satırı -> matris satırı eşlemesidir,
+    sıralar aynıysa None. Görünüm index belleğini paylaşır; index yaşadığı ve
+    değişmediği sürece geçerlidir. Dizi yoksa (IVF, SQ/PQ) veya bir chunk_id index'te
+    bulunamazsa None.
+    """
+    storage = flat_storage(index)
+    if storage is None or storage.ntotal == 0:
+        return None
+    matrix = faiss.rev_swig_ptr(storage.get_xb(), storage.ntotal * storage.d).reshape(storage.ntotal, storage.d)
+    matrix.flags.writeable = False
+    if isinstance(index, faiss.IndexIDMap2):
+        labels = faiss.vector_to_array(index.id_map).astype(np.int64, copy=False)
+    else:
+        labels = np.arange(storage.ntotal, dtype=np.int64)
+    if np.array_equal(labels, chunk_ids):
+        return matrix, None
+    # Tombstone'lu (HNSW) veya sırası farklı index: chunk_id ile satır eşle
+    sorter = np.argsort(labels)
+    pos = np.minimum(np.searchsorted(labels, chunk_ids, sorter=sorter), len(labels) - 1)
+    rows = sorter[pos]
+    if not np.array_equal(labels[rows], chunk_ids):
+        return None
+    return matrix, rows
+
+
+def new_id_index(dim: int, n: int = 0, index_type: str = "flat", codec: str = "float32") -> faiss.Index:
+    """Vektörleri kalıcı chunk_id ile tutan boş index."""
+    spec = index_factory_string(index_type, dim, n, codec)
+    if spec == "Flat":
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    base = faiss.index_factory(dim, spec, faiss.METRIC_INNER_PRODUCT)
+    if isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    if faiss.try_extract_index_ivf(base) is None:
+        return configure_index(faiss.IndexIDMap2(base))
+    return configure_index(base)
+
+
+def _training_sample(vectors: np.ndarray, max_n: int = INDEX_TRAIN_SAMPLE, seed: int = 42) -> np.ndarray:
+    n = len(vectors)
+    if n <= max_n:
+        return np.ascontiguousarray(vectors[:n], dtype=np.float32)
+    rows = np.sort(np.random.default_rng(seed).choice(n, size=max_n, replace=False))
+    return np.ascontiguousarray(vectors[rows], dtype=np.float32)
+
+
+def build_vector_index(
+    vectors: np.ndarray,
+    ids: np.ndarray,
+    index_type: str = FAISS_INDEX_TYPE,
+    codec: str = INDEX_CODEC,
+) -> tuple[faiss.Index, str, str]:
+    """chunk_id'li index kur; IVF/SQ/PQ tiplerinde önce örnek üzerinde eğit.
+
+    vectors bir memmap olabilir; eğitim örneği ve eklemeler bloklar halinde okunur.
+    (index, kullanılan tip, kullanılan kodlama) döndürür.
+    """
+    n, dim = len(ids), vectors.shape[1]
+    index_type = resolve_index_type(index_type, n)
+    codec = resolve_codec(index_type, codec, n)
+    index = new_id_index(dim, n, index_type, codec)
+    if not index.is_trained:
+        sample = _training_sample(vectors)
+        spec = index_factory_string(index_type, dim, n, codec)
+        print(f"[i] Training {index_type} index ({spec}) on {len(sample)} vectors...")
+        t0 = time.perf_counter()
+        index.train(sample)
+        print(f"[i] Training done in {time.perf_counter() - t0:.1f}s")
+    for start in range(0, n, ADD_BLOCK):
+        block = np.ascontiguousarray(vectors[start:start + ADD_BLOCK], dtype=np.float32)
+        index.add_with_ids(block, np.ascontiguousarray(ids[start:start + ADD_BLOCK], dtype=np.int64))
+    return index, index_type, codec
+
+
+# =============== RESCORE VECTORS (FLOAT16) ===============
+
+def needs_vector_copy(index: faiss.Index) -> bool:
+    """Vektörler index'ten kopyasız okunamıyorsa float16 kopya yazılır (SQ/PQ, IVF)."""
+    return flat_storage(index) is None
+
+
+def write_rescore_vectors(index_dir: Path, parts: list[np.ndarray]) -> None:
+    """Vektörleri (chunk store satır sırasıyla) float16 olarak yaz; parçalar memmap olabilir."""
+    n = sum(len(p) for p in parts)
+    dim = next((p.shape[1] for p in parts if p.ndim == 2), 0)
+    tmp = index_dir / (RESCORE_VECTORS + ".tmp")
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float16, shape=(n, dim))
+    pos = 0
+    for part in parts:
+        for start in range(0, len(part), ADD_BLOCK):
+            block = np.asarray(part[start:start + ADD_BLOCK])
+            out[pos:pos + len(block)] = block
+            pos += len(block)
+    out.flush()
+    del out
+    os.replace(tmp, index_dir / RESCORE_VECTORS)
+
+
+def open_rescore_vectors(index_dir: Path) -> np.ndarray | None:
+    path = index_dir / RESCORE_VECTORS
+    if not path.exists():
+        return None
+    return np.load(path, mmap_mode="r")
@@ -0,0 +1,62 @@
+import json
+
+import numpy as np
+import pytest
+
+from rag.chunk_store import ChunkMetadatas, ChunkStoreWriter, ChunkTexts, load_chunk_store, write_chunk_store
+
+
+def _records():
+    rows = []
+    for i in range(23):
+        row = {"title": f"Başlık {i % 5}", "chunk_id": i, "doc_idx": i // 4}
+        if i >= 7:
+            row["date"] = f"2020-01-{i % 28 + 1:02d}"  # sonradan gelen kolon
+        if i == 15:
+            row["doc_idx"] = "x"  # int kolon cat'e döner
+        if i % 6 == 0:
+            row["flag"] = True  # bool int sayılmaz
+        rows.append(row)
+    return rows
+
+
+def _write_streamed(path, chunks, metadatas, sizes):
+    writer = ChunkStoreWriter(path)
+    start = 0
+    for size in sizes:
+        writer.append(chunks[start:start + size], metadatas[start:start + size])
+        start += size
+    writer.close()
+
+
+@pytest.mark.parametrize("sizes", [[23], [1] * 23, [7, 0, 9, 7]])
+def test_writer_matches_write_chunk_store(tmp_path, sizes):
+    metadatas = _records()
+    chunks = [f"chunk {i} çğışöü " * (i % 3) for i in range(len(metadatas))]
+    write_chunk_store(tmp_path / "batch", chunks, metadatas)
+    _write_streamed(tmp_path / "stream", chunks, metadatas, sizes)
+
+    for name in ("meta_schema.json",):
+        assert json.loads((tmp_path / "batch" / name).read_text()) == json.loads((tmp_path / "stream" / name).read_text())
+    for path in (tmp_path / "batch").glob("*.npy"):
+        np.testing.assert_array_equal(np.load(path), np.load(tmp_path / "stream" / path.name))
+    assert (tmp_path / "batch" / "chunks.bin").read_bytes() == (tmp_path / "stream" / "chunks.bin").read_bytes()
+    assert not list((tmp_path / "stream").glob("*.raw"))
+
+    texts, metas = load_chunk_store(tmp_path / "stream")
+    assert list(texts) == chunks
+    assert list(metas) == metadatas
+
+
+def test_empty_store(tmp_path):
+    ChunkStoreWriter(tmp_path).close()
+    assert len(ChunkTexts.open(tmp_path)) == 0
+    assert len(ChunkMetadatas.open(tmp_path)) == 0
+
+
+def test_metadata_columns_and_vocab():
+    metas = ChunkMetadatas.from_records([{"category": "Etik", "n": 1}, {"n": 2}, {"category": "Etik", "n": 3}])
+    assert metas.column("n").tolist() == [1, 2, 3]
+    assert metas.column("category").tolist() == [0, -1, 0]
+    assert metas.vocab("category") == ["Etik"]
+    assert metas[1] == {"n": 2}
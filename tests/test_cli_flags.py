@@ -0,0 +1,26 @@
+import pytest
+
+import main
+
+
+def test_parse_int_flag():
+    assert main._parse_int_flag(["--full", "--workers", "4"], "--workers", 1) == 4
+    assert main._parse_int_flag(["--full"], "--workers", 1) == 1
+
+
+@pytest.mark.parametrize("args", [["--workers", "x"], ["--full", "--workers"]])
+def test_parse_int_flag_rejects_bad_or_missing_value(args):
+    with pytest.raises(SystemExit):
+        main._parse_int_flag(args, "--workers", 1)
+
+
+def test_parse_shared_flags_mode():
+    opts, rest = main._parse_shared_flags(["--mode", "hybrid", "soru"])
+    assert opts["retrieval_mode"] == "hybrid"
+    assert rest == ["soru"]
+
+
+@pytest.mark.parametrize("args", [["--mode", "sparse"], ["soru", "--mode"]])
+def test_parse_shared_flags_rejects_bad_or_missing_mode(args):
+    with pytest.raises(SystemExit):
+        main._parse_shared_flags(args)
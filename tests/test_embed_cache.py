@@ -0,0 +1,93 @@
+import numpy as np
+
+import rag.indexer as indexer
+from rag.embed_cache import EmbeddingCache, QueryEmbeddingCache, embedding_cache_key
+
+
+def _vec(text: str, dim: int = 4) -> np.ndarray:
+    v = np.random.default_rng(abs(hash(text)) % (2**32)).standard_normal(dim).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def _fake_model(monkeypatch, cache, calls: list):
+    monkeypatch.setattr(indexer, "get_embedding_dim", lambda: 4)
+    monkeypatch.setattr(indexer, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(indexer, "_plan_batches", lambda texts, batch_size: ([list(range(len(texts)))], None, texts))
+
+    def fake_batches(texts, batches):
+        for batch in batches:
+            calls.extend(texts[j] for j in batch)
+            yield batch, np.vstack([_vec(texts[j]) for j in batch])
+
+    monkeypatch.setattr(indexer, "_iter_batch_embeddings", fake_batches)
+
+
+def test_embed_chunks_sends_duplicate_misses_once(monkeypatch):
+    calls = []
+    _fake_model(monkeypatch, None, calls)
+    chunks = ["a", "b", "a", "c", "b", "a"]
+    out = indexer.embed_chunks(chunks, report=False)
+    assert calls == ["a", "b", "c"]
+    np.testing.assert_array_equal(out, np.vstack([_vec(c) for c in chunks]))
+
+
+def test_embed_chunks_dedupes_against_cache(monkeypatch, tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", 1 << 20)
+    calls = []
+    _fake_model(monkeypatch, cache, calls)
+    indexer.embed_chunks(["a", "a"], report=False)
+    out = indexer.embed_chunks(["a", "b", "b"], report=False)
+    assert calls == ["a", "b"]
+    np.testing.assert_array_equal(out, np.vstack([_vec("a"), _vec("b"), _vec("b")]))
+    cache.close()
+
+
+def test_embedding_cache_round_trip_and_dim_mismatch(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", 1 << 20)
+    key = embedding_cache_key("metin", "local", "m", "instruct")
+    assert key != embedding_cache_key("metin", "local", "m", "prefix")
+    cache.put_many([(key, np.arange(4, dtype=np.float32))])
+    np.testing.assert_array_equal(cache.get_many([key], 4)[key], np.arange(4, dtype=np.float32))
+    assert cache.get_many([key], 8) == {}
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path, monkeypatch):
+    times = iter(range(1, 100))
+    monkeypatch.setattr("rag.embed_cache.time.time", lambda: float(next(times)))
+    vec = np.zeros(4, dtype=np.float32)  # 16 byte
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", 16 * 3)
+    cache.put_many([("a", vec)])
+    cache.put_many([("b", vec)])
+    cache.put_many([("c", vec)])
+    cache.get_many(["a"], 4)  # a artık en yeni
+    # 64 > 48 byte: en eski kayıtlar 0.9 * 48 = 43 byte'ın altına inene kadar silinir (b, c)
+    cache.put_many([("d", vec)])
+    assert set(cache.get_many(["a", "b", "c", "d"], 4)) == {"a", "d"}
+    assert cache.evicted == 2
+    assert cache.total_bytes() <= 16 * 3
+    cache.close()
+
+
+def test_query_cache_lru_order_and_copies():
+    cache = QueryEmbeddingCache(2)
+    cache.put("a", np.ones(3))
+    cache.put("b", np.ones(3) * 2)
+    got = cache.get("a")
+    got[0, 0] = 99  # dönen kopya cache'i değiştirmez
+    cache.put("c", np.ones(3) * 3)  # b en eski
+    assert cache.get("b") is None
+    np.testing.assert_array_equal(cache.get("a"), np.ones((1, 3)))
+    assert cache.stats()["size"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_query_cache_falls_back_to_disk(tmp_path):
+    disk = EmbeddingCache(tmp_path / "q.sqlite", 1 << 20)
+    QueryEmbeddingCache(4, disk).put("k", np.arange(3, dtype=np.float32))
+    fresh = QueryEmbeddingCache(4, disk)
+    assert fresh.get("k") is None  # dim=0: diske bakılmaz
+    np.testing.assert_array_equal(fresh.get("k", 3), np.arange(3, dtype=np.float32)[None])
+    assert fresh.stats()["disk_hits"] == 1
+    disk.close()
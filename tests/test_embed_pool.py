@@ -0,0 +1,22 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from rag.embed_pool import _THREAD_VARS, _worker_thread_env
+
+
+def test_thread_env_is_restored(monkeypatch):
+    monkeypatch.setenv("OMP_NUM_THREADS", "7")
+    monkeypatch.delenv("MKL_NUM_THREADS", raising=False)
+    with _worker_thread_env(2):
+        assert all(os.environ[var] == "2" for var in _THREAD_VARS)
+    assert os.environ["OMP_NUM_THREADS"] == "7"
+    assert "MKL_NUM_THREADS" not in os.environ
+
+
+def test_spawned_worker_sees_thread_env_at_startup():
+    # Worker ortamı spawn anında kopyalanır: numpy import'undan önce görünür olmalı
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as ex:
+        with _worker_thread_env(3):
+            future = ex.submit(os.getenv, "OPENBLAS_NUM_THREADS")
+            assert future.result() == "3"
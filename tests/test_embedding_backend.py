@@ -0,0 +1,79 @@
+import sys
+import types
+
+import numpy as np
+import pytest
+
+import rag.indexer as indexer
+import rag.models as models
+import rag.onnx_backend as onnx_backend
+
+
+class _FakeModel:
+    max_seq_length = 512
+
+    def encode(self, texts, **kwargs):
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+
+@pytest.fixture
+def onnx_config(monkeypatch):
+    """EMBEDDING_BACKEND=onnx; model kayıt defteri boş, PyTorch modeli sahte."""
+    monkeypatch.setattr(models, "EMBEDDING_BACKEND", "onnx")
+    monkeypatch.setattr(models, "USE_INSTRUCT_FORMAT", False)
+    monkeypatch.setattr(indexer, "USE_INSTRUCT_FORMAT", False)
+    monkeypatch.setattr(indexer, "EMBEDDING_PROVIDER", "local")
+    monkeypatch.setattr(models, "_models", {})
+    monkeypatch.setattr(models, "select_device", lambda: "cpu")
+    monkeypatch.setitem(sys.modules, "sentence_transformers", types.SimpleNamespace(SentenceTransformer=lambda *a, **k: _FakeModel()))
+
+
+def test_fallback_to_pytorch_drops_onnx_suffix(onnx_config, monkeypatch):
+    # Export parity'yi geçmiş görünse de model açılamaz -> PyTorch
+    monkeypatch.setattr(onnx_backend, "onnx_ready", lambda: True)
+    monkeypatch.setattr(onnx_backend, "load_onnx_model", lambda threads=None: None)
+    assert models.query_format("local") == "query-prefix+onnx-int8"  # yüklemeden önceki tahmin
+
+    models.get_local_model()
+    assert models.embedding_backend() == "torch"
+    assert models.query_format("local") == "query-prefix"
+    assert indexer._embedding_mode() == "prefix"
+
+
+def test_loaded_onnx_model_keeps_suffix(onnx_config, monkeypatch):
+    monkeypatch.setattr(onnx_backend, "onnx_ready", lambda: False)
+    monkeypatch.setattr(onnx_backend, "load_onnx_model", lambda threads=None: _FakeModel())
+
+    models.get_local_model()
+    assert models.embedding_backend() == "onnx-int8"
+    assert models.query_format("local") == "query-prefix+onnx-int8"
+    assert indexer._embedding_mode() == "prefix+onnx-int8"
+
+
+def test_pool_backend_decides_passage_mode(onnx_config, monkeypatch):
+    monkeypatch.setattr(onnx_backend, "onnx_ready", lambda: True)
+    monkeypatch.setattr(indexer, "_embedding_pool", types.SimpleNamespace(backend="torch"))
+    assert indexer._embedding_mode() == "prefix"
+
+
+def test_cache_writes_use_backend_that_loaded(onnx_config, monkeypatch, tmp_path):
+    from rag.embed_cache import EmbeddingCache, embedding_cache_key
+
+    cache = EmbeddingCache(tmp_path / "cache.sqlite", 1 << 20)
+    monkeypatch.setattr(onnx_backend, "onnx_ready", lambda: True)
+    monkeypatch.setattr(onnx_backend, "load_onnx_model", lambda threads=None: None)
+    monkeypatch.setattr(indexer, "get_embedding_dim", lambda: 4)
+    monkeypatch.setattr(indexer, "get_embedding_cache", lambda: cache)
+    monkeypatch.setattr(indexer, "_plan_batches", lambda texts, batch_size: ([list(range(len(texts)))], None, texts))
+
+    def fake_batches(texts, batches):
+        model = models.get_local_model()
+        for batch in batches:
+            yield batch, model.encode([texts[j] for j in batch])
+
+    monkeypatch.setattr(indexer, "_iter_batch_embeddings", fake_batches)
+    indexer.embed_chunks(["a", "b"], report=False)
+
+    model_name = indexer._embedding_model_name()
+    stored = cache.get_many([embedding_cache_key(t, "local", model_name, m) for t in "ab" for m in ("prefix", "prefix+onnx-int8")], 4)
+    assert sorted(stored) == sorted(embedding_cache_key(t, "local", model_name, "prefix") for t in "ab")
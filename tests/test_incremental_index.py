@@ -0,0 +1,161 @@
+import hashlib
+
+import faiss
+import numpy as np
+import pytest
+
+import rag.indexer as indexer
+from rag import vector_index
+from rag.config import RERANK_WEIGHT
+from rag.chunk_store import load_chunk_store
+from rag.snapshots import resolve_index_dir
+
+DIM = 16
+
+
+def _vec(text: str) -> np.ndarray:
+    seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+    v = np.random.default_rng(seed).standard_normal(DIM).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    content, root = tmp_path / "content", tmp_path / "index"
+
+    def write(name: str, body: str):
+        path = content / "Etik" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"TITLE: {name}\nURL: http://x/{name}\nDATE: 2020-01-01\n-----\n{body}", encoding="utf-8")
+        return path
+
+    load = indexer.load_documents
+    monkeypatch.setattr(indexer, "get_index_path", lambda: root)
+    monkeypatch.setattr(indexer, "load_documents", lambda workers=1: load(content, workers))
+    monkeypatch.setattr(indexer, "get_embedding_dim", lambda: DIM)
+    monkeypatch.setattr(indexer, "embed_chunks", lambda chunks, batch_size=32, **kw: np.vstack([_vec(c) for c in chunks]))
+    monkeypatch.setattr(indexer, "encode_queries", lambda queries, provider: np.vstack([_vec(q) for q in queries]))
+    return root, write
+
+
+def _state(root):
+    snapshot = resolve_index_dir(root)
+    chunks, metadatas = load_chunk_store(snapshot)
+    index = faiss.read_index(str(snapshot / "index.faiss"))
+    return index, list(chunks), [m["title"] for m in metadatas], indexer._stored_chunk_ids(metadatas)
+
+
+def _top_title(root, text: str) -> tuple[str, float]:
+    index, _, titles, ids = _state(root)
+    dists, labels = index.search(_vec(text)[None], 1)
+    row = int(np.flatnonzero(ids == labels[0][0])[0])
+    return titles[row], float(dists[0][0])
+
+
+def _build(corpus, index_type: str, monkeypatch):
+    root, write = corpus
+    build = vector_index.build_vector_index
+    monkeypatch.setattr(indexer, "build_vector_index", lambda v, ids: build(v, ids, index_type, "float32"))
+    paths = {name: write(name, f"{name} metni " * 40) for name in ("a.txt", "b.txt", "c.txt")}
+    indexer.index_documents()
+    return root, write, paths
+
+
+def test_update_index_replaces_edited_and_drops_removed_documents(corpus, monkeypatch):
+    root, write, paths = _build(corpus, "flat", monkeypatch)
+    _, chunks_before, _, ids_before = _state(root)
+    old_b = chunks_before[1]
+
+    write("b.txt", "tamamen yeni içerik " * 40)
+    paths["c.txt"].unlink()
+    indexer.update_index()
+
+    index, chunks, titles, ids = _state(root)
+    assert sorted(titles) == ["a.txt", "b.txt"]
+    assert index.ntotal == len(chunks) == len(ids)
+    # Flat index remove_ids destekler: tombstone kalmaz, a'nın chunk_id'si korunur, b yeni ID alır
+    assert indexer._load_tombstones(resolve_index_dir(root)).size == 0
+    assert ids[titles.index("a.txt")] == ids_before[0]
+    assert ids[titles.index("b.txt")] > ids_before.max()
+
+    assert _top_title(root, chunks[titles.index("b.txt")]) == ("b.txt", pytest.approx(1.0, abs=1e-5))
+    assert _top_title(root, old_b)[1] < 0.99
+    assert "c.txt" not in titles
+
+
+def test_update_index_is_noop_when_nothing_changed(corpus, monkeypatch):
+    root, _, _ = _build(corpus, "flat", monkeypatch)
+    before = resolve_index_dir(root)
+    assert indexer.update_index() == 0
+    assert resolve_index_dir(root) == before
+
+
+def test_tombstones_are_compacted(corpus, monkeypatch):
+    # HNSW remove_ids desteklemez: silinenler tombstone olur (otomatik compaction kapalı)
+    root, _, paths = _build(corpus, "hnsw", monkeypatch)
+    monkeypatch.setattr(indexer, "INDEX_COMPACT_THRESHOLD", 2.0)
+    paths["c.txt"].unlink()
+    indexer.update_index()
+
+    index, chunks, titles, ids = _state(root)
+    tombstones = indexer._load_tombstones(resolve_index_dir(root))
+    assert tombstones.size == 1 and tombstones[0] not in ids
+    assert index.ntotal == len(chunks) + 1
+
+    assert indexer.compact_index(force=True) == 1
+    index, chunks, titles, ids = _state(root)
+    assert index.ntotal == len(chunks) == 2
+    assert sorted(titles) == ["a.txt", "b.txt"]
+    assert indexer._read_index_config(resolve_index_dir(root))["num_tombstones"] == 0
+    assert _top_title(root, chunks[titles.index("a.txt")]) == ("a.txt", pytest.approx(1.0, abs=1e-5))
+
+
+class _FakeReranker:
+    def predict(self, pairs, **kwargs):
+        return np.array([1.0 if "a.txt" in text else 0.0 for _, text in pairs], dtype=np.float32)
+
+
+@pytest.mark.parametrize("mode", ["dense", "hybrid"])
+def test_search_score_is_ranking_score_and_vector_score_is_cosine(corpus, monkeypatch, mode):
+    from rag import retriever
+
+    root, _, _ = _build(corpus, "flat", monkeypatch)
+    monkeypatch.setattr(retriever, "get_index_path", lambda: root)
+    monkeypatch.setattr(retriever, "encode_queries", lambda queries, provider: np.vstack([_vec(q) for q in queries]))
+    monkeypatch.setattr(retriever, "get_reranker_model", lambda: _FakeReranker())
+    retriever.clear_cache()
+    _, chunks, _, _ = _state(root)
+    query = chunks[1]
+
+    options = dict(top_k=3, use_mmr=False, use_reranker=True, mode=mode, rerank_skip_margin=0, use_query_cache=False)
+    try:
+        docs = retriever.search(query, **options)
+        multi = retriever.multi_search([query], **options)
+    finally:
+        retriever.clear_cache()
+
+    for results in (docs, multi):
+        assert [d["score"] for d in results] == sorted((d["score"] for d in results), reverse=True)
+        for doc in results:
+            assert doc["vector_score"] == pytest.approx(float(_vec(query) @ _vec(doc["content"])), abs=1e-5)
+            assert doc["rerank_score"] == (1.0 if doc["metadata"]["title"] == "a.txt" else 0.0)
+
+    # score reranker harmanıdır: dense'te cosine, hybrid'de ölçekli RRF üzerinden
+    max_rrf = max(d.get("rrf_score", 0.0) for d in docs)
+    for doc in docs:
+        base = doc["vector_score"] if mode == "dense" else doc["rrf_score"] / max_rrf
+        expected = (1 - RERANK_WEIGHT) * base + RERANK_WEIGHT * doc["rerank_score"]
+        assert doc["score"] == pytest.approx(expected, abs=1e-5)
+
+
+def test_category_descriptions_are_not_encoded_while_pool_is_active(corpus, monkeypatch):
+    def fail(queries, provider):
+        raise AssertionError("açıklamalar pool açıkken ebeveynde encode edilmemeli")
+
+    monkeypatch.setattr(indexer, "encode_queries", fail)
+    monkeypatch.setattr(indexer, "_embedding_pool", object())
+    root, _, _ = _build(corpus, "flat", monkeypatch)
+
+    snapshot = resolve_index_dir(root)
+    assert not (snapshot / "category_desc.npy").exists()
+    assert (snapshot / "category_centroids.npy").exists()
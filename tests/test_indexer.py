@@ -0,0 +1,17 @@
+from rag.indexer import token_budget_batches
+
+
+def test_token_budget_batches_longest_first_within_budget():
+    lengths = [10, 50, 20, 50, 5, 30]
+    batches = token_budget_batches(lengths, max_tokens=100, max_batch=8)
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    assert batches[0] == [1, 3]
+    for batch in batches:
+        assert len(batch) * max(lengths[i] for i in batch) <= 100
+
+
+def test_token_budget_batches_caps_batch_size_and_oversized_items():
+    assert token_budget_batches([1] * 5, max_tokens=1000, max_batch=2) == [[0, 1], [2, 3], [4]]
+    # Tek başına bütçeyi aşan chunk kendi batch'ine düşer
+    assert token_budget_batches([500, 10], max_tokens=100, max_batch=8) == [[0], [1]]
+    assert token_budget_batches([], max_tokens=100, max_batch=8) == []
@@ -0,0 +1,44 @@
+import numpy as np
+
+from rag.lexical import LexicalIndex, load_lexical_index, tokenize, write_lexical_index
+
+
+def test_tokenize_folds_case_accents_and_suffixes():
+    assert tokenize("Kant'ın ETİĞİ ve Gettier problemi") == ["kant", "etig", "gettier", "problem"]
+    # Stopword'ler ve tek harfli token'lar atılır
+    assert tokenize("bu ve o, a") == []
+
+
+def test_bm25_ranks_by_term_frequency_and_length():
+    chunks = [
+        "bilgi bilgi bilgi felsefe",
+        "bilgi ve inanç üzerine uzun bir metin felsefe tarih sanat siyaset",
+        "etik ve ahlak",
+    ]
+    lexical = LexicalIndex.build(chunks)
+    hits = lexical.search("bilgi", top_n=10)
+    assert list(hits) == [0, 1]
+    assert hits[0] > hits[1] > 0
+    assert lexical.search("bilgi", top_n=1) == {0: hits[0]}
+    assert lexical.search("yok", top_n=10) == {}
+
+
+def test_bm25_idf_prefers_rare_terms():
+    chunks = ["felsefe bilinç", "felsefe etik", "felsefe estetik"]
+    scores = LexicalIndex.build(chunks).scores("felsefe bilinç")
+    assert scores[0] > scores[1] == scores[2] > 0
+
+
+def test_bm25_allowed_rows_filter():
+    chunks = ["bilgi", "bilgi kuramı", "bilgi felsefesi"]
+    lexical = LexicalIndex.build(chunks)
+    assert list(lexical.search("bilgi", top_n=10, allowed_rows=np.array([1, 2]))) == [1, 2]
+
+
+def test_saved_index_matches_built(tmp_path):
+    chunks = ["Gettier problemi", "bilginin tanımı", "Gettier ve bilgi"]
+    write_lexical_index(tmp_path, chunks)
+    loaded = load_lexical_index(tmp_path, chunks)
+    built = LexicalIndex.build(chunks)
+    assert loaded.terms == built.terms
+    assert np.array_equal(loaded.scores("gettier bilgi"), built.scores("gettier bilgi"))
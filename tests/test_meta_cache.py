@@ -0,0 +1,15 @@
+import numpy as np
+
+from rag.meta_cache import MISSING_DATE, build_date_index, date_range_rows
+
+
+def test_date_range_rows():
+    ordinals = np.array([30, MISSING_DATE, 10, 20, 10, 40], dtype=np.int32)
+    date_index = build_date_index(ordinals)
+    assert date_range_rows(date_index, None, None).tolist() == [2, 4, 3, 0, 5]
+    assert date_range_rows(date_index, 10, 20).tolist() == [2, 4, 3]
+    assert date_range_rows(date_index, 15, None).tolist() == [3, 0, 5]
+    assert date_range_rows(date_index, None, 9).tolist() == []
+    assert date_range_rows(date_index, 40, 40).tolist() == [5]
+    # Ters aralık boş döner
+    assert date_range_rows(date_index, 30, 20).tolist() == []
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+from rag.bench import _legacy_mmr, _mmr_pools
+from rag.retriever import _apply_mmr, mmr_select
+
+
+def _pool(rng, n: int, dim: int = 16) -> tuple[np.ndarray, np.ndarray]:
+    vecs, rel = _mmr_pools(rng, 1, n, dim, clusters=4)
+    return vecs[0], rel[0]
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("lambda_mult", [0.3, 0.7])
+def test_mmr_select_matches_legacy_loop(seed, lambda_mult):
+    rng = np.random.default_rng(seed)
+    vecs, rel = _mmr_pools(rng, 6, 40, 16, clusters=4)
+    sizes = np.full(len(rel), 40, dtype=np.int64)
+
+    picks = mmr_select(vecs, rel, sizes, 10, lambda_mult)
+    for b in range(len(rel)):
+        assert picks[b].tolist() == _legacy_mmr(vecs[b], rel[b], 10, lambda_mult)
+
+
+def test_mmr_select_ties_pick_lowest_position():
+    vecs = np.tile(np.eye(4, dtype=np.float32)[:2], (3, 1))  # 0,2,4 ve 1,3,5 aynı vektör
+    rel = np.full(6, 0.5, dtype=np.float32)
+    picks = mmr_select(vecs[None], rel[None], np.array([6]), 4, 0.5)[0].tolist()
+    assert picks == _legacy_mmr(vecs, rel, 4, 0.5) == [0, 1, 2, 3]
+
+
+def test_mmr_select_padded_rows_and_short_pools():
+    rng = np.random.default_rng(3)
+    lengths = [40, 25, 6]
+    pools = [_pool(rng, n) for n in lengths]
+    width = max(lengths)
+    vecs = np.zeros((len(pools), width, 16), dtype=np.float32)
+    rel = np.zeros((len(pools), width), dtype=np.float32)
+    for b, (v, r) in enumerate(pools):
+        vecs[b, : len(r)], rel[b, : len(r)] = v, r
+
+    picks = mmr_select(vecs, rel, np.array(lengths), 10, 0.5)
+    assert picks.shape == (3, 10)
+    for b, (v, r) in enumerate(pools):
+        row = picks[b].tolist()
+        expected = _legacy_mmr(v, r, 10, 0.5)
+        assert row[: len(expected)] == expected
+        assert row[len(expected) :] == [-1] * (10 - len(expected))
+
+
+def test_mmr_select_k_larger_than_pool():
+    vecs, rel = _pool(np.random.default_rng(0), 5)
+    picks = mmr_select(vecs[None], rel[None], np.array([5]), 10, 0.5)
+    assert picks.shape == (1, 5)
+    assert picks[0].tolist() == _legacy_mmr(vecs, rel, 10, 0.5)
+
+
+def test_apply_mmr_matches_legacy_loop():
+    rng = np.random.default_rng(7)
+    vectors, _ = _pool(rng, 200)
+    cache = {"vectors": vectors, "vector_rows": None}
+    top_k, lambda_mult = 5, 0.5
+    candidate_lists = []
+    for n in (60, 12, 3):  # tam havuz, kısa havuz, top_k'dan kısa liste
+        rows = rng.choice(len(vectors), size=n, replace=False)
+        scores = np.sort(rng.uniform(0.3, 0.9, size=n).astype(np.float32))[::-1]
+        candidate_lists.append([{"idx": int(i), "score": float(s)} for i, s in zip(rows, scores)])
+
+    pool_size = max(top_k * 8, 40)
+    for candidates in candidate_lists:
+        result = _apply_mmr(cache, candidates, top_k, lambda_mult)
+        if len(candidates) <= top_k:
+            assert result == candidates
+            continue
+        pool = candidates[:pool_size]
+        rel = np.array([item["score"] for item in pool], dtype=np.float32)
+        picked = [pool[i] for i in _legacy_mmr(vectors[[item["idx"] for item in pool]], rel, top_k, lambda_mult)]
+        picked.sort(key=lambda x: x["score"], reverse=True)
+        assert result == picked
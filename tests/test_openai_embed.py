@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+import rag.openai_embed as oe
+from rag.openai_embed import _AdaptiveLimiter, pack_requests, prepare_inputs
+
+
+def test_pack_requests_token_limit():
+    assert pack_requests([40, 40, 40, 10], max_request_tokens=100, max_inputs=10) == [[0, 1], [2, 3]]
+
+
+def test_pack_requests_input_limit():
+    assert pack_requests([1] * 5, max_request_tokens=1000, max_inputs=2) == [[0, 1], [2, 3], [4]]
+
+
+def test_pack_requests_oversized_input_gets_own_request():
+    assert pack_requests([10, 500, 10], max_request_tokens=100, max_inputs=10) == [[0], [1], [2]]
+    assert pack_requests([], max_request_tokens=100, max_inputs=10) == []
+
+
+def test_prepare_inputs_byte_fallback(monkeypatch):
+    monkeypatch.setattr(oe, "_get_encoding", lambda: None)
+    texts, tokens = prepare_inputs(["  ", "abcd", "ç" * 10], max_tokens=4)
+    # Boş metin tek boşlukla doldurulur; en az 1 token sayılır
+    assert texts[0] == " " and tokens[0] == 1
+    assert texts[1] == "abcd" and tokens[1] == 2
+    # 4 token * 2 byte = 8 byte; "ç" 2 byte, karakter ortasından bölünmez
+    assert texts[2] == "ç" * 4 and tokens[2] == 4
+
+
+def test_prepare_inputs_byte_fallback_drops_split_character(monkeypatch):
+    monkeypatch.setattr(oe, "_get_encoding", lambda: None)
+    texts, tokens = prepare_inputs(["a" + "ç" * 10], max_tokens=2)
+    assert texts == ["aç"]
+    assert tokens == [1]
+
+
+def _release(limiter: _AdaptiveLimiter, outcomes: list[bool]) -> list[int]:
+    async def run():
+        limits = []
+        for rate_limited in outcomes:
+            await limiter.acquire()
+            await limiter.release(rate_limited)
+            limits.append(limiter.limit)
+        return limits
+
+    return asyncio.run(run())
+
+
+def test_adaptive_limiter_halves_on_rate_limit():
+    limiter = _AdaptiveLimiter(8)
+    assert _release(limiter, [True, True, True, True]) == [4, 2, 1, 1]
+    assert limiter.in_flight == 0
+
+
+def test_adaptive_limiter_raises_after_successes():
+    limiter = _AdaptiveLimiter(4)
+    _release(limiter, [True])
+    assert limiter.limit == 2
+    n = oe._RAISE_AFTER_SUCCESSES
+    limits = _release(limiter, [False] * (2 * n))
+    assert limits[n - 2] == 2 and limits[n - 1] == 3
+    assert limits[-1] == 4
+    # Üst sınırı geçmez
+    assert _release(limiter, [False] * n)[-1] == 4
+
+
+def test_adaptive_limiter_rate_limit_resets_success_streak():
+    limiter = _AdaptiveLimiter(4)
+    _release(limiter, [True])
+    n = oe._RAISE_AFTER_SUCCESSES
+    _release(limiter, [False] * (n - 1) + [True] + [False] * (n - 1))
+    assert limiter.limit == 1
+
+
+@pytest.mark.parametrize("max_concurrency", [0, -3])
+def test_adaptive_limiter_floor(max_concurrency):
+    assert _AdaptiveLimiter(max_concurrency).limit == 1
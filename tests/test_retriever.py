@@ -0,0 +1,17 @@
+import pytest
+
+from rag.retriever import _reciprocal_rank_fusion
+
+
+def test_reciprocal_rank_fusion():
+    fused = _reciprocal_rank_fusion([{1: 0.9, 2: 0.5}, {2: 3.0, 3: 1.0}], k=60)
+    assert fused[1] == pytest.approx(1 / 61)
+    assert fused[2] == pytest.approx(1 / 62 + 1 / 61)
+    assert fused[3] == pytest.approx(1 / 62)
+    assert max(fused, key=fused.get) == 2
+
+
+def test_reciprocal_rank_fusion_uses_rank_not_score():
+    # Ölçek farklı listeler: sadece sıralar önemli
+    assert _reciprocal_rank_fusion([{1: 100.0, 2: 1.0}]) == _reciprocal_rank_fusion([{1: 0.2, 2: 0.1}])
+    assert _reciprocal_rank_fusion([]) == {}
@@ -0,0 +1,37 @@
+from rag.snapshots import CURRENT_FILE, SNAPSHOTS_DIR, current_version, prune_snapshots, publish_snapshot, resolve_index_dir
+
+
+def _snapshot(root, name):
+    path = root / SNAPSHOTS_DIR / name
+    path.mkdir(parents=True)
+    (path / "index.faiss").write_bytes(b"x")
+    return path
+
+
+def test_publish_snapshot_switches_current_and_removes_legacy_files(tmp_path):
+    (tmp_path / "index.faiss").write_bytes(b"legacy")
+    assert resolve_index_dir(tmp_path) == tmp_path
+
+    snapshot = _snapshot(tmp_path, "v1")
+    publish_snapshot(tmp_path, snapshot)
+    assert current_version(tmp_path) == "v1"
+    assert resolve_index_dir(tmp_path) == snapshot
+    assert not (tmp_path / "index.faiss").exists()
+    assert not (tmp_path / (CURRENT_FILE + ".tmp")).exists()
+
+
+def test_prune_snapshots_keeps_newest_and_active(tmp_path):
+    for name in ("v1", "v2", "v3", "v4"):
+        _snapshot(tmp_path, name)
+    (tmp_path / CURRENT_FILE).write_text("v1", encoding="utf-8")
+
+    prune_snapshots(tmp_path, keep=2)
+    assert sorted(p.name for p in (tmp_path / SNAPSHOTS_DIR).iterdir()) == ["v1", "v3", "v4"]
+
+    prune_snapshots(tmp_path, keep=0)  # aktif snapshot her zaman kalır
+    assert sorted(p.name for p in (tmp_path / SNAPSHOTS_DIR).iterdir()) == ["v1", "v4"]
+
+
+def test_prune_snapshots_without_snapshots_dir(tmp_path):
+    prune_snapshots(tmp_path, keep=1)
+    assert current_version(tmp_path) is None